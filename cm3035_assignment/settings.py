@@ -46,12 +46,46 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        # JSONRenderer's output, encoded with orjson when it is installed
+        "tracks.renderers.FastJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
 }
 
+# Per-process NumPy snapshot for the analytics endpoints (tracks/snapshot.py).
+# Ignored when numpy is not installed.
+TRACKS_ANALYTICS_SNAPSHOT = os.getenv("TRACKS_ANALYTICS_SNAPSHOT", "True") == "True"
+
+# Per-request query count / SQL time / render time as Server-Timing headers and
+# log lines, with query-budget and repeated-query (N+1) warnings. Off by
+# default; when off the middleware removes itself from the chain.
+TRACKS_INSTRUMENTATION = os.getenv("TRACKS_INSTRUMENTATION", "False") == "True"
+TRACKS_QUERY_BUDGET = int(os.getenv("TRACKS_QUERY_BUDGET", "15"))
+TRACKS_REPEATED_QUERY_THRESHOLD = int(os.getenv("TRACKS_REPEATED_QUERY_THRESHOLD", "5"))
+
+# Async summary views run independent queries concurrently on a pool of
+# TRACKS_ASYNC_QUERY_WORKERS threads, each keeping its own connection for
+# CONN_MAX_AGE (tracks/concurrency.py). False = one at a time on the request's
+# connection.
+TRACKS_ASYNC_PARALLEL_QUERIES = os.getenv("TRACKS_ASYNC_PARALLEL_QUERIES", "True") == "True"
+TRACKS_ASYNC_QUERY_WORKERS = int(os.getenv("TRACKS_ASYNC_QUERY_WORKERS", "4"))
+
+# Upper bound on operations per POST /api/tracks/batch/ request.
+TRACKS_BATCH_MAX_ITEMS = int(os.getenv("TRACKS_BATCH_MAX_ITEMS", "5000"))
+
+# gzip / brotli (when the brotli package is installed) of JSON / NDJSON / CSV
+# responses for clients that accept them, skipping bodies under
+# TRACKS_COMPRESSION_MIN_BYTES (tracks/compression.py). HTML is never compressed.
+# Cached summary responses keep their compressed bytes in the cache entry.
+TRACKS_COMPRESSION = os.getenv("TRACKS_COMPRESSION", "True") == "True"
+TRACKS_COMPRESSION_MIN_BYTES = int(os.getenv("TRACKS_COMPRESSION_MIN_BYTES", "1024"))
+TRACKS_GZIP_LEVEL = int(os.getenv("TRACKS_GZIP_LEVEL", "6"))
+TRACKS_BROTLI_QUALITY = int(os.getenv("TRACKS_BROTLI_QUALITY", "5"))
+
 MIDDLEWARE = [
+    'tracks.instrumentation.QueryInstrumentationMiddleware',
+    'tracks.database.ReadDatabaseMiddleware',
+    'tracks.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +126,62 @@ DATABASES = {
     }
 }
 
+# "Production SQLite" profile (tracks/database.py): WAL and tuned pragmas on
+# every connection, persistent connections with health checks, and GET / HEAD
+# requests reading through a query_only "read" alias of the same file.
+TRACKS_SQLITE_PRODUCTION = os.getenv("TRACKS_SQLITE_PRODUCTION", "False") == "True"
+TRACKS_SQLITE_PRAGMAS = {}
+TRACKS_READ_DATABASE = None
+
+if TRACKS_SQLITE_PRODUCTION:
+    TRACKS_SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": int(os.getenv("SQLITE_CACHE_KIB", "65536")) * -1,  # negative = KiB
+        "mmap_size": int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+        "temp_store": "MEMORY",
+    }
+    for alias in ("default", "read"):
+        DATABASES[alias] = {
+            **DATABASES["default"],
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    DATABASES["read"]["TEST"] = {"MIRROR": "default"}
+    TRACKS_READ_DATABASE = "read"
+
+DATABASE_ROUTERS = ["tracks.database.ReadRouter"]
+
+
+# Cache
+# Local-memory by default; set CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# and CACHE_LOCATION=/some/dir to share cached summaries between worker processes.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "cm3035-assignment"),
+    }
+}
+
+# Seconds a rendered summary response stays cached (entries are also keyed on
+# the data version, so writes invalidate them immediately).
+TRACKS_SUMMARY_CACHE_TIMEOUT = int(os.getenv("TRACKS_SUMMARY_CACHE_TIMEOUT", "3600"))
+
+
+# Logging: instrumentation lines (see TRACKS_INSTRUMENTATION) go to the console
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "tracks.instrumentation": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -26,6 +26,14 @@ def index(request):
             # REST API (Core CRUD)
             ("API: List/Create Tracks (GET/POST)", "/api/tracks/"),
             ("API: Track Detail (GET)", "/api/tracks/1/"),
+            ("API: Batch Create/Update/Delete (POST JSON/NDJSON)", "/api/tracks/batch/"),
+            ("API: Export Tracks (streamed NDJSON/CSV)", "/api/tracks/export/?format=csv"),
+            ("API: Track Facets (counts per filter)", "/api/tracks/facets/?genre=pop&top=10"),
+            ("API: Distributions (histograms + quantiles)", "/api/tracks/distributions/?genre=pop&year=2020&quantiles=0.5,0.9"),
+            ("API: Cube (group-by over year / album type / explicit / genre)", "/api/tracks/cube/?group_by=year,album_type&explicit=false"),
+            ("API: Autocomplete (artists, tracks, albums, genres)", "/api/tracks/autocomplete/?q=tay"),
+            ("API: Similar Tracks", "/api/tracks/1/similar/?k=10"),
+            ("API: Similar Tracks (several seeds)", "/api/tracks/similar/?ids=1,2&k=10"),
 
             # REST API (Summary endpoints)
             ("API: Top Artists", "/api/tracks/summary/top-artists/"),
@@ -33,6 +41,7 @@ def index(request):
             ("API: Top Genres (top=20)", "/api/tracks/summary/top-genres/?top=20"),
             ("API: Clean Hits (complex filter)", "/api/tracks/insights/clean-hits/?min_popularity=80&genre=pop&year_from=2019&year_to=2021&album_type=album"),
             ("API: Artist Album Type Breakdown", "/api/tracks/insights/artist-albumtype-breakdown/?artist=drake"),
+            ("API: Dashboard (all summaries, async)", "/api/tracks/dashboard/?artist=drake"),
 
             # Swagger/OpenAPI (optional; enable only if you install drf-spectacular)
             ("OpenAPI Schema (JSON)", "/api/schema/"),
@@ -1,89 +1,237 @@
 import os
 import csv
 import json
-from datetime import datetime
+import argparse
+import hashlib
 import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cm3035_assignment.settings")
 django.setup()
 
-from tracks.models import Track
+from django.db import transaction
+from django.db.models import Q
+
+from tracks.catalog import (
+    FLAT_FIELDS, FLAT_LOOKUPS, TRACK_FIELDS, catalog_changes, prune_catalog, sync_catalog, track_from_row,
+)
+from tracks.genres import rebuild_track_genres
+from tracks.ingest import parse_bool, parse_date, parse_float, parse_int
+from tracks.models import Album, Artist, Track
+from tracks.rollups import CATALOG_FIELDS, apply_track_tallies, rebuild_rollups, refresh_rollups, tally_tracks
 from tracks.serializers import TrackSerializer
+from tracks.signals import paused
+from tracks.versioning import bump_version
 
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "spotify_data clean.csv")
 BATCH_SIZE = 500
 
 
-def parse_bool(v):
-    return str(v).strip().lower() in ("true", "1", "yes", "y")
+def parse_row(row):
+    """CSV row -> flat track row (see tracks.catalog)."""
+    return {
+        "track_id": row["track_id"],
+        "track_name": row["track_name"],
+        "track_number": parse_int(row["track_number"]),
+        "track_popularity": parse_int(row["track_popularity"]),
+        "explicit": parse_bool(row["explicit"]),
+        "artist_name": row["artist_name"],
+        "artist_popularity": parse_int(row["artist_popularity"]),
+        "artist_followers": parse_int(row["artist_followers"]),
+        "artist_genres": (row.get("artist_genres") or "").strip(),
+        "album_id": row["album_id"],
+        "album_name": row["album_name"],
+        "album_release_date": parse_date(row["album_release_date"]),
+        "album_total_tracks": parse_int(row["album_total_tracks"]),
+        "album_type": row["album_type"],
+        "track_duration_min": parse_float(row["track_duration_min"]),
+    }
+
+
+# every column the loader reads
+LOAD_FIELDS = FLAT_FIELDS
+# the track's own columns, in a fixed order for hashing; artist / album values
+# are compared by sync_catalog() since other tracks share them
+HASH_FIELDS = [*TRACK_FIELDS, "artist_name", "album_id"]
+UPDATE_FIELDS = [f for f in TRACK_FIELDS if f != "track_id"] + ["artist", "album"]
+
+
+def row_hash(values):
+    """Stable digest of a row's own columns (dict or tuple in HASH_FIELDS order)."""
+    if isinstance(values, dict):
+        values = [values[f] for f in HASH_FIELDS]
+    return hashlib.blake2b(repr(tuple(values)).encode(), digest_size=16).digest()
+
+
+def read_rows(path=DATA_PATH):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield parse_row(row)
 
 
-def parse_int(v, default=0):
-    try:
-        return int(float(v))
-    except Exception:
-        return default
+def load_data(path=DATA_PATH):
+    """Full reload: delete everything, bulk insert, rebuild derived tables."""
+    # per-row signal maintenance is skipped; derived tables are rebuilt at the end
+    with paused():
+        _load_rows(path)
 
+    # bulk_create bypasses post_save, so build the genre link table in one pass
+    links = rebuild_track_genres()
+    rollups = rebuild_rollups()
+    bump_version()
 
-def parse_float(v, default=0.0):
-    try:
-        return float(v)
-    except Exception:
-        return default
+    print(f"Rebuilt {links} genre links, rollups: {rollups}.")
 
 
-def parse_date(v):
-    return datetime.strptime(v.strip(), "%Y-%m-%d").date()
+def _insert(batch):
+    # artists / albums repeated across batches are updated in place, so the
+    # last CSV row for each one wins
+    artist_ids, _ = sync_catalog(batch)
+    Track.objects.bulk_create(
+        [track_from_row(values, artist_ids) for values in batch],
+        ignore_conflicts=True,
+    )
 
 
-def load_data():
+def _load_rows(path):
     Track.objects.all().delete()
+    Artist.objects.all().delete()
+    Album.objects.all().delete()
 
     batch = []
     total = 0
 
-    with open(DATA_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            track = Track(
-                track_id=row["track_id"],
-                track_name=row["track_name"],
-                track_number=parse_int(row["track_number"]),
-                track_popularity=parse_int(row["track_popularity"]),
-                explicit=parse_bool(row["explicit"]),
-                artist_name=row["artist_name"],
-                artist_popularity=parse_int(row["artist_popularity"]),
-                artist_followers=parse_int(row["artist_followers"]),
-                artist_genres=(row.get("artist_genres") or "").strip(),
-                album_id=row["album_id"],
-                album_name=row["album_name"],
-                album_release_date=parse_date(row["album_release_date"]),
-                album_total_tracks=parse_int(row["album_total_tracks"]),
-                album_type=row["album_type"],
-                track_duration_min=parse_float(row["track_duration_min"]),
+    for values in read_rows(path):
+        batch.append(values)
+
+        if len(batch) >= BATCH_SIZE:
+            _insert(batch)
+            total += len(batch)
+            batch.clear()
+
+    # final remainder
+    if batch:
+        _insert(batch)
+        total += len(batch)
+
+    print(f"Loaded {total} tracks successfully.")
+
+
+def upsert_data(path=DATA_PATH, delete_missing=False, batch_size=BATCH_SIZE):
+    """
+    Incremental refresh keyed on track_id.
+
+    Each CSV batch is compared with the stored rows by hash: new tracks are
+    inserted, changed ones bulk-updated, identical ones skipped; artists and
+    albums get whatever values changed, the last row winning. Every batch
+    commits on its own, so the API keeps serving data during the run. Derived
+    tables (genre links, rollups) are patched only for the rows touched, and
+    for the other tracks of any artist / album whose values changed; the
+    distribution histograms and the cube from before / after tallies of those
+    tracks, like tracks.batch does.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    seen_ids = set() if delete_missing else None
+    touched_artists = set()
+    catalog_changed = False
+
+    def flush(batch):
+        nonlocal catalog_changed
+        by_id = {}
+        for values in batch:
+            by_id[values["track_id"]] = values  # last row wins on duplicate ids
+
+        with transaction.atomic():
+            existing = {
+                row[1]: row
+                for row in Track.objects.filter(track_id__in=list(by_id))
+                .values_list("id", *[FLAT_LOOKUPS[f] for f in HASH_FIELDS])
+            }
+
+            inserts, updates = [], []
+            for track_id, values in by_id.items():
+                old = existing.get(track_id)
+                if old is None:
+                    inserts.append(values)
+                elif row_hash(old[1:]) == row_hash(values):
+                    counts["unchanged"] += 1
+                    continue
+                else:
+                    updates.append((old[0], values))
+                    # the artist rollup row the old version counted towards changes too
+                    old_values = dict(zip(HASH_FIELDS, old[1:]))
+                    touched_artists.add(old_values["artist_name"])
+                touched_artists.add(values["artist_name"])
+
+            # histogram / cube tallies of the tracks rewritten, and of every track of
+            # an artist / album whose shared values change
+            artists_changing, albums_changing = catalog_changes(
+                batch, CATALOG_FIELDS[Artist], CATALOG_FIELDS[Album]
+            )
+            affected = (
+                Q(pk__in=[pk for pk, _ in updates])
+                | Q(artist_id__in=artists_changing) | Q(album_id__in=albums_changing)
             )
+            before = tally_tracks(Track.objects.filter(affected))
+            # shared album values can change under rows that are otherwise unchanged
+            catalog_changed |= bool(artists_changing or albums_changing)
 
-            batch.append(track)
+            artist_ids, shared = sync_catalog(batch)
+            Track.objects.bulk_create([track_from_row(values, artist_ids) for values in inserts])
+            Track.objects.bulk_update(
+                [track_from_row(values, artist_ids, id=pk) for pk, values in updates], UPDATE_FIELDS
+            )
+            written = affected | Q(track_id__in=[values["track_id"] for values in inserts])
+            apply_track_tallies(before, tally_tracks(Track.objects.filter(written)))
+            counts["inserted"] += len(inserts)
+            counts["updated"] += len(updates)
+            touched_artists.update(shared["artists"])
 
-            if len(batch) >= BATCH_SIZE:
-                Track.objects.bulk_create(
-                    batch,
-                    ignore_conflicts=True,
-                )
-                total += len(batch)
-                batch.clear()
+            changed = [values["track_id"] for values in inserts] + [values["track_id"] for _, values in updates]
+            if changed or shared["genre_artists"]:
+                rebuild_track_genres(Track.objects.filter(
+                    Q(track_id__in=changed) | Q(artist_id__in=shared["genre_artists"])
+                ))
 
-        # final remainder
+    with paused():
+        batch = []
+        for values in read_rows(path):
+            if seen_ids is not None:
+                seen_ids.add(values["track_id"])
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
         if batch:
-            Track.objects.bulk_create(
-                batch,
-                ignore_conflicts=True,
-            )
-            total += len(batch)
+            flush(batch)
 
-    print(f"Loaded {total} tracks successfully.")
+        if delete_missing:
+            # diff in Python: a NOT IN over every CSV id would exceed SQLite's variable limit
+            stale = []
+            rows = Track.objects.values_list("id", "track_id", "artist__name")
+            for pk, track_id, artist in rows.iterator(chunk_size=5000):
+                if track_id not in seen_ids:
+                    stale.append(pk)
+                    touched_artists.add(artist)
+            for i in range(0, len(stale), batch_size):
+                with transaction.atomic():
+                    doomed = Track.objects.filter(id__in=stale[i:i + batch_size])
+                    before = tally_tracks(doomed)
+                    deleted = doomed.delete()
+                    apply_track_tallies(before)
+                counts["deleted"] += deleted[1].get("tracks.Track", 0)
+            prune_catalog()
+
+    if touched_artists:
+        refresh_rollups(touched_artists)
+    if touched_artists or catalog_changed:
+        bump_version()
+
+    print(
+        "Upsert finished: {inserted} inserted, {updated} updated, "
+        "{unchanged} unchanged, {deleted} deleted.".format(**counts)
+    )
+    return counts
 
 
 def dump_sample_json():
@@ -93,5 +241,23 @@ def dump_sample_json():
 
 
 if __name__ == "__main__":
-    load_data()
-    dump_sample_json()
+    parser = argparse.ArgumentParser(description="Load the Spotify CSV into the Track table.")
+    parser.add_argument("path", nargs="?", default=DATA_PATH, help="CSV file (default: bundled dataset).")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Delete every track and reload from scratch instead of upserting.",
+    )
+    parser.add_argument(
+        "--delete-missing", action="store_true",
+        help="Upsert mode: delete tracks whose track_id is not in the CSV.",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-sample", action="store_true", help="Skip the sample JSON dump.")
+    args = parser.parse_args()
+
+    if args.full:
+        load_data(args.path)
+    else:
+        upsert_data(args.path, delete_missing=args.delete_missing, batch_size=args.batch_size)
+    if not args.no_sample:
+        dump_sample_json()
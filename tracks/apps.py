@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class TracksConfig(AppConfig):
     name = 'tracks'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .database import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid="tracks.configure_sqlite")
@@ -0,0 +1,289 @@
+"""
+In-memory prefix index behind /api/tracks/autocomplete/.
+
+Each worker process keeps one AutocompleteIndex with a PrefixIndex per kind
+(artists, tracks, albums, genres). A PrefixIndex holds, in two parallel
+sorted lists, one key per word start of every folded name ("taylor swift"
+and "swift"), so a prefix is a bisect range. Suggestions are ranked by
+artist followers, track popularity, the album's best track popularity and
+a genre's track count.
+
+Short prefixes match a large share of the catalogue, so for every prefix
+matching more than SCAN_LIMIT keys the best MAX_LIMIT ids are kept ready;
+any other prefix ranks its (small) bisect range on the fly.
+
+Like tracks.snapshot, the index is tagged with the data version and rebuilt
+on the first read after a version it did not see, e.g. a bulk load or a
+write in another process. Single-row writes made through the model signals
+in this process patch it instead (note_write()): once the transaction
+commits, the affected entries are re-read and, if the index was current
+just before the write, it moves to the new version without a rebuild.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+from django.db import transaction
+
+from .genres import genre_counts
+from .models import Album, Artist, Track
+from .versioning import current_version
+
+KINDS = ("artists", "tracks", "albums", "genres")
+# what a suggestion of each kind looks like in the API
+FIELDS = {
+    "artists": ("name", "followers"),
+    "tracks": ("id", "track_id", "name", "artist_name", "popularity"),
+    "albums": ("album_id", "name", "popularity"),
+    "genres": ("name", "track_count"),
+}
+SCAN_LIMIT = 256
+MAX_LIMIT = 50
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(text):
+    """Case-, accent- and whitespace-insensitive form used for keys and queries."""
+    text = text or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def word_starts(folded):
+    """The folded name from each word onwards ("dua lipa" -> "dua lipa", "lipa")."""
+    keys = []
+    for match in _WORD.finditer(folded):
+        key = folded[match.start():]
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+class PrefixIndex:
+    """
+    One kind of suggestion. Entries are {id: (score, label, row)}, where row
+    is the tuple of values the API returns for it.
+    """
+
+    def __init__(self, entries, scan_limit=SCAN_LIMIT):
+        self.entries = dict(entries)
+        pairs = sorted((key, item_id) for item_id, (_, label, _) in self.entries.items()
+                       for key in word_starts(fold(label)))
+        self.keys = [key for key, _ in pairs]
+        self.ids = [item_id for _, item_id in pairs]
+        del pairs
+
+        # "heavy" prefixes match more than scan_limit keys. Any run of 2 *
+        # scan_limit equal prefixes spans two keys scan_limit apart at a
+        # multiple of scan_limit, so the common prefixes of those pairs find
+        # all of them (and some shorter runs); every other prefix is ranked
+        # by scanning under 2 * scan_limit keys.
+        self.heavy = set()
+        for i in range(0, len(self.keys) - scan_limit, scan_limit):
+            a, b = self.keys[i], self.keys[i + scan_limit]
+            n = 0
+            while n < min(len(a), len(b)) and a[n] == b[n]:
+                n += 1
+                self.heavy.add(a[:n])
+
+        # their best ids, longest prefixes first: a prefix's list is the best
+        # of its heavy children's lists and the keys under no heavy child, so
+        # every key is looked at once
+        rank = {item_id: n for n, item_id in enumerate(sorted(self.entries, key=self._rank))}
+        children = {}
+        for prefix in self.heavy:
+            children.setdefault(prefix[:-1], []).append(prefix)
+        self.top = {}
+        for prefix in sorted(self.heavy, key=len, reverse=True):
+            lo, hi = self._range(prefix)
+            candidates = set()
+            for child in sorted(children.get(prefix, [])):
+                child_lo, child_hi = self._range(child)
+                candidates.update(self.ids[lo:child_lo])
+                candidates.update(self.top[child])
+                lo = child_hi
+            candidates.update(self.ids[lo:hi])
+            self.top[prefix] = heapq.nsmallest(MAX_LIMIT, candidates, key=rank.__getitem__)
+
+    def _rank(self, item_id):
+        score, label, _ = self.entries[item_id]
+        return -score, label, item_id
+
+    def _heavy_prefixes(self, keys):
+        # a prefix of a heavy prefix is heavy too
+        found = set()
+        for key in keys:
+            n = 1
+            while n <= len(key) and key[:n] in self.heavy:
+                found.add(key[:n])
+                n += 1
+        return found
+
+    def _range(self, prefix):
+        return bisect.bisect_left(self.keys, prefix), bisect.bisect_left(self.keys, prefix + "\U0010ffff")
+
+    def _scan(self, prefix, limit):
+        lo, hi = self._range(prefix)
+        return heapq.nsmallest(limit, set(self.ids[lo:hi]), key=self._rank)
+
+    def search(self, query, limit):
+        prefix = fold(query)
+        if not prefix:
+            return []
+        if prefix in self.heavy:
+            ids = self.top.get(prefix, [])[:limit]
+        else:
+            ids = self._scan(prefix, limit)
+        return [self.entries[i] for i in ids]
+
+    # -----------------------
+    # incremental updates
+    # -----------------------
+
+    def _position(self, key, item_id):
+        # ids under one key stay sorted, as in a fresh build
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        return bisect.bisect_left(self.ids, item_id, lo, hi)
+
+    def put(self, item_id, entry):
+        """
+        Add, change or (entry None) remove one entry. The set of heavy
+        prefixes is kept until the next rebuild; only their lists change.
+        """
+        old = self.entries.pop(item_id, None)
+        prefixes = new_prefixes = set()
+        if old is not None:
+            old_keys = word_starts(fold(old[1]))
+            for key in old_keys:
+                i = self._position(key, item_id)
+                del self.keys[i], self.ids[i]
+            prefixes = self._heavy_prefixes(old_keys)
+        if entry is not None:
+            self.entries[item_id] = entry
+            new_keys = word_starts(fold(entry[1]))
+            for key in new_keys:
+                i = self._position(key, item_id)
+                self.keys.insert(i, key)
+                self.ids.insert(i, item_id)
+            new_prefixes = self._heavy_prefixes(new_keys)
+
+        for prefix in prefixes | new_prefixes:
+            ids = self.top.get(prefix, [])
+            if item_id in ids and len(ids) >= MAX_LIMIT:
+                # it may now rank below ids that were cut off: re-rank the range
+                ids = self._scan(prefix, MAX_LIMIT)
+            else:
+                ids = [i for i in ids if i != item_id]
+                if prefix in new_prefixes:
+                    ids = sorted(ids + [item_id], key=self._rank)[:MAX_LIMIT]
+            self.top[prefix] = ids
+
+
+def _artist_entries(qs):
+    return {pk: (followers, name, (name, followers))
+            for pk, name, followers in qs.values_list("id", "name", "followers")}
+
+
+def _track_entries(qs):
+    return {
+        pk: (popularity, name, (pk, track_id, name, artist, popularity))
+        for pk, track_id, name, popularity, artist in qs.values_list(
+            "id", "track_id", "track_name", "track_popularity", "artist__name"
+        ).iterator(chunk_size=5000)
+    }
+
+
+def _album_entries(albums, popularity):
+    return {album_id: (popularity.get(album_id, 0), name, (album_id, name, popularity.get(album_id, 0)))
+            for album_id, name in albums.values_list("album_id", "name")}
+
+
+def _genre_entries(qs):
+    return {name: (count, name, (name, count)) for name, count in qs.values_list("name", "count")}
+
+
+def _album_popularity(albums):
+    """album_id -> best track popularity, for the given album ids (all if None)."""
+    qs = Track.objects.order_by()
+    if albums is not None:
+        qs = qs.filter(album_id__in=albums)
+    best = {}
+    for album_id, popularity in qs.values_list("album_id", "track_popularity").iterator(chunk_size=5000):
+        if popularity > best.get(album_id, -1):
+            best[album_id] = popularity
+    return best
+
+
+class AutocompleteIndex:
+    def __init__(self, version):
+        self.version = version
+        self.lock = threading.Lock()
+        self.kinds = {
+            "artists": PrefixIndex(_artist_entries(Artist.objects.all())),
+            "tracks": PrefixIndex(_track_entries(Track.objects.all())),
+            "albums": PrefixIndex(_album_entries(Album.objects.all(), _album_popularity(None))),
+            "genres": PrefixIndex(_genre_entries(genre_counts())),
+        }
+
+    def search(self, query, kinds=KINDS, limit=8):
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self.lock:
+            found = {kind: self.kinds[kind].search(query, limit) for kind in kinds}
+        return {kind: [dict(zip(FIELDS[kind], row)) for _, _, row in entries] for kind, entries in found.items()}
+
+    def refresh(self, artists=(), tracks=(), albums=(), genres=()):
+        """Re-read the given entries (missing rows are removed)."""
+        changes = {
+            "artists": (set(artists), _artist_entries(Artist.objects.filter(pk__in=set(artists)))),
+            "tracks": (set(tracks), _track_entries(Track.objects.filter(pk__in=set(tracks)))),
+            "albums": (set(albums), _album_entries(Album.objects.filter(pk__in=set(albums)),
+                                                   _album_popularity(set(albums)))),
+            "genres": (set(genres), _genre_entries(genre_counts().filter(name__in=set(genres)))),
+        }
+        with self.lock:
+            for kind, (keys, entries) in changes.items():
+                for key in keys:
+                    self.kinds[kind].put(key, entries.get(key))
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_index():
+    """Current index for this process, rebuilt if the data version moved."""
+    global _index
+    version = current_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = AutocompleteIndex(version)
+        return _index
+
+
+def _patch(previous, token, changes):
+    index = _index
+    if index is None or index.version != previous:
+        return  # rebuilt on the next read anyway
+    index.version = None  # half-patched: rebuild if the refresh fails
+    index.refresh(**changes)
+    index.version = token
+
+
+def note_write(previous, token, **changes):
+    """
+    A signal-driven write moved the data version from `previous` to `token`
+    and touched `changes` (artists / tracks / albums = ids, genres = names):
+    patch this process's index once the transaction commits.
+    """
+    if _index is None:
+        return
+    transaction.on_commit(lambda: _patch(previous, token, changes), robust=True)
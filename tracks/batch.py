@@ -0,0 +1,196 @@
+"""
+Bulk create / update / delete of tracks keyed by track_id.
+
+apply_batch() takes a list of operations:
+
+    {"op": "create", "track_id": ..., <every Track field>}
+    {"op": "update", "track_id": ..., <fields to change>}
+    {"op": "delete", "track_id": ...}
+
+and, for the whole batch: loads every referenced track in one query (which
+is also the uniqueness check for creates), validates each item with
+TrackBatchItemSerializer (TrackSerializer without its per-row unique
+query), then writes with bulk_create / bulk_update / one DELETE inside a
+single transaction, after tracks.catalog.sync_catalog() has created or
+updated the artists and albums. Signals are paused; genre links and the
+touched rollup rows are rebuilt in bulk, the histogram / cube rollups are
+patched from before / after tallies of the affected tracks, and the data
+version moves once.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .catalog import (
+    ALBUM_FIELDS, ARTIST_FIELDS, TRACK_FIELDS, catalog_changes, flat_values, sync_catalog, track_from_row,
+)
+from .genres import rebuild_track_genres
+from .models import Album, Artist, Track
+from .rollups import CATALOG_FIELDS, apply_track_tallies, refresh_rollups, tally_tracks
+from .serializers import TrackSerializer
+from .signals import paused
+from .versioning import bump_version
+
+OPS = ("create", "update", "delete")
+UPDATE_FIELDS = [f for f in TRACK_FIELDS if f != "track_id"] + ["artist", "album"]
+
+
+class TrackBatchItemSerializer(TrackSerializer):
+    class Meta(TrackSerializer.Meta):
+        # uniqueness is checked for the whole batch at once in apply_batch()
+        extra_kwargs = {"track_id": {"validators": []}}
+
+
+def _error(index, op, track_id, errors):
+    return {"index": index, "op": op, "track_id": track_id, "status": "error", "errors": errors}
+
+
+def _fill_moves(updates):
+    """
+    An update that moves a track to an artist / album that does not exist
+    yet creates it from the track's current one, overlaid with whatever the
+    item sent (as a single-track PUT / PATCH does).
+    """
+    for key, model, fields in (("artist_name", Artist, ARTIST_FIELDS), ("album_id", Album, ALBUM_FIELDS)):
+        moved = [(old, row) for _, old, row in updates if row[key] != old[key]]
+        if not moved:
+            continue
+        lookup = model._meta.get_field(fields[key]).name
+        known = set(model.objects.filter(**{f"{lookup}__in": [row[key] for _, row in moved]})
+                    .values_list(lookup, flat=True))
+        for old, row in moved:
+            if row[key] not in known:
+                for name in fields:
+                    row.setdefault(name, old[name])
+
+
+def apply_batch(items, all_or_nothing=False):
+    """
+    Apply `items` (see module docstring). Returns (results, counts): one
+    result dict per item, in input order, and totals per status. With
+    all_or_nothing, any error means nothing is written.
+    """
+    results = [None] * len(items)
+    parsed = []  # (index, op, track_id, payload)
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _error(index, None, None, {"non_field_errors": ["Expected an object."]})
+            continue
+        op, track_id = item.get("op"), item.get("track_id")
+        if op not in OPS:
+            results[index] = _error(index, op, track_id, {"op": [f"Must be one of: {', '.join(OPS)}."]})
+        elif not isinstance(track_id, str) or not track_id:
+            results[index] = _error(index, op, track_id, {"track_id": ["This field is required."]})
+        else:
+            payload = {k: v for k, v in item.items() if k != "op"}
+            parsed.append((index, op, track_id, payload))
+
+    # one query for every track the batch refers to
+    existing = Track.objects.select_related("artist", "album").in_bulk(
+        [track_id for _, _, track_id, _ in parsed], field_name="track_id"
+    )
+
+    seen = set()
+    creates, updates, deletes = [], [], []  # (index, flat row) / (index, track)
+    for index, op, track_id, payload in parsed:
+        if track_id in seen:
+            results[index] = _error(index, op, track_id, {"track_id": ["Appears more than once in this batch."]})
+            continue
+        seen.add(track_id)
+        current = existing.get(track_id)
+
+        if op == "create":
+            if current is not None:
+                results[index] = _error(index, op, track_id, {"track_id": ["track with this track id already exists."]})
+                continue
+            serializer = TrackBatchItemSerializer(data=payload)
+        elif current is None:
+            results[index] = _error(index, op, track_id, {"track_id": ["No track with this track_id."]})
+            continue
+        elif op == "delete":
+            deletes.append((index, current))
+            continue
+        else:
+            payload.pop("track_id")  # the key, not a change
+            serializer = TrackBatchItemSerializer(current, data=payload, partial=True)
+
+        if not serializer.is_valid():
+            results[index] = _error(index, op, track_id, serializer.errors)
+            continue
+        changes = serializer.flat_values(serializer.validated_data)
+        if op == "create":
+            creates.append((index, changes))
+        else:
+            # the old values name the rollup rows this track leaves
+            old = flat_values(current)
+            row = {name: old[name] for name in (*TRACK_FIELDS, "artist_name", "album_id")}
+            updates.append((index, old, {**row, **changes, "id": current.pk}))
+
+    has_errors = any(r is not None for r in results)
+    if not (has_errors and all_or_nothing):
+        _fill_moves(updates)
+        created = _write(creates, updates, deletes)
+        for (index, row), track in zip(creates, created):
+            results[index] = {"index": index, "op": "create", "track_id": row["track_id"],
+                              "status": "created", "id": track.pk}
+        for index, _, row in updates:
+            results[index] = {"index": index, "op": "update", "track_id": row["track_id"],
+                              "status": "updated", "id": row["id"]}
+        for index, track in deletes:
+            results[index] = {"index": index, "op": "delete", "track_id": track.track_id,
+                              "status": "deleted", "id": track.pk}
+    else:
+        for index, op, track_id, _ in parsed:
+            if results[index] is None:
+                results[index] = {"index": index, "op": op, "track_id": track_id, "status": "skipped"}
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return results, counts
+
+
+def _write(creates, updates, deletes, batch_size=500):
+    """Apply the validated operations; returns the created Tracks."""
+    if not (creates or updates or deletes):
+        return []
+
+    # artist rollup rows the updated / deleted tracks leave ...
+    artists = {old["artist_name"] for _, old, _ in updates} | {t.artist.name for _, t in deletes}
+
+    written = [row for _, row in creates] + [row for _, _, row in updates]
+
+    with transaction.atomic(), paused():
+        # rollup tallies of the tracks the batch rewrites or deletes,
+        # and of every track of an artist / album whose shared values it changes
+        artists_changing, albums_changing = catalog_changes(
+            written, CATALOG_FIELDS[Artist], CATALOG_FIELDS[Album]
+        )
+        affected = (
+            Q(pk__in=[row["id"] for _, _, row in updates] + [t.pk for _, t in deletes])
+            | Q(artist_id__in=artists_changing) | Q(album_id__in=albums_changing)
+        )
+        before = tally_tracks(Track.objects.filter(affected))
+
+        artist_ids, shared = sync_catalog(written)
+        created = Track.objects.bulk_create(
+            [track_from_row(row, artist_ids) for _, row in creates], batch_size=batch_size
+        )
+        Track.objects.bulk_update(
+            [track_from_row(row, artist_ids, id=row["id"]) for _, _, row in updates],
+            UPDATE_FIELDS, batch_size=batch_size,
+        )
+        if deletes:
+            Track.objects.filter(pk__in=[t.pk for _, t in deletes]).delete()
+        apply_track_tallies(before, tally_tracks(Track.objects.filter(affected | Q(pk__in=[t.pk for t in created]))))
+
+        changed = [t.pk for t in created] + [row["id"] for _, _, row in updates]
+        # ... and the ones the written tracks now count towards
+        artists.update(Track.objects.filter(pk__in=changed).values_list("artist__name", flat=True))
+
+        if changed or shared["genre_artists"]:
+            rebuild_track_genres(Track.objects.filter(
+                Q(pk__in=changed) | Q(artist_id__in=shared["genre_artists"])
+            ))
+        refresh_rollups(artists | shared["artists"])
+        bump_version()
+    return created
@@ -0,0 +1,196 @@
+"""
+Versioned response cache for the summary / insights endpoints.
+
+Rendered responses are stored in Django's cache under
+(endpoint, canonical query string, Accept header, data version). Any Track
+write or loader run moves the data version (tracks.versioning), so stale
+entries are never read again and simply age out. Responses carry a strong
+ETag (a hash of the body) and `If-None-Match` is answered with 304.
+
+An entry also keeps the body compressed for each content encoding clients
+have asked for (see tracks.compression), so a repeat hit sends the stored
+bytes instead of compressing them again.
+
+Works with any Django cache backend (local-memory and file-based included).
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .compression import (
+    compress_content, compressible, enabled as compression_enabled, mark_encoded, mark_identity, negotiate,
+)
+from .versioning import acurrent_version, current_version
+
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def canonical_query(query_dict):
+    """Order-independent query string: ?b=2&a=1 and ?a=1&b=2 share a key."""
+    items = sorted((k, v) for k in query_dict for v in query_dict.getlist(k))
+    return urlencode(items)
+
+
+def cache_key(name, request, version):
+    raw = "|".join([
+        canonical_query(request.GET),
+        request.META.get("HTTP_ACCEPT", ""),
+    ])
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"tracks:summary:{name}:{version}:{digest}"
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    candidates = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in candidates
+
+
+def _vary(response):
+    patch_vary_headers(response, ["Accept", "Accept-Encoding"] if compression_enabled() else ["Accept"])
+
+
+def _add_encoding(entry, encoding):
+    """
+    Compress the entry's body for `encoding` unless that was done already
+    (None is stored when it is not worth it). True if the entry changed.
+    """
+    encoded = entry.setdefault("encoded", {})
+    if encoding is None or encoding in encoded:
+        return False
+    if compressible(entry["content_type"]):
+        encoded[encoding] = compress_content(entry["content"], encoding)
+    else:
+        # e.g. the browsable API's HTML (see tracks.compression)
+        encoded[encoding] = None
+    return True
+
+
+def _encode(response, entry, encoding):
+    if not encoding:
+        return
+    body = entry.get("encoded", {}).get(encoding)
+    if body is not None:
+        response.content = body
+        mark_encoded(response, encoding)
+    else:
+        # stored as not worth compressing: the middleware must not try again
+        mark_identity(response)
+
+
+def _build_response(entry, encoding=None):
+    response = HttpResponse(entry["content"], content_type=entry["content_type"], status=entry["status"])
+    response["ETag"] = entry["etag"]
+    _vary(response)
+    _encode(response, entry, encoding)
+    return response
+
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    _vary(response)
+    return response
+
+
+def _timeout(timeout):
+    if timeout is not None:
+        return timeout
+    return getattr(settings, "TRACKS_SUMMARY_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _make_entry(response):
+    if hasattr(response, "render"):
+        response.render()
+    return {
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "status": response.status_code,
+        "etag": '"%s"' % hashlib.sha1(response.content).hexdigest(),
+        # {encoding: compressed body, or None if not worth compressing}
+        "encoded": {},
+    }
+
+
+def _cached(entry, if_none_match, encoding):
+    if _etag_matches(if_none_match, entry["etag"]):
+        return _not_modified(entry["etag"])
+    return _build_response(entry, encoding)
+
+
+def _fresh(response, entry, if_none_match, encoding):
+    if _etag_matches(if_none_match, entry["etag"]):
+        return _not_modified(entry["etag"])
+    # first request: hand back the view's own response, tagged (and compressed)
+    response["ETag"] = entry["etag"]
+    _vary(response)
+    _encode(response, entry, encoding)
+    return response
+
+
+def cached_summary(name, timeout=None):
+    """
+    Cache a GET view under `name`. Apply it outside @api_view so the wrapped
+    view hands back a response that can be rendered and stored. Async views
+    get an async wrapper using the async cache API.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+
+                key = cache_key(name, request, await acurrent_version())
+                if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+                encoding = negotiate(request)
+                entry = await cache.aget(key)
+                if entry is not None:
+                    if _add_encoding(entry, encoding):
+                        await cache.aset(key, entry, _timeout(timeout))
+                    return _cached(entry, if_none_match, encoding)
+
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                entry = _make_entry(response)
+                _add_encoding(entry, encoding)
+                await cache.aset(key, entry, _timeout(timeout))
+                return _fresh(response, entry, if_none_match, encoding)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key = cache_key(name, request, current_version())
+            if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+            encoding = negotiate(request)
+            entry = cache.get(key)
+            if entry is not None:
+                if _add_encoding(entry, encoding):
+                    cache.set(key, entry, _timeout(timeout))
+                return _cached(entry, if_none_match, encoding)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = _make_entry(response)
+            _add_encoding(entry, encoding)
+            cache.set(key, entry, _timeout(timeout))
+            return _fresh(response, entry, if_none_match, encoding)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,227 @@
+"""
+Artist / Album rows behind Track.
+
+The API, the forms, the CSV and the export still speak in flat track rows
+(`artist_name`, `artist_followers`, `album_name`, ...). FLAT_FIELDS lists
+them in their historical order and FLAT_LOOKUPS says where each one lives
+now, so values(), filters and orderings can keep using the flat names.
+
+An artist is identified by its name and an album by its Spotify album_id.
+Values sent for an existing artist / album overwrite the stored ones (last
+write wins), which is also how the loaders dedupe the CSV: save_track()
+does it for one row through save() and the signals, sync_catalog() for a
+whole batch with bulk queries.
+"""
+from django.db import transaction
+
+from .models import Album, Artist, Track
+
+TRACK_FIELDS = ["track_id", "track_name", "track_number", "track_popularity", "explicit", "track_duration_min"]
+
+# flat name -> Artist / Album field
+ARTIST_FIELDS = {
+    "artist_name": "name",
+    "artist_popularity": "popularity",
+    "artist_followers": "followers",
+    "artist_genres": "genres",
+}
+ALBUM_FIELDS = {
+    "album_id": "album_id",
+    "album_name": "name",
+    "album_release_date": "release_date",
+    "album_total_tracks": "total_tracks",
+    "album_type": "album_type",
+}
+
+FLAT_FIELDS = [
+    "track_id", "track_name", "track_number", "track_popularity", "explicit",
+    *ARTIST_FIELDS, *ALBUM_FIELDS, "track_duration_min",
+]
+
+# flat name -> lookup from Track (album_id is the foreign key column itself)
+FLAT_LOOKUPS = {
+    **{name: name for name in TRACK_FIELDS},
+    **{flat: f"artist__{field}" for flat, field in ARTIST_FIELDS.items()},
+    **{flat: f"album__{field}" for flat, field in ALBUM_FIELDS.items()},
+    "album_id": "album_id",
+}
+
+
+def flat_lookup(name):
+    """FLAT_LOOKUPS for an ordering term, keeping a leading "-"."""
+    desc = name.startswith("-")
+    lookup = FLAT_LOOKUPS.get(name.lstrip("-"), name.lstrip("-"))
+    return f"-{lookup}" if desc else lookup
+
+
+def model_field(name):
+    """The model field a flat name is stored in."""
+    if name in ARTIST_FIELDS:
+        return Artist._meta.get_field(ARTIST_FIELDS[name])
+    if name in ALBUM_FIELDS:
+        return Album._meta.get_field(ALBUM_FIELDS[name])
+    return Track._meta.get_field(name)
+
+
+def flat_values(track):
+    """A saved Track as a flat row (the inverse of save_track)."""
+    row = {name: getattr(track, name) for name in TRACK_FIELDS}
+    row.update({flat: getattr(track.artist, field) for flat, field in ARTIST_FIELDS.items()})
+    row.update({flat: getattr(track.album, field) for flat, field in ALBUM_FIELDS.items()})
+    return row
+
+
+def _split(row, fields):
+    return {field: row[flat] for flat, field in fields.items() if flat in row}
+
+
+def _save_related(model, key, values, current):
+    """
+    get-or-create `model` by `key` from `values`, falling back to `current`'s
+    values for anything not given, and save whatever changed.
+    """
+    key_value = values.get(key, getattr(current, key, None))
+    obj = model.objects.filter(**{key: key_value}).first()
+    if obj is None:
+        fields = [f.attname for f in model._meta.concrete_fields if not f.auto_created]
+        defaults = {f: getattr(current, f) for f in fields} if current is not None else {}
+        obj = model(**{**defaults, **values, key: key_value})
+        obj.save(force_insert=True)
+        return obj
+
+    changed = [f for f, v in values.items() if getattr(obj, f) != v]
+    for f in changed:
+        setattr(obj, f, values[f])
+    if changed:
+        obj.save(update_fields=changed)
+    return obj
+
+
+def save_track(row, track=None):
+    """
+    Create a Track from a flat row, or apply a (partial) flat row to `track`.
+    The artist / album are looked up by name / album_id and created or
+    updated first; every save goes through the model signals.
+    """
+    artist_values, album_values = _split(row, ARTIST_FIELDS), _split(row, ALBUM_FIELDS)
+    with transaction.atomic():
+        current_artist = track.artist if track is not None else None
+        current_album = track.album if track is not None else None
+        artist = _save_related(Artist, "name", artist_values, current_artist)
+        album = _save_related(Album, "album_id", album_values, current_album)
+
+        track = track or Track()
+        for name in TRACK_FIELDS:
+            if name in row:
+                setattr(track, name, row[name])
+        track.artist, track.album = artist, album
+        track.save()
+    return track
+
+
+def sync_catalog(rows):
+    """
+    Bulk counterpart of save_track() for the loaders: make sure every artist
+    and album named in `rows` exists, with the artist_* / album_* values of
+    the rows applied in order (last row wins). Values a row leaves out keep
+    their stored value; a new artist or album needs all of them.
+
+    Returns (artist ids by name, changes), where changes lists what the
+    derived tables need refreshing for beyond the rows themselves, since
+    other tracks share these artists and albums: {"artists": names whose
+    followers changed, "genre_artists": ids of artists whose genres changed}.
+    """
+    artists, albums = {}, {}
+    for row in rows:
+        artists.setdefault(row["artist_name"], {}).update(_split(row, ARTIST_FIELDS))
+        albums.setdefault(row["album_id"], {}).update(_split(row, ALBUM_FIELDS))
+
+    changes = {"artists": set(), "genre_artists": set()}
+    with transaction.atomic():
+        stored = {a.name: a for a in Artist.objects.filter(name__in=list(artists))}
+        new, updated = [], []
+        for name, values in artists.items():
+            artist = stored.get(name)
+            if artist is None:
+                new.append(Artist(**values))
+                continue
+            changed = {f for f, v in values.items() if getattr(artist, f) != v}
+            if changed:
+                for f in changed:
+                    setattr(artist, f, values[f])
+                updated.append(artist)
+                if "followers" in changed:
+                    changes["artists"].add(name)
+                if "genres" in changed:
+                    changes["genre_artists"].add(artist.pk)
+        Artist.objects.bulk_create(new)
+        Artist.objects.bulk_update(updated, ["popularity", "followers", "genres"])
+        ids = {name: artist.pk for name, artist in stored.items()}
+        if new:
+            ids.update(
+                Artist.objects.filter(name__in=[a.name for a in new]).values_list("name", "id")
+            )
+
+        stored = Album.objects.in_bulk(list(albums))
+        new, updated = [], []
+        for album_id, values in albums.items():
+            album = stored.get(album_id)
+            if album is None:
+                new.append(Album(**values))
+                continue
+            changed = {f for f, v in values.items() if getattr(album, f) != v}
+            if changed:
+                for f in changed:
+                    setattr(album, f, values[f])
+                updated.append(album)
+        Album.objects.bulk_create(new)
+        Album.objects.bulk_update(updated, ["name", "release_date", "total_tracks", "album_type"])
+    return ids, changes
+
+
+def catalog_changes(rows, artist_fields, album_fields):
+    """
+    (artist ids, album ids) of the stored artists / albums whose `*_fields`
+    (model field names) sync_catalog(rows) would change.
+    """
+    artists, albums = {}, {}
+    for row in rows:
+        artists.setdefault(row["artist_name"], {}).update(_split(row, ARTIST_FIELDS))
+        albums.setdefault(row["album_id"], {}).update(_split(row, ALBUM_FIELDS))
+
+    def changed(model, key, wanted, fields):
+        stored = model.objects.filter(**{f"{key}__in": list(wanted)}).values_list("pk", key, *fields)
+        return {
+            pk for pk, name, *values in stored
+            if any(f in wanted[name] and wanted[name][f] != v for f, v in zip(fields, values))
+        }
+
+    return changed(Artist, "name", artists, artist_fields), changed(Album, "album_id", albums, album_fields)
+
+
+def track_from_row(row, artist_ids, **extra):
+    """Unsaved Track for a flat row, once sync_catalog() has run for it."""
+    return Track(
+        **{name: row[name] for name in TRACK_FIELDS},
+        artist_id=artist_ids[row["artist_name"]],
+        album_id=row["album_id"],
+        **extra,
+    )
+
+
+def prune_catalog():
+    """Delete artists and albums no track refers to any more."""
+    artists = Artist.objects.filter(tracks__isnull=True).delete()[0]
+    albums = Album.objects.filter(tracks__isnull=True).delete()[0]
+    return artists, albums
+
+
+def filter_by_artist(qs, text):
+    """
+    Restrict a Track queryset to tracks whose artist name contains `text`.
+    The substring match scans the small Artist table; tracks are then found
+    through the artist foreign key index.
+    """
+    matching = Artist.objects.filter(name__icontains=text.strip()).values("id")
+    return qs.filter(artist_id__in=matching)
+
@@ -0,0 +1,164 @@
+"""
+Content-negotiated response compression: gzip, and brotli when the
+`brotli` package is installed.
+
+CompressionMiddleware compresses JSON, NDJSON and CSV responses of at least
+TRACKS_COMPRESSION_MIN_BYTES (streamed exports chunk by chunk) for clients
+whose Accept-Encoding allows it, at TRACKS_GZIP_LEVEL /
+TRACKS_BROTLI_QUALITY. HTML is never compressed: the pages embed CSRF
+tokens next to text a request can reflect, and compressing them would
+expose the token to BREACH-style length attacks.
+
+Summary responses are compressed earlier, by tracks.caching, which keeps
+the compressed bytes of each encoding in the cache entry so repeat hits are
+not recompressed; the middleware leaves responses that already carry a
+Content-Encoding alone, and those the cache found not worth compressing
+(mark_identity()).
+
+Like django.middleware.gzip, a compressed response's ETag is made weak
+(the bytes differ from the identity body) and `Vary: Accept-Encoding` is
+added. TRACKS_COMPRESSION = False removes the middleware and the cache
+stores identity bodies only.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+DEFAULT_MIN_BYTES = 1024
+# media types carrying data only (no secrets next to reflected input)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv")
+
+
+def enabled():
+    return getattr(settings, "TRACKS_COMPRESSION", True)
+
+
+def encodings():
+    """Supported encodings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compressible(content_type):
+    """Whether a response of `content_type` may be compressed."""
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def _min_bytes():
+    return getattr(settings, "TRACKS_COMPRESSION_MIN_BYTES", DEFAULT_MIN_BYTES)
+
+
+def negotiate(request):
+    """The encoding to use for `request` (None for identity)."""
+    if not enabled():
+        return None
+    weights = {}
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        # ties keep the earlier (preferred) encoding
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=getattr(settings, "TRACKS_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY))
+    # wbits=31: gzip container; no file name or mtime, so equal bodies compress identically
+    return zlib.compress(data, getattr(settings, "TRACKS_GZIP_LEVEL", DEFAULT_GZIP_LEVEL), wbits=31)
+
+
+def _compressor(encoding):
+    """(process(chunk), finish()) for streamed bodies."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=getattr(settings, "TRACKS_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY))
+        # flush every chunk so a slow export still reaches the client as it goes
+        return (lambda chunk: c.process(chunk) + c.flush()), c.finish
+    c = zlib.compressobj(getattr(settings, "TRACKS_GZIP_LEVEL", DEFAULT_GZIP_LEVEL), zlib.DEFLATED, 31)
+    return (lambda chunk: c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)), c.flush
+
+
+def mark_encoded(response, encoding):
+    """Headers of a response whose body is (now) encoded with `encoding`."""
+    response["Content-Encoding"] = encoding
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+    if not response.streaming:
+        response["Content-Length"] = str(len(response.content))
+    else:
+        response.headers.pop("Content-Length", None)
+
+
+def mark_identity(response):
+    """Have the middleware send `response` as is: compressing it was tried and did not pay."""
+    response.compression_exempt = True
+
+
+def compress_content(content, encoding):
+    """Compressed `content`, or None if it is too small or does not shrink."""
+    if encoding is None or len(content) < _min_bytes():
+        return None
+    compressed = compress(content, encoding)
+    return compressed if len(compressed) < len(content) else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if response.has_header("Content-Encoding") or response.status_code in (204, 304):
+            return response
+        if getattr(response, "compression_exempt", False) or not compressible(response.get("Content-Type", "")):
+            return response
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            process, finish = _compressor(encoding)
+            if response.is_async:
+                original = response.streaming_content
+
+                async def compressed():
+                    async for chunk in original:
+                        yield process(bytes(chunk))
+                    yield finish()
+            else:
+                def compressed(original=response.streaming_content):
+                    for chunk in original:
+                        yield process(bytes(chunk))
+                    yield finish()
+            response.streaming_content = compressed()
+        else:
+            body = compress_content(response.content, encoding)
+            if body is None:
+                return response
+            response.content = body
+        mark_encoded(response, encoding)
+        return response
@@ -0,0 +1,70 @@
+"""
+Running blocking ORM work from async views.
+
+Django's async ORM methods (aget, aaggregate, async for, ...) all hop onto
+the request's single thread-sensitive executor, so independent queries
+issued through them still run one after another. run_sync() instead runs
+each call on a small, bounded pool of worker threads
+(TRACKS_ASYNC_QUERY_WORKERS), each with its own database connection, so
+asyncio.gather() over several run_sync() calls really overlaps them.
+SQLite serves concurrent readers without trouble.
+
+Worker threads keep their connections between calls like request threads
+do: close_old_connections() runs around every call, so a connection lives
+for CONN_MAX_AGE and is reused (without re-running the connection setup)
+until then, and a broken one is dropped. Their queries are counted by
+tracks.instrumentation like the request thread's.
+
+With TRACKS_ASYNC_PARALLEL_QUERIES = False every call goes through the
+thread-sensitive executor and shares the request's connection instead.
+Tests need that: rows written inside a TestCase transaction are invisible
+to other connections.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .instrumentation import recording
+
+DEFAULT_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "TRACKS_ASYNC_QUERY_WORKERS", DEFAULT_WORKERS),
+                    thread_name_prefix="tracks-query",
+                )
+    return _executor
+
+
+def _on_worker(fn, args, kwargs):
+    # the request_started / request_finished treatment for a pool thread's connections
+    close_old_connections()
+    try:
+        # counted towards the request's instrumentation (the ContextVar is copied over)
+        with recording():
+            return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(fn, *args, **kwargs):
+    if getattr(settings, "TRACKS_ASYNC_PARALLEL_QUERIES", True):
+        return await sync_to_async(_on_worker, thread_sensitive=False, executor=_pool())(fn, args, kwargs)
+    return await sync_to_async(fn)(*args, **kwargs)
+
+
+async def gather_sync(*calls):
+    """Run (fn, *args) tuples concurrently via run_sync; results in call order."""
+    return await asyncio.gather(*(run_sync(fn, *args) for fn, *args in calls))
@@ -0,0 +1,257 @@
+"""
+Rollup cube of Track over release year x album type x explicit x genre
+(CubeCell rows), behind /api/tracks/cube/.
+
+Each cell stores the track count and the sum / min / max of popularity and
+duration of its tracks. Genre "" is the cell of every track; a track is
+also counted once in the cell of each of its genres, so a roll-up over
+genres must pick one or the other (cells() does). Any group-by over the
+other dimensions is a GROUP BY over the cells, never over Track.
+
+Durations are summed in whole milliseconds so that patched sums stay equal
+to a rebuild. Writes are patched like tracks.distributions: tally() the
+affected tracks before and after and apply_tallies() the difference; a
+min / max the removed tracks held is recomputed from Track for that cell
+with a MIN / MAX query.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+
+from .genres import split_genres
+from .models import CubeCell, Track
+
+DIMENSIONS = ("year", "album_type", "explicit", "genre")
+ALL_GENRES = ""
+
+# measures of a cell, in tally() order
+COUNT, POP_SUM, POP_MIN, POP_MAX, MS_SUM, DUR_MIN, DUR_MAX = range(7)
+MEASURES = (
+    "track_count", "popularity_sum", "popularity_min", "popularity_max",
+    "duration_ms_sum", "duration_min", "duration_max",
+)
+
+
+def duration_ms(minutes):
+    """Duration in whole milliseconds, rounded half up."""
+    return math.floor(minutes * 60000 + 0.5)
+
+
+# -----------------------
+# maintenance
+# -----------------------
+
+def tally(queryset):
+    """
+    What the tracks in `queryset` contribute to the cube:
+    {(year, album_type, explicit, genre): [MEASURES values]}.
+    """
+    totals = {}
+    rows = queryset.order_by().values_list(
+        "album__release_date", "album__album_type", "explicit", "artist__genres",
+        "track_popularity", "track_duration_min",
+    )
+    for released, album_type, explicit, genres, popularity, duration in rows.iterator(chunk_size=5000):
+        ms = duration_ms(duration)
+        for genre in (ALL_GENRES, *split_genres(genres)):
+            key = (released.year, album_type, explicit, genre)
+            cell = totals.get(key)
+            if cell is None:
+                totals[key] = [1, popularity, popularity, popularity, ms, duration, duration]
+                continue
+            cell[COUNT] += 1
+            cell[POP_SUM] += popularity
+            cell[MS_SUM] += ms
+            if popularity < cell[POP_MIN]:
+                cell[POP_MIN] = popularity
+            if popularity > cell[POP_MAX]:
+                cell[POP_MAX] = popularity
+            if duration < cell[DUR_MIN]:
+                cell[DUR_MIN] = duration
+            if duration > cell[DUR_MAX]:
+                cell[DUR_MAX] = duration
+    return totals
+
+
+def _recount_extremes(keys):
+    """
+    Fresh (popularity min, max, duration min, max) of the given cells from
+    Track ({key: values}, missing if empty). The min / max are taken in SQL
+    per distinct artist genres string, then split into genres here.
+    """
+    groups = defaultdict(set)
+    for year, album_type, explicit, genre in keys:
+        groups[(year, album_type, explicit)].add(genre)
+    fresh = {}
+    for (year, album_type, explicit), genres in groups.items():
+        qs = Track.objects.filter(
+            album__release_date__year=year, album__album_type=album_type, explicit=explicit
+        )
+        if ALL_GENRES not in genres:
+            # a superset; split_genres() below matches the genres exactly
+            match = Q()
+            for genre in genres:
+                match |= Q(artist__genres__icontains=genre)
+            qs = qs.filter(match)
+        rows = qs.order_by().values_list("artist__genres").annotate(
+            Min("track_popularity"), Max("track_popularity"),
+            Min("track_duration_min"), Max("track_duration_min"),
+        )
+        for text, pop_min, pop_max, dur_min, dur_max in rows:
+            for genre in (ALL_GENRES, *split_genres(text)):
+                if genre not in genres:
+                    continue
+                key = (year, album_type, explicit, genre)
+                cell = fresh.get(key)
+                if cell is None:
+                    fresh[key] = [pop_min, pop_max, dur_min, dur_max]
+                else:
+                    cell[:] = [min(cell[0], pop_min), max(cell[1], pop_max),
+                               min(cell[2], dur_min), max(cell[3], dur_max)]
+    return fresh
+
+
+def _stored_cells(keys, chunk_size=100):
+    """
+    The stored cells with the given keys ({key: CubeCell}): one year IN list
+    per (genre, album type, explicit) rather than the cross product of all
+    the keys' years, album types and genres, which is most of the table.
+    """
+    years = defaultdict(set)
+    for year, album_type, explicit, genre in keys:
+        years[(genre, album_type, explicit)].add(year)
+    groups = list(years.items())
+    stored = {}
+    for i in range(0, len(groups), chunk_size):
+        match = Q(*(
+            Q(genre=genre, album_type=album_type, explicit=explicit, year__in=group_years)
+            for (genre, album_type, explicit), group_years in groups[i:i + chunk_size]
+        ), _connector=Q.OR)
+        stored.update(((c.year, c.album_type, c.explicit, c.genre), c) for c in CubeCell.objects.filter(match))
+    return stored
+
+
+def apply_tallies(removed, added):
+    """Subtract the `removed` tally from the stored cells and add `added`."""
+    keys = {k for k in set(removed) | set(added) if removed.get(k) != added.get(k)}
+    if not keys:
+        return
+    with transaction.atomic():
+        stored = _stored_cells(keys)
+        new, changed, empty, stale = [], [], [], {}
+        for key in keys:
+            row, add, sub = stored.get(key), added.get(key), removed.get(key)
+            if row is None:
+                if add is not None:
+                    new.append(CubeCell(**dict(zip(DIMENSIONS, key)), **dict(zip(MEASURES, add))))
+                continue
+            values = [getattr(row, m) for m in MEASURES]
+            for i in (COUNT, POP_SUM, MS_SUM):
+                values[i] += (add[i] if add else 0) - (sub[i] if sub else 0)
+            if values[COUNT] <= 0:
+                empty.append(row.pk)
+                continue
+            # a min / max cannot be decremented: recount the cell if the removed tracks held one
+            if sub and (sub[POP_MIN] <= values[POP_MIN] or sub[POP_MAX] >= values[POP_MAX]
+                        or sub[DUR_MIN] <= values[DUR_MIN] or sub[DUR_MAX] >= values[DUR_MAX]):
+                stale[key] = values
+                continue
+            if add:
+                values[POP_MIN] = min(values[POP_MIN], add[POP_MIN])
+                values[POP_MAX] = max(values[POP_MAX], add[POP_MAX])
+                values[DUR_MIN] = min(values[DUR_MIN], add[DUR_MIN])
+                values[DUR_MAX] = max(values[DUR_MAX], add[DUR_MAX])
+            for m, v in zip(MEASURES, values):
+                setattr(row, m, v)
+            changed.append(row)
+
+        # the count and sums are patched exactly; only the min / max need Track
+        fresh = _recount_extremes(stale) if stale else {}
+        for key, values in stale.items():
+            row = stored[key]
+            if key not in fresh:
+                empty.append(row.pk)
+                continue
+            values[POP_MIN], values[POP_MAX], values[DUR_MIN], values[DUR_MAX] = fresh[key]
+            for m, v in zip(MEASURES, values):
+                setattr(row, m, v)
+            changed.append(row)
+
+        # delete + insert like refresh_rollups(): bulk_update's CASE per column is far slower
+        CubeCell.objects.filter(pk__in=[c.pk for c in changed] + empty).delete()
+        CubeCell.objects.bulk_create(new + changed)
+
+
+def cube_rows(queryset=None):
+    """CubeCell rows for `queryset` (all tracks by default), for rebuilds."""
+    totals = tally(Track.objects.all() if queryset is None else queryset)
+    return [
+        {**dict(zip(DIMENSIONS, key)), **dict(zip(MEASURES, values))}
+        for key, values in totals.items()
+    ]
+
+
+# -----------------------
+# queries
+# -----------------------
+
+def track_total():
+    """Number of tracks: the sum over the all-genres cells."""
+    return CubeCell.objects.filter(genre=ALL_GENRES).aggregate(n=Sum("track_count"))["n"] or 0
+
+
+def years():
+    """Release years that have tracks, newest first."""
+    return list(
+        CubeCell.objects.filter(genre=ALL_GENRES).values_list("year", flat=True).distinct().order_by("-year")
+    )
+
+
+def cells(group_by=(), year_from=None, year_to=None, album_type=None, explicit=None, genre=None):
+    """
+    The cube rolled up to the `group_by` dimensions over the cells matching
+    the filters: one dict per group (ordered by the group_by values) with
+    the track count and the sum / average / min / max of popularity and
+    duration.
+    """
+    qs = CubeCell.objects.all()
+    if genre:
+        qs = qs.filter(genre=genre)
+    elif "genre" in group_by:
+        qs = qs.exclude(genre=ALL_GENRES)
+    else:
+        qs = qs.filter(genre=ALL_GENRES)
+    if year_from is not None:
+        qs = qs.filter(year__gte=year_from)
+    if year_to is not None:
+        qs = qs.filter(year__lte=year_to)
+    if album_type:
+        qs = qs.filter(album_type__iexact=album_type)
+    if explicit is not None:
+        qs = qs.filter(explicit=explicit)
+    totals = {
+        "n": Sum("track_count"), "pop_sum": Sum("popularity_sum"),
+        "pop_min": Min("popularity_min"), "pop_max": Max("popularity_max"),
+        "ms_sum": Sum("duration_ms_sum"), "dur_min": Min("duration_min"), "dur_max": Max("duration_max"),
+    }
+    if group_by:
+        rows = qs.values(*group_by).annotate(**totals).order_by(*group_by)
+    else:
+        rows = [qs.aggregate(**totals)]
+    return [
+        {
+            **{d: row[d] for d in group_by},
+            "track_count": row["n"],
+            "popularity_sum": row["pop_sum"],
+            "popularity_avg": row["pop_sum"] / row["n"],
+            "popularity_min": row["pop_min"],
+            "popularity_max": row["pop_max"],
+            "duration_sum_min": row["ms_sum"] / 60000,
+            "duration_avg_min": row["ms_sum"] / 60000 / row["n"],
+            "duration_min": row["dur_min"],
+            "duration_max": row["dur_max"],
+        }
+        for row in rows if row["n"]
+    ]
@@ -0,0 +1,107 @@
+"""
+SQLite connection tuning and read routing for the "production SQLite"
+profile (TRACKS_SQLITE_PRODUCTION = True in settings).
+
+  * configure_sqlite() runs TRACKS_SQLITE_PRAGMAS on every new SQLite
+    connection: WAL journal mode (readers never wait for a writer, and a
+    writer waits only for other writers), synchronous=NORMAL (safe in WAL
+    mode), a larger page cache, memory-mapped reads and in-memory temp
+    tables. Connections on the read alias are also set query_only.
+
+  * ReadDatabaseMiddleware marks GET / HEAD requests as read-only, and
+    ReadRouter then sends their ORM reads to TRACKS_READ_DATABASE, a second
+    alias for the same file. Writes always go to "default", so a POST's
+    reads (validation, uniqueness checks) still see its own transaction.
+
+With the profile off the read alias is not configured: the middleware
+raises MiddlewareNotUsed and the router defers to Django's defaults.
+Queries issued while a streaming response is being consumed run after the
+middleware returns and use "default".
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+READ_METHODS = ("GET", "HEAD")
+
+_reading = ContextVar("tracks_reading", default=False)
+
+
+def read_alias():
+    """The read-only database alias, or None when it is not configured."""
+    alias = getattr(settings, "TRACKS_READ_DATABASE", None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver: apply TRACKS_SQLITE_PRAGMAS."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(getattr(settings, "TRACKS_SQLITE_PRAGMAS", {}))
+    if connection.alias == read_alias():
+        pragmas["query_only"] = "ON"
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@contextmanager
+def reading():
+    """Route ORM reads inside the block to the read alias (if configured)."""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+class ReadRouter:
+    def db_for_read(self, model, **hints):
+        if _reading.get():
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # instances read through the read alias are saved on "default"
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases are the same database
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, read_alias()}
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == read_alias():
+            return False
+        return None
+
+
+class ReadDatabaseMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if read_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method not in READ_METHODS:
+            return self.get_response(request)
+        with reading():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method not in READ_METHODS:
+            return await self.get_response(request)
+        with reading():
+            return await self.get_response(request)
@@ -0,0 +1,206 @@
+"""
+Fixed-bin histograms of the numeric track columns, sliced by release year,
+album type and genre (DistributionSlice rows).
+
+Each (year, album_type, genre, metric) slice stores {bin: track count}.
+Genre "" is the slice of every track; a track is also counted once in the
+slice of each of its genres. Histograms with the same bins add up, so any
+combination of slices is answered by summing them (merge_bins()) and
+reading quantiles off the cumulative counts (quantile()), without touching
+Track.
+
+The bins are exact for the 0-100 popularity columns, 0.1 minute wide for
+durations and 20 per decade (about 12% wide) for followers.
+
+Writes patch the slices with tally() / apply_tallies(): tally the affected
+tracks before the write, tally them again after it, and apply the
+difference. Besides the written tracks, that is every track of an artist /
+album whose tracks.rollups.CATALOG_FIELDS change. Loaders rebuild the table with the other
+rollups (tracks.rollups.rebuild_rollups).
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .genres import split_genres
+from .models import DistributionSlice, Track
+
+
+class LinearBins:
+    """Bins of a fixed width starting at 0; integer columns get width 1 (exact)."""
+
+    def __init__(self, lookup, width, integer=False):
+        self.lookup, self.width, self.integer = lookup, width, integer
+
+    def bin(self, value):
+        # round first: 3.5 / 0.1 is 34.999...
+        return math.floor(round(value / self.width, 6))
+
+    def edges(self, b):
+        return round(b * self.width, 6), round((b + 1) * self.width, 6)
+
+
+class LogBins:
+    """Bin 0 holds [0, 1); then `per_decade` bins per power of ten."""
+
+    integer = False
+
+    def __init__(self, lookup, per_decade):
+        self.lookup, self.per_decade = lookup, per_decade
+
+    def bin(self, value):
+        if value < 1:
+            return 0
+        return 1 + math.floor(round(math.log10(value) * self.per_decade, 6))
+
+    def edges(self, b):
+        if b == 0:
+            return 0, 1
+        return round(10 ** ((b - 1) / self.per_decade), 2), round(10 ** (b / self.per_decade), 2)
+
+
+METRICS = {
+    "track_popularity": LinearBins("track_popularity", 1, integer=True),
+    "artist_popularity": LinearBins("artist__popularity", 1, integer=True),
+    "track_duration_min": LinearBins("track_duration_min", 0.1),
+    "artist_followers": LogBins("artist__followers", per_decade=20),
+}
+
+ALL_GENRES = ""
+
+
+# -----------------------
+# maintenance
+# -----------------------
+
+def tally(queryset):
+    """
+    What the tracks in `queryset` contribute to the slices:
+    {(year, album_type, genre, metric): Counter({bin: tracks})}.
+    """
+    totals = {}
+    rows = queryset.order_by().values_list(
+        "album__release_date", "album__album_type", "artist__genres",
+        *(m.lookup for m in METRICS.values()),
+    )
+    for released, album_type, genres, *values in rows.iterator(chunk_size=5000):
+        bins = [(name, m.bin(v)) for (name, m), v in zip(METRICS.items(), values)]
+        for genre in (ALL_GENRES, *split_genres(genres)):
+            for name, b in bins:
+                key = (released.year, album_type, genre, name)
+                counter = totals.get(key)
+                if counter is None:
+                    counter = totals[key] = Counter()
+                counter[b] += 1
+    return totals
+
+
+def _stored_slices(keys, chunk_size=100):
+    """
+    The stored slices with the given keys ({key: DistributionSlice}): one
+    year IN list per (metric, genre, album type) rather than the cross
+    product of all the keys' values, which is most of the table.
+    """
+    years = defaultdict(set)
+    for year, album_type, genre, metric in keys:
+        years[(metric, genre, album_type)].add(year)
+    groups = list(years.items())
+    stored = {}
+    for i in range(0, len(groups), chunk_size):
+        match = Q(*(
+            Q(metric=metric, genre=genre, album_type=album_type, year__in=group_years)
+            for (metric, genre, album_type), group_years in groups[i:i + chunk_size]
+        ), _connector=Q.OR)
+        stored.update(
+            ((s.year, s.album_type, s.genre, s.metric), s) for s in DistributionSlice.objects.filter(match)
+        )
+    return stored
+
+
+def apply_tallies(removed, added):
+    """Subtract the `removed` tally from the stored slices and add `added`."""
+    keys = {k for k in set(removed) | set(added) if removed.get(k) != added.get(k)}
+    if not keys:
+        return
+    with transaction.atomic():
+        stored = _stored_slices(keys)
+        new, changed, empty = [], [], []
+        for key in keys:
+            row = stored.get(key)
+            bins = Counter({int(b): n for b, n in row.bins.items()}) if row is not None else Counter()
+            bins.update(added.get(key, {}))
+            bins.subtract(removed.get(key, {}))
+            bins = {str(b): n for b, n in sorted(bins.items()) if n > 0}
+            if row is None:
+                if bins:
+                    new.append(DistributionSlice(year=key[0], album_type=key[1], genre=key[2],
+                                                 metric=key[3], bins=bins))
+            elif bins:
+                row.bins = bins
+                changed.append(row)
+            else:
+                empty.append(row.pk)
+        # delete + insert like refresh_rollups(): bulk_update's CASE per column is far slower
+        DistributionSlice.objects.filter(pk__in=[s.pk for s in changed] + empty).delete()
+        DistributionSlice.objects.bulk_create(new + changed)
+
+
+def distribution_rows(queryset=None):
+    """DistributionSlice rows for `queryset` (all tracks by default), for rebuilds."""
+    totals = tally(Track.objects.all() if queryset is None else queryset)
+    return [
+        {"year": year, "album_type": album_type, "genre": genre, "metric": metric,
+         "bins": {str(b): n for b, n in sorted(bins.items())}}
+        for (year, album_type, genre, metric), bins in totals.items()
+    ]
+
+
+# -----------------------
+# queries
+# -----------------------
+
+def merge_bins(histograms):
+    """Sum stored {bin: count} histograms into one {int bin: count}."""
+    total = Counter()
+    for bins in histograms:
+        for b, n in bins.items():
+            total[int(b)] += n
+    return dict(sorted(total.items()))
+
+
+def quantile(metric, bins, q):
+    """
+    Nearest-rank q-quantile (0 < q <= 1) of a merged histogram: exact for
+    integer metrics, interpolated inside the bin otherwise.
+    """
+    count = sum(bins.values())
+    if not count:
+        return None
+    rank = max(math.ceil(q * count), 1)
+    seen = 0
+    binning = METRICS[metric]
+    for b, n in bins.items():
+        if seen + n >= rank:
+            lo, hi = binning.edges(b)
+            if binning.integer:
+                return lo
+            # the rank-th of the bin's n values, spread evenly across it
+            return round(lo + (hi - lo) * (rank - seen - 0.5) / n, 6)
+        seen += n
+
+
+def slice_bins(metrics, year_from=None, year_to=None, album_type=None, genre=None):
+    """{metric: merged bins} over the slices matching the filters."""
+    qs = DistributionSlice.objects.filter(metric__in=metrics, genre=genre or ALL_GENRES)
+    if year_from is not None:
+        qs = qs.filter(year__gte=year_from)
+    if year_to is not None:
+        qs = qs.filter(year__lte=year_to)
+    if album_type:
+        qs = qs.filter(album_type__iexact=album_type)
+    histograms = {metric: [] for metric in metrics}
+    for metric, bins in qs.values_list("metric", "bins"):
+        histograms[metric].append(bins)
+    return {metric: merge_bins(h) for metric, h in histograms.items()}
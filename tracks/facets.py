@@ -0,0 +1,100 @@
+"""
+Facet / option data for filter UIs.
+
+facet_counts() answers "how many tracks per album_type / year / explicit /
+genre" for an already-filtered queryset in two grouped queries.
+
+list_page_facets() gathers everything the TrackListView sidebar and
+dropdowns need in one pass and caches it under the data version, so a page
+view on a warm cache only runs its own paginated query. (Artist names are
+suggested as you type by /api/tracks/autocomplete/ instead.)
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Q
+from django.db.models.functions import ExtractYear
+
+from . import cube
+from .genres import genre_counts
+from .models import ArtistSummary, Track
+from .versioning import current_version
+
+CLEAN_HITS_MIN_POPULARITY = 80
+
+
+def _compute_list_page_facets():
+    # one genre GROUP BY feeds both the "top genres" card and the dropdown
+    genres = list(genre_counts().values_list("name", "count"))
+
+    clean = Track.objects.aggregate(
+        count=Count("id", filter=Q(explicit=False, track_popularity__gte=CLEAN_HITS_MIN_POPULARITY)),
+        avg=Avg("track_popularity", filter=Q(explicit=False, track_popularity__gte=CLEAN_HITS_MIN_POPULARITY)),
+    )
+
+    return {
+        "album_types": list(
+            Track.objects.values_list("album__album_type", flat=True).distinct().order_by("album__album_type")
+        ),
+        "years": cube.years(),
+        "top_artists_ui": [
+            {
+                "artist_name": a.artist_name,
+                "track_count": a.track_count,
+                "avg_popularity": a.popularity_sum / a.track_count,
+            }
+            for a in ArtistSummary.objects.filter(track_count__gt=0).order_by("-track_count", "artist_name")[:8]
+        ],
+        "top_genres_ui": genres[:10],
+        "clean_hits_ui": {
+            "min_popularity": CLEAN_HITS_MIN_POPULARITY,
+            "count": clean["count"],
+            "avg_popularity": clean["avg"],
+        },
+        "genres": sorted(name for name, _ in genres),
+    }
+
+
+def list_page_facets(timeout=None):
+    """Cached dropdown + sidebar data for the tracks list page (invalidated on writes)."""
+    key = f"tracks:facets:list-page:{current_version()}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_list_page_facets()
+        cache.set(key, facets, timeout)
+    return facets
+
+
+def facet_counts(queryset, top_genres=20):
+    """
+    Per-dimension counts for a filtered Track queryset.
+
+    album_type, year and explicit come from a single GROUP BY over their
+    combination (a few hundred rows at most) marginalised in Python; genres
+    need the link table, so they take a second grouped query.
+    """
+    combos = (
+        queryset.order_by()
+        .annotate(year=ExtractYear("album__release_date"))
+        .values("year", "explicit", album_type=F("album__album_type"))
+        .annotate(count=Count("id"))
+    )
+
+    totals = {"album_type": {}, "year": {}, "explicit": {}}
+    total = 0
+    for row in combos:
+        total += row["count"]
+        for dim in totals:
+            totals[dim][row[dim]] = totals[dim].get(row[dim], 0) + row["count"]
+
+    def as_rows(counts, key):
+        return [{"value": v, "count": c} for v, c in sorted(counts.items(), key=key)]
+
+    return {
+        "total": total,
+        "album_type": as_rows(totals["album_type"], key=lambda kv: (-kv[1], kv[0])),
+        "year": as_rows(totals["year"], key=lambda kv: -kv[0]),
+        "explicit": as_rows(totals["explicit"], key=lambda kv: kv[0]),
+        "genre": [
+            {"value": name, "count": count}
+            for name, count in genre_counts(queryset).values_list("name", "count")[:top_genres]
+        ],
+    }
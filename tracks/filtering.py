@@ -0,0 +1,49 @@
+"""
+Query-parameter filters shared by the track list API, export and facets.
+"""
+from .catalog import filter_by_artist
+from .genres import filter_by_genre
+
+
+def filter_tracks(qs, p):
+    """Apply the TrackListCreateView filter params in `p` (a QueryDict) to a Track queryset."""
+    artist = p.get("artist")
+    album_type = p.get("album_type")
+    genre = p.get("genre")
+    explicit = p.get("explicit")
+    min_pop = p.get("min_popularity")
+    min_followers = p.get("min_followers")
+    year = p.get("year")
+    from_date = p.get("from_date")
+    to_date = p.get("to_date")
+
+    if artist:
+        qs = filter_by_artist(qs, artist)
+
+    if album_type:
+        qs = qs.filter(album__album_type__iexact=album_type)
+
+    if genre:
+        qs = filter_by_genre(qs, genre)
+
+    if explicit is not None:
+        if explicit.lower() == "true":
+            qs = qs.filter(explicit=True)
+        elif explicit.lower() == "false":
+            qs = qs.filter(explicit=False)
+
+    if min_pop:
+        qs = qs.filter(track_popularity__gte=int(min_pop))
+
+    if min_followers:
+        qs = qs.filter(artist__followers__gte=int(min_followers))
+
+    if year:
+        qs = qs.filter(album__release_date__year=int(year))
+
+    if from_date:
+        qs = qs.filter(album__release_date__gte=from_date)
+    if to_date:
+        qs = qs.filter(album__release_date__lte=to_date)
+
+    return qs
@@ -1,28 +1,56 @@
 from django import forms
-from .models import Track
+from django.core.exceptions import ValidationError
+from django.utils.text import capfirst
+
+from .catalog import ALBUM_FIELDS, ARTIST_FIELDS, FLAT_FIELDS, TRACK_FIELDS, flat_values, model_field, save_track
+from .models import Album, Artist, Track
+
+
+def _formfield(name, **kwargs):
+    """Form field for a flat artist / album name, labelled as the old Track field was."""
+    return model_field(name).formfield(label=capfirst(name.replace("_", " ")), **kwargs)
 
 
 class TrackForm(forms.ModelForm):
+    # artist / album values are stored on Artist / Album (tracks.catalog)
+    artist_name = _formfield("artist_name")
+    artist_popularity = _formfield("artist_popularity")
+    artist_followers = _formfield("artist_followers")
+    artist_genres = _formfield("artist_genres", widget=forms.Textarea(attrs={"rows": 2}))
+    album_id = _formfield("album_id")
+    album_name = _formfield("album_name")
+    album_release_date = _formfield("album_release_date", widget=forms.DateInput(attrs={"type": "date"}))
+    album_total_tracks = _formfield("album_total_tracks")
+    album_type = _formfield("album_type")
+
+    field_order = FLAT_FIELDS
+
     class Meta:
         model = Track
-        fields = [
-            "track_id",
-            "track_name",
-            "track_number",
-            "track_popularity",
-            "explicit",
-            "artist_name",
-            "artist_popularity",
-            "artist_followers",
-            "artist_genres",
-            "album_id",
-            "album_name",
-            "album_release_date",
-            "album_total_tracks",
-            "album_type",
-            "track_duration_min",
-        ]
-        widgets = {
-            "album_release_date": forms.DateInput(attrs={"type": "date"}),
-            "artist_genres": forms.Textarea(attrs={"rows": 2}),
-        }
+        fields = TRACK_FIELDS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            for name, value in flat_values(self.instance).items():
+                self.initial.setdefault(name, value)
+
+    def clean(self):
+        cleaned = super().clean()
+        # the model-level checks Track.clean() used to run on these columns
+        for model, fields in ((Artist, ARTIST_FIELDS), (Album, ALBUM_FIELDS)):
+            obj = model(**{field: cleaned.get(flat) for flat, field in fields.items()})
+            try:
+                obj.clean()
+            except ValidationError as exc:
+                flat = {field: name for name, field in fields.items()}
+                for field, errors in exc.message_dict.items():
+                    self.add_error(flat.get(field), errors)
+        return cleaned
+
+    def save(self, commit=True):
+        if not commit:
+            raise ValueError("TrackForm saves the artist and album too; call save() with commit=True.")
+        row = {name: self.cleaned_data[name] for name in FLAT_FIELDS}
+        self.instance = save_track(row, self.instance if self.instance.pk is not None else None)
+        return self.instance
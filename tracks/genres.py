@@ -0,0 +1,134 @@
+"""
+Helpers for the normalised genre tables (Genre / TrackGenre).
+
+`Artist.genres` (the flat `artist_genres` the CSV, the API and the forms
+write) stays the source of truth, and the per-track link table is derived
+from it.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Genre, Track, TrackGenre
+
+
+def split_genres(text):
+    """Split a comma-separated genre string into unique, lower-cased names (order kept)."""
+    if not text:
+        return []
+    seen = []
+    for x in text.split(","):
+        x = x.strip().lower()
+        if x and x not in seen:
+            seen.append(x)
+    return seen
+
+
+def _genre_ids(names):
+    """Return {name: id}, creating any genres that do not exist yet."""
+    names = set(names)
+    if not names:
+        return {}
+    Genre.objects.bulk_create([Genre(name=n) for n in names], ignore_conflicts=True)
+    return dict(Genre.objects.filter(name__in=names).values_list("name", "id"))
+
+
+def sync_track_genres(track):
+    """Rebuild the genre links for a single saved track."""
+    names = split_genres(track.artist.genres)
+    ids = _genre_ids(names)
+
+    with transaction.atomic():
+        TrackGenre.objects.filter(track_id=track.pk).delete()
+        TrackGenre.objects.bulk_create(
+            [TrackGenre(track_id=track.pk, genre_id=ids[n]) for n in names]
+        )
+
+
+def rebuild_track_genres(queryset=None, batch_size=2000):
+    """
+    Bulk-rebuild genre links for `queryset` (all tracks by default).
+    Used by the loaders, where bulk inserts skip the post_save signal.
+    Tracks are streamed in batches, so memory does not grow with the table.
+    """
+    qs = Track.objects.all() if queryset is None else queryset
+    ids = {}
+    total = 0
+
+    # plain executemany: building a model instance per link dominated large rebuilds
+    meta = TrackGenre._meta
+    insert_sql = "INSERT INTO {} ({}, {}) VALUES (%s, %s)".format(
+        connection.ops.quote_name(meta.db_table),
+        connection.ops.quote_name(meta.get_field("track").column),
+        connection.ops.quote_name(meta.get_field("genre").column),
+    )
+
+    def link(batch):
+        new = {n for _, names in batch for n in names if n not in ids}
+        ids.update(_genre_ids(new))
+        links = [(pk, ids[n]) for pk, names in batch for n in names]
+        with connection.cursor() as cursor:
+            cursor.executemany(insert_sql, links)
+        return len(links)
+
+    with transaction.atomic():
+        if queryset is None:
+            TrackGenre.objects.all().delete()
+        else:
+            TrackGenre.objects.filter(track_id__in=qs.values("id")).delete()
+
+        batch = []
+        rows = qs.order_by().values_list("id", "artist__genres").iterator(chunk_size=batch_size)
+        for pk, text in rows:
+            batch.append((pk, split_genres(text)))
+            if len(batch) >= batch_size:
+                total += link(batch)
+                batch = []
+        if batch:
+            total += link(batch)
+
+    # drop genres no track refers to any more
+    Genre.objects.filter(track_genres__isnull=True).delete()
+    return total
+
+
+def verify_track_genres():
+    """
+    Compare the stored links with the artists' genres.
+    Returns [(track pk, stored names, expected names), ...] for mismatched tracks only.
+    """
+    stored = defaultdict(set)
+    for pk, name in TrackGenre.objects.values_list("track_id", "genre__name").iterator(chunk_size=5000):
+        stored[pk].add(name)
+
+    diffs = []
+    rows = Track.objects.order_by("id").values_list("id", "artist__genres").iterator(chunk_size=5000)
+    for pk, text in rows:
+        expected = set(split_genres(text))
+        names = stored.get(pk, set())
+        if names != expected:
+            diffs.append((pk, sorted(names), sorted(expected)))
+    return diffs
+
+
+def filter_by_genre(qs, genre):
+    """
+    Restrict a Track queryset to tracks with a genre containing `genre`.
+    The substring match runs against the small Genre table, then joins through
+    the indexed link table (no duplicate rows when several genres match).
+    """
+    matching = TrackGenre.objects.filter(genre__name__icontains=genre.strip()).values("track_id")
+    return qs.filter(id__in=matching)
+
+
+def genre_counts(queryset=None):
+    """Genres annotated with their track count, most common first."""
+    qs = Genre.objects.all()
+    if queryset is not None:
+        qs = qs.filter(track_genres__track__in=queryset)
+    return (
+        qs.annotate(count=Count("track_genres"))
+        .filter(count__gt=0)
+        .order_by("-count", "name")
+    )
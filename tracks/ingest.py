@@ -0,0 +1,121 @@
+"""
+CSV parsing for the track loaders.
+
+Nothing here touches Django models, so the functions can run inside
+multiprocessing workers (see `manage.py ingest_tracks`) as well as in
+load_spotify.py.
+"""
+import csv
+import os
+import time
+from datetime import date, datetime
+
+
+def parse_bool(v):
+    return str(v).strip().lower() in ("true", "1", "yes", "y")
+
+
+def parse_int(v, default=0):
+    try:
+        return int(float(v))
+    except Exception:
+        return default
+
+
+def parse_float(v, default=0.0):
+    try:
+        return float(v)
+    except Exception:
+        return default
+
+
+def parse_date(v):
+    return datetime.strptime(v.strip(), "%Y-%m-%d").date()
+
+
+# CSV columns the raw ingester reads, in the order parse_record() returns them
+INGEST_COLUMNS = [
+    "track_id", "track_name", "track_number", "track_popularity", "explicit",
+    "artist_name", "artist_popularity", "artist_followers", "artist_genres",
+    "album_id", "album_name", "album_release_date", "album_total_tracks",
+    "album_type", "track_duration_min",
+]
+
+
+def read_header(path):
+    """Return (column index map, byte offset of the first data line)."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        offset = f.tell()
+    names = next(csv.reader([header.decode("utf-8-sig")]))
+    index = {name.strip(): i for i, name in enumerate(names)}
+    missing = [c for c in INGEST_COLUMNS if c not in index]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return index, offset
+
+
+def byte_ranges(path, start, chunk_bytes):
+    """Split [start, EOF) into roughly chunk_bytes-sized (start, end) ranges."""
+    size = os.path.getsize(path)
+    return [(s, min(s + chunk_bytes, size)) for s in range(start, size, chunk_bytes)]
+
+
+def _db_row(fields, index):
+    """One CSV record -> tuple of DB values in INGEST_COLUMNS order (raises on bad data)."""
+    g = lambda name: fields[index[name]]  # noqa: E731
+    released = date.fromisoformat(g("album_release_date").strip())
+    return (
+        g("track_id"),
+        g("track_name"),
+        parse_int(g("track_number")),
+        parse_int(g("track_popularity")),
+        int(parse_bool(g("explicit"))),
+        g("artist_name"),
+        parse_int(g("artist_popularity")),
+        parse_int(g("artist_followers")),
+        g("artist_genres").strip(),
+        g("album_id"),
+        g("album_name"),
+        released.isoformat(),
+        parse_int(g("album_total_tracks")),
+        g("album_type"),
+        parse_float(g("track_duration_min")),
+    )
+
+
+def parse_range(args):
+    """
+    Worker entry point: parse the lines that *start* inside [start, end).
+
+    Returns (rows, bad_row_count, seconds spent parsing). Assumes one record
+    per line, i.e. no newlines inside quoted fields.
+    """
+    path, start, end, index = args
+    t0 = time.perf_counter()
+
+    lines = []
+    with open(path, "rb") as f:
+        f.seek(start - 1)
+        f.readline()  # finish the line that straddles `start` (owned by the previous range)
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8"))
+            pos += len(line)
+
+    rows, bad = [], 0
+    width = len(index)
+    for fields in csv.reader(lines):
+        if not fields:
+            continue
+        if len(fields) < width:
+            bad += 1
+            continue
+        try:
+            rows.append(_db_row(fields, index))
+        except (ValueError, KeyError):
+            bad += 1
+    return rows, bad, time.perf_counter() - t0
@@ -0,0 +1,168 @@
+"""
+Opt-in per-request SQL and timing instrumentation.
+
+With TRACKS_INSTRUMENTATION = True, every request records:
+
+  * the number of SQL queries and the total time spent in them, across all
+    database aliases (via connection.execute_wrapper);
+  * serialize: time DRF spends rendering response.data (JSON encoding);
+  * render: time spent rendering a template response;
+  * total: wall time through the rest of the middleware stack and the view.
+
+These are sent back as a `Server-Timing` header (visible in browser dev
+tools) and logged as one line on the "tracks.instrumentation" logger. A
+warning is logged when a request runs more than TRACKS_QUERY_BUDGET
+queries, or repeats the same SQL (ignoring parameters and IN-list length)
+TRACKS_REPEATED_QUERY_THRESHOLD times or more, the usual sign of an N+1.
+
+The request's RequestMetrics is also kept in a ContextVar, so queries the
+async views run on worker threads (tracks.concurrency) count towards it:
+the worker wraps its own connections with recording().
+
+When the setting is off the middleware raises MiddlewareNotUsed, so Django
+drops it from the chain and it costs nothing. Queries issued while a
+streaming response is being consumed happen after the middleware returns
+and are not counted.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("tracks.instrumentation")
+
+DEFAULT_QUERY_BUDGET = 15
+DEFAULT_REPEAT_THRESHOLD = 5
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_WHITESPACE = re.compile(r"\s+")
+_TRANSACTION_SQL = ("SAVEPOINT", "RELEASE", "ROLLBACK", "BEGIN", "COMMIT")
+
+_current = ContextVar("tracks_request_metrics", default=None)
+
+
+def normalize_sql(sql):
+    """Collapse what varies between "the same" query: whitespace and IN-list length."""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", sql.strip()))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+        self.phases = {}
+        # worker threads record into the same metrics concurrently
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.sql_seconds += elapsed
+                self.queries += 1
+                if not sql.lstrip().upper().startswith(_TRANSACTION_SQL):
+                    self.statements[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self, total_seconds):
+        parts = [f'sql;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries"']
+        for name, seconds in self.phases.items():
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def recording(metrics=None):
+    """Count this thread's queries into `metrics` (default: the current request's, if any)."""
+    if metrics is None:
+        metrics = _current.get()
+    with ExitStack() as stack:
+        if metrics is not None:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(metrics))
+        yield
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "TRACKS_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budget = getattr(settings, "TRACKS_QUERY_BUDGET", DEFAULT_QUERY_BUDGET)
+        self.repeat_threshold = getattr(
+            settings, "TRACKS_REPEATED_QUERY_THRESHOLD", DEFAULT_REPEAT_THRESHOLD,
+        )
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request._instrumentation = metrics
+
+        t0 = time.perf_counter()
+        token = _current.set(metrics)
+        try:
+            with recording(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - t0
+
+        response["Server-Timing"] = metrics.server_timing(total)
+        self._log(request, response, metrics, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # runs just before the handler renders the response; the callback runs just after
+        metrics = getattr(request, "_instrumentation", None)
+        if metrics is None:
+            return response
+        phase = "serialize" if hasattr(response, "accepted_renderer") else "render"
+        started = time.perf_counter()
+
+        def rendered(r):
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _log(self, request, response, metrics, total):
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": metrics.queries,
+            "sql_ms": round(metrics.sql_seconds * 1000, 2),
+            **{f"{name}_ms": round(s * 1000, 2) for name, s in metrics.phases.items()},
+            "total_ms": round(total * 1000, 2),
+        }
+        logger.info(
+            " ".join(f"{k}={v}" for k, v in fields.items()),
+            extra={"instrumentation": fields},
+        )
+
+        if metrics.queries > self.budget:
+            logger.warning(
+                "query budget exceeded: %s %s ran %d queries (budget %d)",
+                request.method, request.path, metrics.queries, self.budget,
+                extra={"instrumentation": fields},
+            )
+        for sql, count in metrics.repeated(self.repeat_threshold):
+            logger.warning(
+                "repeated query (possible N+1): %s %s ran %dx: %s",
+                request.method, request.path, count, sql[:300],
+                extra={"instrumentation": fields},
+            )
@@ -0,0 +1,189 @@
+import json
+import statistics
+import threading
+import time
+from itertools import count
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from tracks.batch import apply_batch
+from tracks.catalog import prune_catalog
+from tracks.ingest import INGEST_COLUMNS
+from tracks.management.commands.bench_endpoints import CASES, percentile
+from tracks.models import Track
+from tracks.synthetic import generate_rows
+
+DEFAULT_CASES = ["api list", "api list filtered+ordered", "api list search", "facets", "clean hits", "top artists"]
+PREFIX = "BENCH-C"
+
+
+def _load_rows(batch_size, seed):
+    """Endless batches of synthetic create operations under their own artist / album names."""
+    for batch in count():
+        rows = []
+        for n, row in enumerate(generate_rows(batch_size, seed=seed + batch)):
+            values = dict(zip(INGEST_COLUMNS, row))
+            rows.append({
+                **values, "op": "create", "track_id": f"{PREFIX}-{batch}-{n}",
+                "artist_name": f"{PREFIX} {values['artist_name']}", "album_id": f"{PREFIX}-{values['album_id']}",
+            })
+        yield rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Read throughput of the GET endpoints from several threads, first alone and "
+        "then while a writer thread commits loader-sized batches (created, then deleted "
+        "again). Compare runs with and without TRACKS_SQLITE_PRODUCTION (WAL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Reader threads.")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Tracks per writer transaction.")
+        parser.add_argument("--only", action="append", default=[], help="Case labels from bench_endpoints (GET only).")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    # -----------------------
+    # threads
+    # -----------------------
+
+    def _reader(self, paths, stop, samples, errors):
+        client = Client()
+        try:
+            for i in count():
+                if stop.is_set():
+                    break
+                path, params = paths[i % len(paths)]
+                t0 = time.perf_counter()
+                try:
+                    response = client.get(path, params)
+                    ok = response.status_code == 200
+                except Exception:
+                    ok = False
+                if ok:
+                    samples.append((time.perf_counter() - t0) * 1000)
+                else:
+                    errors.append(path)
+        finally:
+            connections.close_all()
+
+    def _writer(self, batch_size, stop, stats):
+        try:
+            for rows in _load_rows(batch_size, seed=1000):
+                if stop.is_set():
+                    break
+                t0 = time.perf_counter()
+                apply_batch(rows)
+                apply_batch([{"op": "delete", "track_id": row["track_id"]} for row in rows])
+                stats["batches"] += 2
+                stats["seconds"] += time.perf_counter() - t0
+        except Exception as exc:
+            stats["error"] = repr(exc)
+        finally:
+            connections.close_all()
+
+    def _phase(self, paths, opts, with_writer):
+        stop = threading.Event()
+        samples, errors = [], []
+        writer = {"batches": 0, "seconds": 0.0, "error": None}
+        threads = [
+            threading.Thread(target=self._reader, args=(paths, stop, samples, errors))
+            for _ in range(opts["readers"])
+        ]
+        if with_writer:
+            threads.append(threading.Thread(target=self._writer, args=(opts["batch_size"], stop, writer)))
+        for t in threads:
+            t.start()
+        time.sleep(opts["seconds"])
+        stop.set()
+        for t in threads:
+            t.join()
+
+        samples.sort()
+        result = {
+            "requests": len(samples),
+            "errors": len(errors),
+            "requests_per_s": len(samples) / opts["seconds"],
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "mean_ms": statistics.fmean(samples) if samples else None,
+        }
+        if with_writer:
+            result["writer"] = {
+                "transactions": writer["batches"],
+                "ms_per_transaction": 1000 * writer["seconds"] / writer["batches"] if writer["batches"] else None,
+                "error": writer["error"],
+            }
+        return result
+
+    # -----------------------
+    # main
+    # -----------------------
+
+    def handle(self, *args, **opts):
+        if not Track.objects.exists():
+            raise CommandError("No tracks loaded; run load_spotify.py or ingest_tracks first.")
+        labels = opts["only"] or DEFAULT_CASES
+        cases = [c for c in CASES if c[0] in labels and c[2] == "GET"]
+        if not cases:
+            raise CommandError("No GET cases match --only.")
+        paths = [(reverse(name), params) for _, name, _, params in cases]
+        opts["readers"] = max(opts["readers"], 1)
+        opts["batch_size"] = max(opts["batch_size"], 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+
+        phases = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for name, with_writer in (("readers only", False), ("readers + writer", True)):
+                    phases[name] = self._phase(paths, opts, with_writer)
+        finally:
+            # a writer stopped between its create and delete leaves tracks behind
+            leftover = list(Track.objects.filter(track_id__startswith=PREFIX).values_list("track_id", flat=True))
+            if leftover:
+                apply_batch([{"op": "delete", "track_id": track_id} for track_id in leftover])
+            prune_catalog()
+
+        report = {
+            "meta": {
+                "journal_mode": journal_mode,
+                "read_database": getattr(settings, "TRACKS_READ_DATABASE", None),
+                "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+                "readers": opts["readers"],
+                "seconds": opts["seconds"],
+                "batch_size": opts["batch_size"],
+                "cases": [c[0] for c in cases],
+            },
+            "phases": phases,
+        }
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        meta = report["meta"]
+        self.stdout.write(
+            f"journal_mode={meta['journal_mode']} read alias={meta['read_database']} "
+            f"CONN_MAX_AGE={meta['conn_max_age']}, {meta['readers']} readers, {meta['seconds']}s per phase"
+        )
+        self.stdout.write(f"{'phase':<18} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+        for name, p in phases.items():
+            fmt = lambda v: f"{v:7.2f}ms" if v is not None else "        -"  # noqa: E731
+            self.stdout.write(
+                f"{name:<18} {p['requests_per_s']:>8.1f} {fmt(p['p50_ms'])} {fmt(p['p95_ms'])} "
+                f"{fmt(p['p99_ms'])} {p['errors']:>7}"
+            )
+            if "writer" in p:
+                w = p["writer"]
+                per = f"{w['ms_per_transaction']:.1f}ms" if w["ms_per_transaction"] else "-"
+                self.stdout.write(f"  writer: {w['transactions']} transactions, {per} each"
+                                  + (f", stopped: {w['error']}" if w["error"] else ""))
@@ -0,0 +1,271 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from tracks import urls as api_urls, web_urls
+from tracks.models import Track
+
+CLEAN_HITS_QUERY = {
+    "min_popularity": "80", "genre": "pop", "year_from": "2019", "year_to": "2021", "album_type": "album",
+}
+
+NEW_TRACK = {
+    "track_id": "BENCH-0001", "track_name": "Bench Track", "track_number": 1,
+    "track_popularity": 55, "explicit": False, "artist_name": "Bench Artist",
+    "artist_popularity": 40, "artist_followers": 1234, "artist_genres": "pop, indie pop",
+    "album_id": "BENCH-ALB", "album_name": "Bench Album", "album_release_date": "2021-06-01",
+    "album_total_tracks": 10, "album_type": "album", "track_duration_min": 3.2,
+}
+
+# (label, url name, method, query/body). "<pk>" routes (and "<pk>" query values) are
+# pointed at an existing track.
+# Writes run inside a transaction that is rolled back after every request.
+CASES = [
+    ("api list", "api-track-list-create", "GET", {}),
+    ("api list filtered+ordered", "api-track-list-create", "GET",
+     {"genre": "pop", "min_popularity": "70", "ordering": "-track_popularity"}),
+    ("api list search", "api-track-list-create", "GET", {"search": "love"}),
+    ("api list approx count", "api-track-list-create", "GET", {"explicit": "false", "count": "approx"}),
+    ("api create", "api-track-list-create", "POST", NEW_TRACK),
+    ("api batch", "api-track-batch", "POST",
+     [{"op": "create", **NEW_TRACK, "track_id": f"BENCH-B{i:03}"} for i in range(50)]),
+    ("export ndjson", "api-track-export", "GET", {"min_popularity": "80", "genre": "pop"}),
+    ("export csv", "api-track-export", "GET", {"min_popularity": "80", "genre": "pop", "format": "csv"}),
+    ("facets", "api-track-facets", "GET", {"genre": "pop", "top": "10"}),
+    ("distributions", "api-track-distributions", "GET", {}),
+    ("distributions sliced", "api-track-distributions", "GET",
+     {"genre": "pop", "year": "2020", "metrics": "track_popularity", "quantiles": "0.5,0.9"}),
+    ("cube", "api-track-cube", "GET", {"group_by": "year,album_type"}),
+    ("cube by genre sliced", "api-track-cube", "GET",
+     {"group_by": "genre,explicit", "year_from": "2015", "year_to": "2020", "album_type": "album"}),
+    ("autocomplete short prefix", "api-track-autocomplete", "GET", {"q": "t"}),
+    ("autocomplete", "api-track-autocomplete", "GET", {"q": "taylor sw"}),
+    ("similar tracks", "api-track-similar", "GET", {"k": "10"}),
+    ("similar tracks batch", "api-tracks-similar", "GET", {"ids": "<pk>", "k": "10"}),
+    ("top artists", "api-top-artists", "GET", {}),
+    ("releases by year", "api-releases-by-year", "GET", {}),
+    ("top genres", "api-top-genres", "GET", {"top": "20"}),
+    ("clean hits", "api-clean-hits", "GET", CLEAN_HITS_QUERY),
+    ("clean hits defaults", "api-clean-hits", "GET", {}),
+    ("artist albumtype breakdown", "api-artist-albumtype-breakdown", "GET", {"artist": "drake"}),
+    ("dashboard", "api-dashboard", "GET", {"artist": "drake"}),
+    ("web list", "tracks-web-list", "GET", {}),
+    ("web list filtered", "tracks-web-list", "GET", {"q": "love", "explicit": "false", "min_popularity": "50"}),
+    ("web create form", "tracks-web-create", "GET", {}),
+    ("web create", "tracks-web-create", "POST", NEW_TRACK),
+    ("web detail", "tracks-web-detail", "GET", {}),
+    ("web edit form", "tracks-web-edit", "GET", {}),
+    ("web edit", "tracks-web-edit", "POST", NEW_TRACK),
+    ("web delete confirm", "tracks-web-delete", "GET", {}),
+    ("web delete", "tracks-web-delete", "POST", {}),
+]
+
+
+def route_names():
+    """Every named route in tracks/urls.py and tracks/web_urls.py."""
+    return {
+        p.name for module in (api_urls, web_urls) for p in module.urlpatterns
+        if isinstance(p, URLPattern) and p.name
+    }
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every tracks route in-process with the test client: p50/p95/p99 "
+        "latency, queries and peak Python memory per request, reported as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=30, help="Timed requests per case.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per case.")
+        parser.add_argument("--memory-repeat", type=int, default=3, help="Requests traced for memory per case.")
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Clear the Django cache before every request (measures uncached paths).",
+        )
+        parser.add_argument("--only", action="append", default=[], help="Run cases whose label contains this.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="Earlier JSON report: print p50/p95 changes against it.")
+
+    # -----------------------
+    # one request
+    # -----------------------
+
+    def _request(self, client, method, path, params, is_api):
+        if method == "GET":
+            response = client.get(path, params)
+        elif is_api:
+            response = client.post(path, json.dumps(params), content_type="application/json")
+        else:
+            response = client.post(path, params)
+        # streaming responses do their work while being iterated
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        response.close()
+        return response.status_code, size
+
+    def _call(self, client, case, path, is_write, cold):
+        _, _, method, params = case
+        if cold:
+            cache.clear()
+        if not is_write:
+            return self._request(client, method, path, params, path.startswith("/api/"))
+        with transaction.atomic():
+            result = self._request(client, method, path, params, path.startswith("/api/"))
+            transaction.set_rollback(True)
+        return result
+
+    # -----------------------
+    # one case
+    # -----------------------
+
+    def _run_case(self, client, case, pk, opts):
+        label, name, method, params = case
+        path = reverse(name, kwargs={"pk": pk}) if "<int:pk>" in self._patterns[name] else reverse(name)
+        if method == "GET":
+            case = (label, name, method, {k: v.replace("<pk>", str(pk)) for k, v in params.items()})
+        is_write = method != "GET"
+
+        for _ in range(opts["warmup"]):
+            self._call(client, case, path, is_write, opts["cold"])
+
+        # queries the async views run on worker-thread connections (tracks.concurrency)
+        # are not seen by CaptureQueriesContext
+        samples, queries = [], []
+        status = size = None
+        for _ in range(opts["repeat"]):
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                status, size = self._call(client, case, path, is_write, opts["cold"])
+                samples.append((time.perf_counter() - t0) * 1000)
+            queries.append(len(ctx.captured_queries))
+
+        # tracemalloc slows everything down, so memory gets its own pass
+        peaks = []
+        for _ in range(opts["memory_repeat"]):
+            tracemalloc.start()
+            try:
+                self._call(client, case, path, is_write, opts["cold"])
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            finally:
+                tracemalloc.stop()
+
+        samples.sort()
+        total_s = sum(samples) / 1000
+        return {
+            "label": label,
+            "route": name,
+            "method": method,
+            "path": path,
+            "status": status,
+            "bytes": size,
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "mean_ms": statistics.fmean(samples),
+            "max_ms": samples[-1],
+            "requests_per_s": len(samples) / total_s if total_s else None,
+            "queries": statistics.median(queries),
+            "queries_max": max(queries),
+            "peak_kib": statistics.median(peaks) if peaks else None,
+        }
+
+    # -----------------------
+    # main
+    # -----------------------
+
+    def handle(self, *args, **opts):
+        missing = route_names() - {case[1] for case in CASES}
+        if missing:
+            raise CommandError(f"No benchmark case for route(s): {', '.join(sorted(missing))}")
+
+        pk = Track.objects.order_by("id").values_list("id", flat=True).first()
+        if pk is None:
+            raise CommandError("No tracks loaded; run load_spotify.py or ingest_tracks first.")
+
+        self._patterns = {
+            p.name: str(p.pattern) for module in (api_urls, web_urls) for p in module.urlpatterns
+        }
+        cases = [c for c in CASES if not opts["only"] or any(s in c[0] for s in opts["only"])]
+        opts["repeat"] = max(opts["repeat"], 1)
+
+        client = Client()
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for case in cases:
+                results.append(self._run_case(client, case, pk, opts))
+                self.stderr.write(f"  {case[0]:<32} p50 {results[-1]['p50_ms']:8.2f}ms")
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_revision": _git_revision(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "tracks": Track.objects.count(),
+                "repeat": opts["repeat"],
+                "warmup": opts["warmup"],
+                "cache": "cold" if opts["cold"] else "warm",
+            },
+            "cases": results,
+        }
+
+        text = json.dumps(report, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w") as f:
+                f.write(text + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
+        else:
+            self.stdout.write(text)
+
+        if opts["compare"]:
+            self._compare(opts["compare"], results)
+
+    def _compare(self, path, results):
+        with open(path) as f:
+            before = {c["label"]: c for c in json.load(f)["cases"]}
+        self.stderr.write(f"\n{'case':<32} {'p50 before':>11} {'after':>9} {'p95 before':>11} {'after':>9}")
+        for case in results:
+            old = before.get(case["label"])
+            if old is None:
+                continue
+            self.stderr.write(
+                f"{case['label']:<32} {old['p50_ms']:>9.2f}ms {case['p50_ms']:>7.2f}ms "
+                f"{old['p95_ms']:>9.2f}ms {case['p95_ms']:>7.2f}ms"
+            )
@@ -0,0 +1,147 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F
+
+from tracks.catalog import filter_by_artist, flat_lookup
+from tracks.facets import facet_counts
+from tracks.models import Album, Artist, Track
+from tracks.pagination import paginate_keyset
+from tracks.views import _clean_hits_orm
+
+
+def _page(ordering):
+    qs = Track.objects.order_by(flat_lookup(ordering))
+    return lambda: list(paginate_keyset(qs, None, 100).object_list)
+
+
+def _clean_hits(**filters):
+    f = {"min_popularity": 80, "genre": None, "year_from": None, "year_to": None, "album_type": None}
+    f.update(filters)
+
+    def run():
+        summary, top_tracks = _clean_hits_orm(f)
+        return summary, list(top_tracks)
+    return run
+
+
+# (name, callable) pairs mirroring the ORM work behind each endpoint
+CASES = [
+    ("clean-hits", _clean_hits()),
+    ("clean-hits genre+years", _clean_hits(genre="pop", year_from=2019, year_to=2021, album_type="album")),
+    ("artist-albumtype-breakdown", lambda: list(
+        filter_by_artist(Track.objects.all(), "drake")
+        .values(artist_name=F("artist__name"), album_type=F("album__album_type"))
+        .annotate(track_count=Count("id"), avg_track_popularity=Avg("track_popularity"))
+        .order_by("artist_name", "album_type")
+    )),
+    ("list page ?ordering=-track_popularity", _page("-track_popularity")),
+    ("list page ?ordering=album_release_date", _page("album_release_date")),
+    ("list page ?ordering=artist_followers", _page("artist_followers")),
+    ("list page ?ordering=track_duration_min", _page("track_duration_min")),
+    ("list ?year=2020", lambda: list(Track.objects.filter(
+        album__release_date__gte="2020-01-01", album__release_date__lte="2020-12-31")[:100])),
+    ("facets ?explicit=false&min_popularity=80", lambda: facet_counts(
+        Track.objects.filter(explicit=False, track_popularity__gte=80))),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN QUERY PLAN and time the queries behind each endpoint, with and "
+        "without the Track / Artist / Album indexes (dropped inside a rolled-back transaction)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+        parser.add_argument("--no-plans", action="store_true", help="Skip EXPLAIN output.")
+
+    def _capture(self, fn):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            fn()
+        return statements
+
+    def _plans(self, statements, label):
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                # the label keeps sqlite3's statement cache from replaying a plan
+                # prepared before the indexes were dropped
+                cursor.execute(f"EXPLAIN QUERY PLAN /* {label} */ " + sql, params)
+                plans.append([row[-1] for row in cursor.fetchall()])
+        return plans
+
+    def _time(self, fn, repeat):
+        fn()  # warm the page cache
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000)
+        return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+    def _run_all(self, repeat, with_plans, label):
+        results = {}
+        for name, fn in CASES:
+            entry = self._time(fn, repeat)
+            if with_plans:
+                entry["plan"] = self._plans(self._capture(fn), label)
+            results[name] = entry
+        return results
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_indexes uses SQLite's EXPLAIN QUERY PLAN.")
+
+        repeat = max(opts["repeat"], 1)
+        plans = not opts["no_plans"]
+        index_names = [idx.name for model in (Track, Artist, Album) for idx in model._meta.indexes]
+
+        indexed = self._run_all(repeat, plans, "indexed")
+
+        # SQLite DDL is transactional: drop, measure, then roll the drop back
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for name in index_names:
+                    cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}")
+            bare = self._run_all(repeat, plans, "bare")
+            transaction.set_rollback(True)
+
+        report = {"rows": Track.objects.count(), "repeat": repeat, "indexes": index_names, "cases": {}}
+        for name, _ in CASES:
+            with_idx, without = indexed[name], bare[name]
+            report["cases"][name] = {
+                "with_indexes": with_idx,
+                "without_indexes": without,
+                "speedup": without["median_ms"] / with_idx["median_ms"] if with_idx["median_ms"] else None,
+            }
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{report['rows']} tracks, median of {repeat} runs\n")
+        self.stdout.write(f"{'case':<42} {'indexed':>10} {'no index':>10} {'speedup':>8}")
+        for name, case in report["cases"].items():
+            speedup = case["speedup"]
+            self.stdout.write(
+                f"{name:<42} {case['with_indexes']['median_ms']:>8.2f}ms "
+                f"{case['without_indexes']['median_ms']:>8.2f}ms "
+                f"{(f'{speedup:.1f}x' if speedup else '-'):>8}"
+            )
+            if plans:
+                for label, key in (("with", "with_indexes"), ("without", "without_indexes")):
+                    for i, plan in enumerate(case[key]["plan"]):
+                        self.stdout.write(f"    [{label} #{i + 1}] " + " | ".join(plan))
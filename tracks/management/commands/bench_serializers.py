@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from tracks.models import Track
+from tracks.renderers import FastJSONRenderer, orjson
+from tracks.serializers import TrackSerializer, track_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare TrackSerializer + JSONRenderer with the values() read path "
+        "(track_rows + FastJSONRenderer) on N rows, and check the bytes match."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _time(self, fn, repeat):
+        result, samples = None, []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - t0) * 1000)
+        return result, statistics.median(samples)
+
+    def _path(self, fetch, serialize, renderer, repeat):
+        rows, fetch_ms = self._time(fetch, repeat)
+        data, serialize_ms = self._time(lambda: serialize(rows), repeat)
+        body, render_ms = self._time(lambda: renderer.render(data), repeat)
+        return body, {"fetch": fetch_ms, "serialize": serialize_ms, "render": render_ms}
+
+    def handle(self, *args, **opts):
+        n, repeat = opts["rows"], max(opts["repeat"], 1)
+        qs = Track.objects.order_by("-track_popularity", "id")[:n]
+        if not qs.exists():
+            raise CommandError("No tracks loaded.")
+
+        stock_body, stock = self._path(
+            lambda: list(qs.all()),
+            lambda rows: TrackSerializer(rows, many=True).data,
+            JSONRenderer(), repeat,
+        )
+        fast_body, fast = self._path(
+            lambda: list(qs.values(*track_rows.value_fields)),
+            track_rows.serialize,
+            FastJSONRenderer(), repeat,
+        )
+        if stock_body != fast_body:
+            raise CommandError("Fast path output differs from TrackSerializer + JSONRenderer.")
+
+        self.stdout.write(
+            f"{len(stock_body):,} bytes for {n} rows, identical output "
+            f"(orjson {'on' if orjson else 'not installed'}), median of {repeat} runs"
+        )
+        self.stdout.write(f"{'stage':<10} {'stock':>10} {'fast':>10} {'speedup':>8}")
+        for stage in ("fetch", "serialize", "render"):
+            self.stdout.write(
+                f"{stage:<10} {stock[stage]:>8.1f}ms {fast[stage]:>8.1f}ms "
+                f"{stock[stage] / fast[stage]:>7.1f}x"
+            )
+        stock_total, fast_total = sum(stock.values()), sum(fast.values())
+        self.stdout.write(
+            f"{'total':<10} {stock_total:>8.1f}ms {fast_total:>8.1f}ms {stock_total / fast_total:>7.1f}x"
+        )
@@ -0,0 +1,214 @@
+import os
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from tracks.catalog import ALBUM_FIELDS, ARTIST_FIELDS
+from tracks.genres import rebuild_track_genres
+from tracks.ingest import INGEST_COLUMNS, byte_ranges, parse_range, read_header
+from tracks.rollups import rebuild_rollups
+from tracks.search import rebuild_search_index
+from tracks.versioning import bump_version
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, "data", "spotify_data clean.csv")
+TABLES = ("tracks_track", "tracks_artist", "tracks_album")
+
+POSITION = {name: i for i, name in enumerate(INGEST_COLUMNS)}
+# tracks_track columns; artist_id is looked up from artist_name in the INSERT
+TRACK_COLUMNS = [
+    "track_id", "track_name", "track_number", "track_popularity", "explicit",
+    "artist_id", "album_id", "track_duration_min",
+]
+TRACK_SOURCES = [c if c != "artist_id" else "artist_name" for c in TRACK_COLUMNS]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fast bulk load of a large track CSV: byte-range chunks are parsed in a "
+        "process pool and written by a single raw executemany writer (SQLite only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per executemany call.")
+        parser.add_argument("--chunk-mb", type=float, default=4.0, help="Bytes of CSV per parse task.")
+        parser.add_argument(
+            "--truncate", action="store_true",
+            help="Delete all tracks, artists and albums first (otherwise rows are upserted on track_id).",
+        )
+        parser.add_argument(
+            "--on-conflict", choices=["update", "ignore"], default="update",
+            help="Existing tracks / artists / albums: overwrite with the CSV values or keep.",
+        )
+        parser.add_argument(
+            "--journal-mode",
+            help="PRAGMA journal_mode during the load (default: the connection's, e.g. WAL). "
+                 "OFF needs --truncate or --unsafe.",
+        )
+        parser.add_argument(
+            "--synchronous",
+            help="PRAGMA synchronous during the load (default: the connection's, e.g. NORMAL). "
+                 "OFF needs --truncate or --unsafe.",
+        )
+        parser.add_argument(
+            "--unsafe", action="store_true",
+            help="Allow journal_mode / synchronous OFF without --truncate: a crash mid-load "
+                 "can corrupt the existing database.",
+        )
+        parser.add_argument(
+            "--cache-size", type=int, default=-262144,
+            help="PRAGMA cache_size during the load (negative = KiB, default 256 MiB).",
+        )
+
+    # -----------------------
+    # SQL helpers
+    # -----------------------
+
+    def _upsert_sql(self, table, columns, key, on_conflict, marks=None):
+        marks = marks or ["%s"] * len(columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(marks)})"
+        if on_conflict == "ignore":
+            return sql + f" ON CONFLICT({key}) DO NOTHING"
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+        return sql + f" ON CONFLICT({key}) DO UPDATE SET {updates}"
+
+    def _insert_sql(self, on_conflict):
+        """INSERT statements for artists, albums and tracks, in that order."""
+        marks = ["%s"] * len(TRACK_COLUMNS)
+        marks[TRACK_COLUMNS.index("artist_id")] = "(SELECT id FROM tracks_artist WHERE name = %s)"
+        return (
+            self._upsert_sql("tracks_artist", list(ARTIST_FIELDS.values()), "name", on_conflict),
+            self._upsert_sql("tracks_album", list(ALBUM_FIELDS.values()), "album_id", on_conflict),
+            self._upsert_sql("tracks_track", TRACK_COLUMNS, "track_id", on_conflict, marks),
+        )
+
+    def _split(self, rows):
+        """
+        Parsed rows -> (artist rows, album rows, track rows). Artists and
+        albums are deduplicated, the last row for each one winning.
+        """
+        artists, albums = {}, {}
+        for row in rows:
+            artists[row[POSITION["artist_name"]]] = tuple(row[POSITION[c]] for c in ARTIST_FIELDS)
+            albums[row[POSITION["album_id"]]] = tuple(row[POSITION[c]] for c in ALBUM_FIELDS)
+        tracks = [tuple(row[POSITION[c]] for c in TRACK_SOURCES) for row in rows]
+        return list(artists.values()), list(albums.values()), tracks
+
+    def _pragmas(self, cursor, values):
+        previous = {}
+        for name, value in values.items():
+            cursor.execute(f"PRAGMA {name}")
+            previous[name] = cursor.fetchone()[0]
+            cursor.execute(f"PRAGMA {name} = {value}")
+        return previous
+
+    def _drop_fts_triggers(self, cursor):
+        # per-row FTS triggers dominate bulk insert time; the index is rebuilt once at the end
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(TABLES))})",
+            TABLES,
+        )
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f"DROP TRIGGER {name}")
+        return triggers
+
+    # -----------------------
+    # main
+    # -----------------------
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("ingest_tracks writes raw SQLite SQL; use load_spotify.py on other backends.")
+        unjournaled = [
+            f"--{name.replace('_', '-')} OFF" for name in ("journal_mode", "synchronous")
+            if (opts[name] or "").upper() == "OFF"
+        ]
+        if unjournaled and not (opts["truncate"] or opts["unsafe"]):
+            # without a journal a crash mid-upsert leaves a live database corrupt
+            raise CommandError(f"{' and '.join(unjournaled)} needs --truncate (a full reload) or --unsafe.")
+
+        path = opts["path"]
+        try:
+            index, data_start = read_header(path)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        ranges = byte_ranges(path, data_start, max(int(opts["chunk_mb"] * 1024 * 1024), 1))
+        tasks = [(path, start, end, index) for start, end in ranges]
+        statements = self._insert_sql(opts["on_conflict"])
+        batch_size = max(opts["batch_size"], 1)
+
+        stats = {"rows": 0, "bad": 0, "parse_cpu": 0.0, "parse_wait": 0.0, "write": 0.0}
+        t_start = time.perf_counter()
+
+        # fork the parsers before opening the SQLite handle the writer will use
+        connection.close()
+        with Pool(processes=max(opts["workers"], 1)) as pool, connection.cursor() as cursor:
+            # journal_mode cannot change inside a transaction, so pragmas go first
+            pragmas = {"cache_size": opts["cache_size"], "temp_store": "MEMORY"}
+            for name in ("journal_mode", "synchronous"):
+                if opts[name]:
+                    pragmas[name] = opts[name]
+            previous = self._pragmas(cursor, pragmas)
+            triggers = self._drop_fts_triggers(cursor)
+            try:
+                if opts["truncate"]:
+                    cursor.execute("DELETE FROM tracks_trackgenre")
+                    cursor.execute("DELETE FROM tracks_track")
+                    cursor.execute("DELETE FROM tracks_artist")
+                    cursor.execute("DELETE FROM tracks_album")
+
+                # in file order, so later rows win for repeated artists / albums
+                results = pool.imap(parse_range, tasks)
+                while True:
+                    t0 = time.perf_counter()
+                    try:
+                        rows, bad, parse_seconds = next(results)
+                    except StopIteration:
+                        break
+                    stats["parse_wait"] += time.perf_counter() - t0
+                    stats["parse_cpu"] += parse_seconds
+                    stats["bad"] += bad
+
+                    t0 = time.perf_counter()
+                    with transaction.atomic():
+                        for sql, values in zip(statements, self._split(rows)):
+                            for i in range(0, len(values), batch_size):
+                                cursor.executemany(sql, values[i:i + batch_size])
+                    stats["write"] += time.perf_counter() - t0
+                    stats["rows"] += len(rows)
+            finally:
+                for _, sql in triggers:
+                    cursor.execute(sql)
+                self._pragmas(cursor, previous)
+
+        load_seconds = time.perf_counter() - t_start
+
+        t0 = time.perf_counter()
+        rebuild_search_index()
+        links = rebuild_track_genres()
+        rollups = rebuild_rollups()
+        bump_version()
+        derived_seconds = time.perf_counter() - t0
+
+        busy = stats["parse_wait"] + stats["write"]
+        rate = stats["rows"] / load_seconds if load_seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {stats['rows']} rows ({stats['bad']} bad) from {len(tasks)} chunks "
+            f"in {load_seconds:.2f}s = {rate:,.0f} rows/s"
+        ))
+        if busy:
+            self.stdout.write(
+                f"  writer time: {100 * stats['write'] / busy:.0f}% writing, "
+                f"{100 * stats['parse_wait'] / busy:.0f}% waiting on parsers "
+                f"(parser CPU {stats['parse_cpu']:.2f}s over {opts['workers']} workers)"
+            )
+        self.stdout.write(
+            f"  derived tables in {derived_seconds:.2f}s: {links} genre links, rollups {rollups}"
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracks.rollups import CHECKS, rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the artist / distribution / cube rollup tables and the genre links against Track, "
+        "optionally rebuilding them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names", nargs="*", metavar="name",
+            help=f"Rollups to check: {', '.join(sorted(CHECKS))} (default: all).",
+        )
+        parser.add_argument("--rebuild", action="store_true", help="Rebuild from Track before verifying.")
+        parser.add_argument("--show", type=int, default=10, help="Max mismatched rows to print per rollup.")
+
+    def handle(self, *args, **opts):
+        names = opts["names"] or sorted(CHECKS)
+        unknown = set(names) - set(CHECKS)
+        if unknown:
+            raise CommandError(f"Unknown rollup(s): {', '.join(sorted(unknown))}")
+
+        if opts["rebuild"]:
+            for name, count in rebuild_rollups(names).items():
+                self.stdout.write(f"Rebuilt {name}: {count} rows")
+
+        failed = False
+        for name, diffs in verify_rollups(names).items():
+            if not diffs:
+                self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+                continue
+            failed = True
+            self.stdout.write(self.style.ERROR(f"{name}: {len(diffs)} mismatched rows"))
+            for key, stored, expected in diffs[: opts["show"]]:
+                self.stdout.write(f"  {key!r}: stored={stored} expected={expected}")
+
+        if failed:
+            raise CommandError("Rollups are out of date; run with --rebuild.")
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_genres(apps, schema_editor):
+    # historical models: parse artist_genres the same way tracks.genres.split_genres does
+    Track = apps.get_model("tracks", "Track")
+    Genre = apps.get_model("tracks", "Genre")
+    TrackGenre = apps.get_model("tracks", "TrackGenre")
+
+    parsed = []
+    for pk, text in Track.objects.values_list("id", "artist_genres").iterator():
+        names = []
+        for x in (text or "").split(","):
+            x = x.strip().lower()
+            if x and x not in names:
+                names.append(x)
+        parsed.append((pk, names))
+
+    all_names = {n for _, names in parsed for n in names}
+    Genre.objects.bulk_create([Genre(name=n) for n in all_names], ignore_conflicts=True)
+    ids = dict(Genre.objects.values_list("name", "id"))
+
+    TrackGenre.objects.bulk_create(
+        [TrackGenre(track_id=pk, genre_id=ids[n]) for pk, names in parsed for n in names],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0002_alter_track_album_total_tracks_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrackGenre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_genres', to='tracks.genre')),
+                ('track', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_genres', to='tracks.track')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='tracks',
+            field=models.ManyToManyField(related_name='genres', through='tracks.TrackGenre', to='tracks.track'),
+        ),
+        migrations.AddIndex(
+            model_name='trackgenre',
+            index=models.Index(fields=['genre', 'track'], name='trackgenre_genre_track_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trackgenre',
+            constraint=models.UniqueConstraint(fields=('track', 'genre'), name='uniq_track_genre'),
+        ),
+        migrations.RunPython(populate_genres, migrations.RunPython.noop),
+    ]
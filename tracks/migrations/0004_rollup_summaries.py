@@ -0,0 +1,73 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:18
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import ExtractYear
+
+
+def populate_rollups(apps, schema_editor):
+    Track = apps.get_model("tracks", "Track")
+    ArtistSummary = apps.get_model("tracks", "ArtistSummary")
+    YearSummary = apps.get_model("tracks", "YearSummary")
+
+    ArtistSummary.objects.bulk_create(
+        [
+            ArtistSummary(**row)
+            for row in Track.objects.values("artist_name").annotate(
+                track_count=Count("id"),
+                popularity_sum=Sum("track_popularity"),
+                max_track_popularity=Max("track_popularity"),
+                followers_sum=Sum("artist_followers"),
+            ).order_by()
+        ],
+        batch_size=1000,
+    )
+    YearSummary.objects.bulk_create(
+        [
+            YearSummary(**row)
+            for row in Track.objects.annotate(year=ExtractYear("album_release_date")).values("year").annotate(
+                track_count=Count("id"),
+                popularity_sum=Sum("track_popularity"),
+                explicit_count=Count("id", filter=Q(explicit=True)),
+            ).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0003_genre_tracks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('track_count', models.PositiveIntegerField(default=0)),
+                ('popularity_sum', models.BigIntegerField(default=0)),
+                ('explicit_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['year'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArtistSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('artist_name', models.CharField(max_length=300, unique=True)),
+                ('track_count', models.PositiveIntegerField(default=0)),
+                ('popularity_sum', models.BigIntegerField(default=0)),
+                ('max_track_popularity', models.PositiveIntegerField(null=True)),
+                ('followers_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-track_count'], name='artistsummary_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
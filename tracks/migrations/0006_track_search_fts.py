@@ -0,0 +1,87 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# External-content FTS5 index over the searchable Track columns. Triggers keep
+# it in step with every INSERT/UPDATE/DELETE, bulk_create and raw SQL included.
+FTS_COLUMNS = "track_name, artist_name, album_name, artist_genres"
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tracks_track_fts USING fts5(
+        {FTS_COLUMNS},
+        content='tracks_track', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # weight matches: track name > artist > album > genres
+    "INSERT INTO tracks_track_fts(tracks_track_fts, rank) VALUES('rank', 'bm25(10.0, 5.0, 3.0, 1.0)')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ai AFTER INSERT ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.track_name, new.artist_name, new.album_name, new.artist_genres);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ad AFTER DELETE ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.track_name, old.artist_name, old.album_name, old.artist_genres);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_au
+    AFTER UPDATE OF {FTS_COLUMNS} ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.track_name, old.artist_name, old.album_name, old.artist_genres);
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.track_name, new.artist_name, new.album_name, new.artist_genres);
+    END
+    """,
+    "INSERT INTO tracks_track_fts(tracks_track_fts) VALUES('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS tracks_track_fts_ai",
+    "DROP TRIGGER IF EXISTS tracks_track_fts_ad",
+    "DROP TRIGGER IF EXISTS tracks_track_fts_au",
+    "DROP TABLE IF EXISTS tracks_track_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends fall back to the plain SearchFilter
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0005_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackSearch',
+            fields=[
+                ('track', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='tracks.track')),
+                ('document', models.TextField(db_column='tracks_track_fts')),
+                ('rank', models.FloatField(db_column='rank')),
+            ],
+            options={
+                'db_table': 'tracks_track_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0006_track_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['explicit', 'track_popularity'], name='track_explicit_pop_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['artist_name', 'album_type'], name='track_artist_albumtype_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['-track_popularity', 'id'], name='track_pop_desc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['album_release_date', 'id'], name='track_release_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['artist_followers', 'id'], name='track_followers_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(fields=['track_duration_min', 'id'], name='track_duration_id_idx'),
+        ),
+    ]
@@ -0,0 +1,407 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:05
+
+import secrets
+from datetime import date
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# The FTS5 index from 0006 read its columns straight from tracks_track. Those
+# columns move to tracks_artist / tracks_album, so the index becomes a
+# contentless one fed by triggers on all three tables, which join in the
+# artist / album values. SQLite refuses the rename step of Django's table
+# rebuilds while another table's trigger names the rebuilt table, so a later
+# migration that rebuilds one of these tables has to drop and recreate the
+# triggers around it.
+FTS_COLUMNS = "track_name, artist_name, album_name, artist_genres"
+
+OLD_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS tracks_track_fts_ai",
+    "DROP TRIGGER IF EXISTS tracks_track_fts_ad",
+    "DROP TRIGGER IF EXISTS tracks_track_fts_au",
+    "DROP TABLE IF EXISTS tracks_track_fts",
+]
+
+# 0006's external-content index, restored when this migration is unapplied
+OLD_CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tracks_track_fts USING fts5(
+        {FTS_COLUMNS},
+        content='tracks_track', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "INSERT INTO tracks_track_fts(tracks_track_fts, rank) VALUES('rank', 'bm25(10.0, 5.0, 3.0, 1.0)')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ai AFTER INSERT ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.track_name, new.artist_name, new.album_name, new.artist_genres);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ad AFTER DELETE ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.track_name, old.artist_name, old.album_name, old.artist_genres);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_au
+    AFTER UPDATE OF {FTS_COLUMNS} ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.id, old.track_name, old.artist_name, old.album_name, old.artist_genres);
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.id, new.track_name, new.artist_name, new.album_name, new.artist_genres);
+    END
+    """,
+    "INSERT INTO tracks_track_fts(tracks_track_fts) VALUES('rebuild')",
+]
+
+# the values a track is indexed with, for the track aliased `t`
+TRACK_DOCUMENT = """
+    FROM tracks_track t
+    JOIN tracks_artist ar ON ar.id = t.artist_id
+    JOIN tracks_album al ON al.album_id = t.album_id
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tracks_track_fts USING fts5(
+        {FTS_COLUMNS},
+        content='',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # weight matches: track name > artist > album > genres
+    "INSERT INTO tracks_track_fts(tracks_track_fts, rank) VALUES('rank', 'bm25(10.0, 5.0, 3.0, 1.0)')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ai AFTER INSERT ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        SELECT t.id, t.track_name, ar.name, al.name, ar.genres {TRACK_DOCUMENT}
+        WHERE t.id = new.id;
+    END
+    """,
+    # contentless deletes must repeat the indexed values; tracks are always
+    # deleted before their artist / album (on_delete=PROTECT)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_ad AFTER DELETE ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        SELECT 'delete', old.id, old.track_name, ar.name, al.name, ar.genres
+        FROM tracks_artist ar, tracks_album al
+        WHERE ar.id = old.artist_id AND al.album_id = old.album_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_track_fts_au
+    AFTER UPDATE OF track_name, artist_id, album_id ON tracks_track BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        SELECT 'delete', old.id, old.track_name, ar.name, al.name, ar.genres
+        FROM tracks_artist ar, tracks_album al
+        WHERE ar.id = old.artist_id AND al.album_id = old.album_id;
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        SELECT t.id, t.track_name, ar.name, al.name, ar.genres {TRACK_DOCUMENT}
+        WHERE t.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_artist_fts_au
+    AFTER UPDATE OF name, genres ON tracks_artist
+    WHEN old.name IS NOT new.name OR old.genres IS NOT new.genres BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        SELECT 'delete', t.id, t.track_name, old.name, al.name, old.genres
+        FROM tracks_track t JOIN tracks_album al ON al.album_id = t.album_id
+        WHERE t.artist_id = old.id;
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        SELECT t.id, t.track_name, new.name, al.name, new.genres
+        FROM tracks_track t JOIN tracks_album al ON al.album_id = t.album_id
+        WHERE t.artist_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tracks_album_fts_au
+    AFTER UPDATE OF name ON tracks_album
+    WHEN old.name IS NOT new.name BEGIN
+        INSERT INTO tracks_track_fts(tracks_track_fts, rowid, {FTS_COLUMNS})
+        SELECT 'delete', t.id, t.track_name, ar.name, old.name, ar.genres
+        FROM tracks_track t JOIN tracks_artist ar ON ar.id = t.artist_id
+        WHERE t.album_id = old.album_id;
+        INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+        SELECT t.id, t.track_name, ar.name, new.name, ar.genres
+        FROM tracks_track t JOIN tracks_artist ar ON ar.id = t.artist_id
+        WHERE t.album_id = new.album_id;
+    END
+    """,
+    f"""
+    INSERT INTO tracks_track_fts(rowid, {FTS_COLUMNS})
+    SELECT t.id, t.track_name, ar.name, al.name, ar.genres {TRACK_DOCUMENT}
+    """,
+]
+
+
+DROP_SQL = OLD_FTS_SQL + [
+    "DROP TRIGGER IF EXISTS tracks_artist_fts_au",
+    "DROP TRIGGER IF EXISTS tracks_album_fts_au",
+]
+
+
+def drop_old_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in OLD_FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def restore_old_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in OLD_CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends fall back to the plain SearchFilter
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+def split_genres(text):
+    # frozen copy of tracks.genres.split_genres
+    names = []
+    for x in (text or "").split(","):
+        x = x.strip().lower()
+        if x and x not in names:
+            names.append(x)
+    return names
+
+
+def relink_genres(apps):
+    # 0003 linked each track to its own artist_genres; tracks now share their
+    # artist's genres, so rebuild the links from those
+    Track = apps.get_model("tracks", "Track")
+    Artist = apps.get_model("tracks", "Artist")
+    Genre = apps.get_model("tracks", "Genre")
+    TrackGenre = apps.get_model("tracks", "TrackGenre")
+
+    artist_genres = {pk: split_genres(text) for pk, text in Artist.objects.values_list("id", "genres")}
+    all_names = {n for names in artist_genres.values() for n in names}
+    Genre.objects.bulk_create([Genre(name=n) for n in all_names], ignore_conflicts=True)
+    ids = dict(Genre.objects.values_list("name", "id"))
+
+    TrackGenre.objects.all().delete()
+    TrackGenre.objects.bulk_create(
+        [
+            TrackGenre(track_id=pk, genre_id=ids[n])
+            for pk, artist_id in Track.objects.values_list("id", "artist_id").iterator()
+            for n in artist_genres[artist_id]
+        ],
+        batch_size=2000,
+    )
+    Genre.objects.filter(track_genres__isnull=True).delete()
+
+
+def populate_catalog(apps, schema_editor):
+    # one Artist per name and one Album per album_id; where rows disagree
+    # (artist followers drift between crawls) the most recently loaded row wins
+    Track = apps.get_model("tracks", "Track")
+    Artist = apps.get_model("tracks", "Artist")
+    Album = apps.get_model("tracks", "Album")
+
+    artists, albums = {}, {}
+    rows = Track.objects.order_by("id").values(
+        "artist_name", "artist_popularity", "artist_followers", "artist_genres",
+        "spotify_album_id", "album_name", "album_release_date", "album_total_tracks", "album_type",
+    )
+    for row in rows.iterator(chunk_size=5000):
+        artists[row["artist_name"]] = Artist(
+            name=row["artist_name"], popularity=row["artist_popularity"],
+            followers=row["artist_followers"], genres=row["artist_genres"],
+        )
+        albums[row["spotify_album_id"]] = Album(
+            album_id=row["spotify_album_id"], name=row["album_name"],
+            release_date=row["album_release_date"], total_tracks=row["album_total_tracks"],
+            album_type=row["album_type"],
+        )
+    Artist.objects.bulk_create(artists.values(), batch_size=1000)
+    Album.objects.bulk_create(albums.values(), batch_size=1000)
+
+    Track.objects.update(
+        artist=Subquery(Artist.objects.filter(name=OuterRef("artist_name")).values("pk")[:1]),
+        album=F("spotify_album_id"),
+    )
+    relink_genres(apps)
+
+    # every track of an artist now reports the same followers: fix the
+    # artist rollups' sums and move the data version past cached responses
+    ArtistSummary = apps.get_model("tracks", "ArtistSummary")
+    followers = Artist.objects.filter(name=OuterRef("artist_name")).values("followers")[:1]
+    ArtistSummary.objects.update(followers_sum=Coalesce(Subquery(followers), Value(0)) * F("track_count"))
+    DataVersion = apps.get_model("tracks", "DataVersion")
+    DataVersion.objects.filter(pk=1).update(version=secrets.randbits(62) + 1)
+
+
+def restore_track_columns(apps, schema_editor):
+    # copy each track's artist / album values back onto the track row; the
+    # artist rollups already match them
+    Track = apps.get_model("tracks", "Track")
+    Artist = apps.get_model("tracks", "Artist")
+    Album = apps.get_model("tracks", "Album")
+
+    artist = Artist.objects.filter(pk=OuterRef("artist_id"))
+    album = Album.objects.filter(pk=OuterRef("album_id"))
+    Track.objects.update(
+        artist_name=Subquery(artist.values("name")[:1]),
+        artist_popularity=Subquery(artist.values("popularity")[:1]),
+        artist_followers=Subquery(artist.values("followers")[:1]),
+        artist_genres=Subquery(artist.values("genres")[:1]),
+        spotify_album_id=F("album_id"),
+        album_name=Subquery(album.values("name")[:1]),
+        album_release_date=Subquery(album.values("release_date")[:1]),
+        album_total_tracks=Subquery(album.values("total_tracks")[:1]),
+        album_type=Subquery(album.values("album_type")[:1]),
+    )
+    DataVersion = apps.get_model("tracks", "DataVersion")
+    DataVersion.objects.filter(pk=1).update(version=secrets.randbits(62) + 1)
+
+
+class RemoveTrackField(migrations.RemoveField):
+    """
+    RemoveField that can be unapplied with rows in the table: a NOT NULL
+    column comes back filled with a throwaway default (what makemigrations
+    asks for when adding one), which restore_track_columns() overwrites.
+    """
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        from_model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, from_model):
+            to_model = to_state.apps.get_model(app_label, self.model_name)
+            field = to_model._meta.get_field(self.name)
+            if not field.null:
+                field.default = (
+                    date(1970, 1, 1) if isinstance(field, models.DateField)
+                    else "" if isinstance(field, models.CharField) else 0
+                )
+            schema_editor.add_field(from_model, field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0007_track_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_old_fts, restore_old_fts),
+        migrations.CreateModel(
+            name='Artist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=300, unique=True)),
+                ('popularity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('followers', models.BigIntegerField(validators=[django.core.validators.MinValueValidator(0)])),
+                ('genres', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['followers'], name='artist_followers_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Album',
+            fields=[
+                ('album_id', models.CharField(max_length=80, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=300)),
+                ('release_date', models.DateField()),
+                ('total_tracks', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('album_type', models.CharField(choices=[('album', 'album'), ('single', 'single'), ('compilation', 'compilation')], max_length=50)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['release_date'], name='album_release_idx')],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='track',
+            name='track_artist_albumtype_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='track',
+            name='track_release_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='track',
+            name='track_followers_id_idx',
+        ),
+        # the string column becomes the foreign key column of the same name
+        migrations.RenameField(
+            model_name='track',
+            old_name='album_id',
+            new_name='spotify_album_id',
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='artist',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='tracks.artist'),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='album',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='tracks.album'),
+        ),
+        migrations.RunPython(populate_catalog, restore_track_columns),
+        RemoveTrackField(
+            model_name='track',
+            name='artist_name',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='artist_popularity',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='artist_followers',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='artist_genres',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='spotify_album_id',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='album_name',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='album_release_date',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='album_total_tracks',
+        ),
+        RemoveTrackField(
+            model_name='track',
+            name='album_type',
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='artist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='tracks.artist'),
+        ),
+        migrations.AlterField(
+            model_name='track',
+            name='album',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='tracks.album'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:23
+
+import math
+from collections import Counter
+
+from django.db import migrations, models
+
+
+# frozen copies of tracks.distributions' binning and tally at the time of this migration
+def linear_bin(value, width):
+    return math.floor(round(value / width, 6))
+
+
+def log_bin(value, per_decade):
+    if value < 1:
+        return 0
+    return 1 + math.floor(round(math.log10(value) * per_decade, 6))
+
+
+METRICS = {
+    "track_popularity": ("track_popularity", lambda v: linear_bin(v, 1)),
+    "artist_popularity": ("artist__popularity", lambda v: linear_bin(v, 1)),
+    "track_duration_min": ("track_duration_min", lambda v: linear_bin(v, 0.1)),
+    "artist_followers": ("artist__followers", lambda v: log_bin(v, 20)),
+}
+
+
+def split_genres(text):
+    names = []
+    for x in (text or "").split(","):
+        x = x.strip().lower()
+        if x and x not in names:
+            names.append(x)
+    return names
+
+
+def populate_distributions(apps, schema_editor):
+    Track = apps.get_model("tracks", "Track")
+    DistributionSlice = apps.get_model("tracks", "DistributionSlice")
+
+    totals = {}
+    rows = Track.objects.order_by().values_list(
+        "album__release_date", "album__album_type", "artist__genres",
+        *(lookup for lookup, _ in METRICS.values()),
+    )
+    for released, album_type, genres, *values in rows.iterator(chunk_size=5000):
+        bins = [(name, bin_of(v)) for (name, (_, bin_of)), v in zip(METRICS.items(), values)]
+        # genre "" is the slice of every track
+        for genre in ("", *split_genres(genres)):
+            for name, b in bins:
+                totals.setdefault((released.year, album_type, genre, name), Counter())[b] += 1
+
+    DistributionSlice.objects.bulk_create(
+        [
+            DistributionSlice(
+                year=year, album_type=album_type, genre=genre, metric=metric,
+                bins={str(b): n for b, n in sorted(bins.items())},
+            )
+            for (year, album_type, genre, metric), bins in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0008_artist_album'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistributionSlice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=40)),
+                ('genre', models.CharField(blank=True, max_length=200)),
+                ('year', models.IntegerField()),
+                ('album_type', models.CharField(max_length=50)),
+                ('bins', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='distributionslice',
+            constraint=models.UniqueConstraint(fields=('metric', 'genre', 'year', 'album_type'), name='uniq_distribution_slice'),
+        ),
+        migrations.RunPython(populate_distributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:28
+
+import math
+
+from django.db import migrations, models
+
+
+# frozen copy of tracks.cube's tally at the time of this migration
+def split_genres(text):
+    names = []
+    for x in (text or "").split(","):
+        x = x.strip().lower()
+        if x and x not in names:
+            names.append(x)
+    return names
+
+
+def populate_cube(apps, schema_editor):
+    Track = apps.get_model("tracks", "Track")
+    CubeCell = apps.get_model("tracks", "CubeCell")
+
+    cells = {}
+    rows = Track.objects.order_by().values_list(
+        "album__release_date", "album__album_type", "explicit", "artist__genres",
+        "track_popularity", "track_duration_min",
+    )
+    for released, album_type, explicit, genres, popularity, duration in rows.iterator(chunk_size=5000):
+        ms = math.floor(duration * 60000 + 0.5)
+        # genre "" is the cell of every track
+        for genre in ("", *split_genres(genres)):
+            key = (released.year, album_type, explicit, genre)
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = CubeCell(
+                    year=key[0], album_type=album_type, explicit=explicit, genre=genre,
+                    track_count=1, popularity_sum=popularity, popularity_min=popularity,
+                    popularity_max=popularity, duration_ms_sum=ms, duration_min=duration,
+                    duration_max=duration,
+                )
+                continue
+            cell.track_count += 1
+            cell.popularity_sum += popularity
+            cell.popularity_min = min(cell.popularity_min, popularity)
+            cell.popularity_max = max(cell.popularity_max, popularity)
+            cell.duration_ms_sum += ms
+            cell.duration_min = min(cell.duration_min, duration)
+            cell.duration_max = max(cell.duration_max, duration)
+    CubeCell.objects.bulk_create(cells.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0009_distribution_slice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('album_type', models.CharField(max_length=50)),
+                ('explicit', models.BooleanField()),
+                ('genre', models.CharField(blank=True, max_length=200)),
+                ('track_count', models.PositiveIntegerField(default=0)),
+                ('popularity_sum', models.BigIntegerField(default=0)),
+                ('popularity_min', models.PositiveIntegerField()),
+                ('popularity_max', models.PositiveIntegerField()),
+                ('duration_ms_sum', models.BigIntegerField(default=0)),
+                ('duration_min', models.FloatField()),
+                ('duration_max', models.FloatField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='cubecell',
+            constraint=models.UniqueConstraint(fields=('genre', 'year', 'album_type', 'explicit'), name='uniq_cube_cell'),
+        ),
+        migrations.RunPython(populate_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-17 13:59
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+
+
+def populate_year_summaries(apps, schema_editor):
+    # unapplying: the table comes back empty, refill it from Track
+    Track = apps.get_model("tracks", "Track")
+    YearSummary = apps.get_model("tracks", "YearSummary")
+    YearSummary.objects.bulk_create(
+        [
+            YearSummary(**row)
+            for row in Track.objects.annotate(year=ExtractYear("album__release_date")).values("year").annotate(
+                track_count=Count("id"),
+                popularity_sum=Sum("track_popularity"),
+                explicit_count=Count("id", filter=Q(explicit=True)),
+            ).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0010_cube_cell'),
+    ]
+
+    # per-year figures are read from CubeCell rows with genre ""
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, populate_year_summaries),
+        migrations.DeleteModel(
+            name='YearSummary',
+        ),
+    ]
@@ -4,41 +4,48 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
-class Track(models.Model):
-    track_id = models.CharField(max_length=80, unique=True)
-
-    track_name = models.CharField(max_length=300)
-    track_number = models.PositiveIntegerField(
-        validators=[MinValueValidator(1)]
-    )
+class Artist(models.Model):
+    """
+    One row per artist name; Track rows point here instead of repeating the
+    artist columns. The CSV carries no artist id, so the name is the key.
+    """
+    name = models.CharField(max_length=300, unique=True)
 
     # Spotify popularity is 0–100
-    track_popularity = models.PositiveIntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(100)]
-    )
-
-    explicit = models.BooleanField(default=False)
-
-    artist_name = models.CharField(max_length=300)
-
-    # Spotify popularity is 0–100
-    artist_popularity = models.PositiveIntegerField(
+    popularity = models.PositiveIntegerField(
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
 
     # followers should never be negative
-    artist_followers = models.BigIntegerField(
+    followers = models.BigIntegerField(
         validators=[MinValueValidator(0)]
     )
 
-    artist_genres = models.TextField(blank=True, null=True)
+    genres = models.TextField(blank=True, null=True)
 
-    album_id = models.CharField(max_length=80)
-    album_name = models.CharField(max_length=300)
+    class Meta:
+        indexes = [
+            # ?ordering=artist_followers walks artists by followers, then their tracks
+            models.Index(fields=["followers"], name="artist_followers_idx"),
+        ]
 
-    album_release_date = models.DateField()
+    def clean(self):
+        # genre length sanity (avoid extreme garbage input)
+        if self.genres and len(self.genres) > 2000:
+            raise ValidationError({"genres": "Genres text is too long."})
+
+    def __str__(self):
+        return self.name
 
-    album_total_tracks = models.PositiveIntegerField(
+
+class Album(models.Model):
+    """One row per Spotify album, keyed by the Spotify album id."""
+    album_id = models.CharField(max_length=80, primary_key=True)
+    name = models.CharField(max_length=300)
+
+    release_date = models.DateField()
+
+    total_tracks = models.PositiveIntegerField(
         validators=[MinValueValidator(1)]
     )
 
@@ -50,30 +57,198 @@ class Track(models.Model):
     )
     album_type = models.CharField(max_length=50, choices=ALBUM_TYPES)
 
+    class Meta:
+        indexes = [
+            # ?ordering=album_release_date and year filters
+            models.Index(fields=["release_date"], name="album_release_idx"),
+        ]
+
+    def clean(self):
+        # prevent accidental future release dates
+        if self.release_date and self.release_date > timezone.now().date():
+            raise ValidationError({"release_date": "Release date cannot be in the future."})
+
+    def __str__(self):
+        return self.name
+
+
+class Track(models.Model):
+    track_id = models.CharField(max_length=80, unique=True)
+
+    track_name = models.CharField(max_length=300)
+    track_number = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)]
+    )
+
+    # Spotify popularity is 0–100
+    track_popularity = models.PositiveIntegerField(
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+
+    explicit = models.BooleanField(default=False)
+
+    # artist_* / album_* values live on these rows; the API, forms and loaders
+    # still read and write them as flat track fields (see tracks.catalog)
+    artist = models.ForeignKey(Artist, on_delete=models.PROTECT, related_name="tracks")
+    # the column keeps its old name and value: the Spotify album id
+    album = models.ForeignKey(Album, on_delete=models.PROTECT, related_name="tracks")
+
     # must be positive and realistic (minutes)
     track_duration_min = models.FloatField(
         validators=[MinValueValidator(0.01), MaxValueValidator(600.0)]
     )
 
-    def clean(self):
-        errors = {}
-
-        # prevent accidental future release dates
-        if self.album_release_date and self.album_release_date > timezone.now().date():
-            errors["album_release_date"] = "Release date cannot be in the future."
+    class Meta:
+        # matched to the filters / orderings in views.py, web_views.py and pagination.py;
+        # `manage.py bench_indexes` times each endpoint query with and without them
+        indexes = [
+            # clean_hits, clean-hits sidebar: explicit=False AND popularity >= N
+            models.Index(fields=["explicit", "track_popularity"], name="track_explicit_pop_idx"),
+            # keyset pages for each API ordering field, with id as the tiebreaker
+            models.Index(fields=["-track_popularity", "id"], name="track_pop_desc_id_idx"),
+            models.Index(fields=["track_duration_min", "id"], name="track_duration_id_idx"),
+        ]
 
+    def clean(self):
         # duration sanity: seconds mistaken as minutes becomes huge; cap already helps,
         # but also catch NaN / inf values if they ever appear
         if self.track_duration_min is not None:
             if self.track_duration_min != self.track_duration_min:  # NaN check
-                errors["track_duration_min"] = "Duration is invalid (NaN)."
+                raise ValidationError({"track_duration_min": "Duration is invalid (NaN)."})
+
+    def __str__(self):
+        # list tracks with select_related("artist") to print them without a query each
+        return f"{self.track_name} — {self.artist.name}"
 
-        # genre length sanity (avoid extreme garbage input)
-        if self.artist_genres and len(self.artist_genres) > 2000:
-            errors["artist_genres"] = "Genres text is too long."
 
-        if errors:
-            raise ValidationError(errors)
+class Genre(models.Model):
+    # normalised (lower-case, trimmed) genre name, one row per distinct genre
+    name = models.CharField(max_length=200, unique=True)
+
+    tracks = models.ManyToManyField(Track, through="TrackGenre", related_name="genres")
+
+    class Meta:
+        ordering = ["name"]
 
     def __str__(self):
-        return f"{self.track_name} — {self.artist_name}"
+        return self.name
+
+
+class TrackGenre(models.Model):
+    track = models.ForeignKey(Track, on_delete=models.CASCADE, related_name="track_genres")
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name="track_genres")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["track", "genre"], name="uniq_track_genre"),
+        ]
+        # the unique constraint covers (track, genre); genre-first lookups need their own index
+        indexes = [
+            models.Index(fields=["genre", "track"], name="trackgenre_genre_track_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.track_id} → {self.genre_id}"
+
+
+class ArtistSummary(models.Model):
+    """
+    Per-artist rollup of Track, maintained incrementally by tracks.rollups.
+    Sums are stored (not averages) so rows can be patched with deltas.
+    """
+    artist_name = models.CharField(max_length=300, unique=True)
+    track_count = models.PositiveIntegerField(default=0)
+    popularity_sum = models.BigIntegerField(default=0)
+    max_track_popularity = models.PositiveIntegerField(null=True)
+    followers_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-track_count"], name="artistsummary_count_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.artist_name} ({self.track_count})"
+
+
+class DistributionSlice(models.Model):
+    """
+    Histogram of one numeric column over the tracks of one (release year,
+    album type, genre) slice, maintained incrementally by tracks.distributions.
+    genre "" is the slice of every track.
+    """
+    metric = models.CharField(max_length=40)
+    genre = models.CharField(max_length=200, blank=True)
+    year = models.IntegerField()
+    album_type = models.CharField(max_length=50)
+    # {bin number: track count}, non-empty bins only
+    bins = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            # column order matches the endpoint's filters: metric + genre, then a year range
+            models.UniqueConstraint(fields=["metric", "genre", "year", "album_type"], name="uniq_distribution_slice"),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.year} {self.album_type} {self.genre or '*'}"
+
+
+class CubeCell(models.Model):
+    """
+    Count / sum / min / max of popularity and duration over the tracks of one
+    (release year, album type, explicit, genre) cell, maintained
+    incrementally by tracks.cube. genre "" is the cell of every track.
+    """
+    year = models.IntegerField()
+    album_type = models.CharField(max_length=50)
+    explicit = models.BooleanField()
+    genre = models.CharField(max_length=200, blank=True)
+    track_count = models.PositiveIntegerField(default=0)
+    popularity_sum = models.BigIntegerField(default=0)
+    popularity_min = models.PositiveIntegerField()
+    popularity_max = models.PositiveIntegerField()
+    # whole milliseconds, so patched sums match a rebuild exactly
+    duration_ms_sum = models.BigIntegerField(default=0)
+    duration_min = models.FloatField()
+    duration_max = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # genre first: every cube query pins it (to "" unless grouping by genre)
+            models.UniqueConstraint(fields=["genre", "year", "album_type", "explicit"], name="uniq_cube_cell"),
+        ]
+
+    def __str__(self):
+        return f"{self.year} {self.album_type} {'explicit' if self.explicit else 'clean'} {self.genre or '*'}"
+
+
+class DataVersion(models.Model):
+    """
+    Single-row version token replaced on every Track write (see tracks.versioning).
+    Per-process snapshots and caches compare against it to detect stale data,
+    including writes made by other worker processes.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class TrackSearch(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over Track (created in migration
+    0008 and kept current by triggers). Joined from Track as `track.search`;
+    see tracks.search for the MATCH lookup and ranking.
+    """
+    track = models.OneToOneField(
+        Track, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column="rowid", related_name="search",
+    )
+    # FTS5 hidden columns: the table-named column accepts MATCH, `rank` is bm25
+    document = models.TextField(db_column="tracks_track_fts")
+    rank = models.FloatField(db_column="rank")
+
+    class Meta:
+        managed = False
+        db_table = "tracks_track_fts"
@@ -0,0 +1,221 @@
+"""
+Keyset (cursor) pagination for Track lists.
+
+Pages are fetched with `WHERE (k1, k2, ..., id) > (last row)` style filters
+on the current ordering instead of OFFSET, and nothing ever runs COUNT(*)
+over the filtered set. The cursor is an opaque base64 token carrying the
+sort-key values of the boundary row, the direction and the ordering it was
+made for. `id` is always appended as the final tiebreaker, so any ordering
+is total and next/prev cursors are stable while rows are inserted.
+
+Orderings that are not plain field names (expressions such as
+F("x").desc(nulls_last=True)) cannot be turned into keyset filters; those
+querysets are paged with LIMIT / OFFSET cursors instead.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from . import cube
+
+CURSOR_PARAM = "cursor"
+# the "ordering" offset cursors are made for
+OFFSET_ORDERING = ["<offset>"]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _ordering_of(queryset, default):
+    """Field names the queryset is ordered by, id last; None if it orders by an expression."""
+    ordering = list(queryset.query.order_by or default)
+    if not all(isinstance(o, str) for o in ordering):
+        return None
+    ordering = ["id" if o == "pk" else "-id" if o == "-pk" else o for o in ordering]
+    if not any(o.lstrip("-") == "id" for o in ordering):
+        ordering.append("id")
+    return ordering
+
+
+def encode_cursor(values, reverse, ordering):
+    payload = json.dumps({"v": values, "r": int(reverse), "o": ordering}, cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, ordering):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, reverse = data["v"], bool(data["r"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if data.get("o") != ordering or len(values) != len(ordering):
+        raise InvalidCursor("Cursor does not match the current ordering")
+    return values, reverse
+
+
+def _after(keys, values, descending):
+    """Q for rows strictly after `values` in the (keys, descending) ordering."""
+    q = Q()
+    for i, key in enumerate(keys):
+        step = Q(**{f"{key}__{'lt' if descending[i] else 'gt'}": values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            step &= Q(**{prev_key: prev_value})
+        q |= step
+    return q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, cursor, page_size, default_ordering=("id",)):
+    """Return one KeysetPage of `queryset` (raises InvalidCursor on a bad token)."""
+    ordering = _ordering_of(queryset, default_ordering)
+    if ordering is None:
+        return _paginate_offset(queryset, cursor, page_size)
+    keys = [f"keyset_{i}" for i in range(len(ordering))]
+    descending = [o.startswith("-") for o in ordering]
+
+    qs = queryset.annotate(**{k: F(o.lstrip("-")) for k, o in zip(keys, ordering)})
+
+    reverse = False
+    if cursor:
+        values, reverse = decode_cursor(cursor, ordering)
+        if reverse:
+            # walking backwards: flip every direction and page "after" the boundary
+            qs = qs.filter(_after(keys, values, [not d for d in descending]))
+        else:
+            qs = qs.filter(_after(keys, values, descending))
+
+    order = [("-" if d != reverse else "") + k for k, d in zip(keys, descending)]
+    rows = list(qs.order_by(*order)[: page_size + 1])
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    def boundary(row, backwards):
+        # rows are model instances, or dicts when the queryset is a values() query
+        values = [row[k] for k in keys] if isinstance(row, dict) else [getattr(row, k) for k in keys]
+        return encode_cursor(values, backwards, ordering)
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or reverse:
+            next_cursor = boundary(rows[-1], False)
+        if cursor and (has_more or not reverse):
+            previous_cursor = boundary(rows[0], True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def _paginate_offset(queryset, cursor, page_size):
+    """paginate_keyset() for expression orderings: the cursor carries a row offset."""
+    offset = 0
+    if cursor:
+        (offset,), _ = decode_cursor(cursor, OFFSET_ORDERING)
+        if not isinstance(offset, int) or offset < 0:
+            raise InvalidCursor("Invalid cursor")
+    rows = list(queryset[offset:offset + page_size + 1])
+    has_more = len(rows) > page_size
+    next_cursor = encode_cursor([offset + page_size], False, OFFSET_ORDERING) if has_more else None
+    previous_cursor = encode_cursor([max(offset - page_size, 0)], True, OFFSET_ORDERING) if offset else None
+    return KeysetPage(rows[:page_size], next_cursor, previous_cursor)
+
+
+def approximate_count(queryset, cap=10000):
+    """
+    Cheap stand-in for COUNT(*): the cube's track total for the unfiltered table,
+    otherwise an exact count capped at `cap`. Returns (count, is_exact).
+    """
+    if not queryset.query.where:
+        return cube.track_total(), True
+    n = queryset.order_by()[: cap + 1].count()
+    return min(n, cap), n <= cap
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class using paginate_keyset().
+
+    Responses are `{"next", "previous", "results"}`; pass `?count=approx`
+    to add `approx_count` / `approx_count_exact`.
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    cursor_query_param = CURSOR_PARAM
+    count_query_param = "count"
+    count_cap = 10000
+    default_ordering = ("-track_popularity",)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, "ordering", None) or self.default_ordering
+        try:
+            self.page = paginate_keyset(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+                default_ordering=ordering,
+            )
+        except InvalidCursor as exc:
+            raise NotFound(str(exc))
+
+        self.approx = None
+        if request.query_params.get(self.count_query_param) == "approx":
+            self.approx = approximate_count(queryset, self.count_cap)
+        return self.page.object_list
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = OrderedDict([
+            ("next", self._link(self.page.next_cursor)),
+            ("previous", self._link(self.page.previous_cursor)),
+        ])
+        if self.approx is not None:
+            body["approx_count"], body["approx_count_exact"] = self.approx
+        body["results"] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "approx_count": {"type": "integer"},
+                "approx_count_exact": {"type": "boolean"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,80 @@
+"""
+JSON rendering with an optional orjson fast path.
+
+FastJSONRenderer produces exactly the bytes DRF's JSONRenderer does for
+compact, non-ASCII-escaped output (the REST_FRAMEWORK defaults), but
+encodes with orjson when it is installed. Anything orjson cannot match
+(indented output from the browsable API, ASCII escaping, values it refuses
+such as integers beyond 64 bits) goes through the stock renderer. That
+includes floats orjson spells differently from the json module -- those
+below 1e-4 or from 1e16 up (1e16 for 1e+16, 0.00001 for 1e-05) -- and
+NaN / infinities, which orjson writes as null where JSONRenderer refuses
+them.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# DRF's encoder decides how datetimes, decimals, lazy strings etc. look
+_encode_default = JSONEncoder().default
+
+
+def _same_floats(data):
+    """Whether orjson writes every float in `data` as the json module does (plain decimals)."""
+    t = type(data)
+    if t is float:
+        # False for NaN / infinities too
+        return data == 0 or 1e-4 <= abs(data) < 1e16
+    if t is dict:
+        data = data.values()
+    elif t is not list and t is not tuple:
+        return True
+    for value in data:
+        t = type(value)
+        if t is str or t is int or t is bool or value is None:
+            continue
+        if not _same_floats(value):
+            return False
+    return True
+
+
+def _default(obj):
+    value = _encode_default(obj)
+    if not _same_floats(value):
+        raise TypeError("float orjson would format differently")
+    return value
+_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+def orjson_dumps(data):
+    """JSONRenderer's compact UTF-8 bytes for `data`, or None if orjson is unavailable or cannot match them."""
+    if orjson is None:
+        return None
+    if not _same_floats(data):
+        return None
+    try:
+        out = orjson.dumps(data, default=_default, option=_OPTIONS)
+    except orjson.JSONEncodeError:
+        return None
+    # JSONRenderer escapes these so the output is also valid JavaScript
+    if b"\xe2\x80\xa8" in out or b"\xe2\x80\xa9" in out:
+        out = out.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return out
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is not None and self.compact and not self.ensure_ascii:
+            indent = self.get_indent(accepted_media_type, renderer_context or {})
+            if indent is None:
+                out = orjson_dumps(data)
+                if out is not None:
+                    return out
+        return super().render(data, accepted_media_type, renderer_context)
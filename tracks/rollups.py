@@ -0,0 +1,237 @@
+"""
+Materialised rollups of Track.
+
+Single-row writes are applied to the per-artist rollup as deltas from the
+Track signals; bulk loads call rebuild_rollups() once at the end.
+verify_rollups() compares the stored rows with a fresh GROUP BY over Track
+(see `manage.py rollups`). The "distribution" (per-slice histograms,
+tracks.distributions) and "cube" (tracks.cube) rollups are patched from
+before / after tallies of the written tracks (tally_tracks() /
+apply_track_tallies()) and rebuilt / verified here with the others. The
+genre link table (tracks.genres) is not a rollup but is derived from Track
+all the same, so it is rebuilt / verified here too as "genre_links".
+Per-year figures are read from the cube (releases_by_year_rows()).
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from . import cube, distributions
+from .genres import rebuild_track_genres, verify_track_genres
+from .models import Album, Artist, ArtistSummary, CubeCell, DistributionSlice, Track
+
+# what a rollup row depends on: contribution key -> lookup from Track
+ROLLUP_FIELDS = {
+    "artist_name": "artist__name",
+    "popularity": "track_popularity",
+    "followers": "artist__followers",
+}
+
+
+def track_contribution(track):
+    """
+    Snapshot of what a track contributes to the rollups (None for unsaved
+    tracks). `track` is a Track or a values(*ROLLUP_FIELDS.values()) row.
+    """
+    if track is None:
+        return None
+    if isinstance(track, dict):
+        values = {key: track[lookup] for key, lookup in ROLLUP_FIELDS.items()}
+    else:
+        values = {
+            "artist_name": track.artist.name,
+            "popularity": track.track_popularity,
+            "followers": track.artist.followers,
+        }
+    return {
+        "artist_name": values["artist_name"],
+        "popularity": int(values["popularity"]),
+        "followers": int(values["followers"]),
+    }
+
+
+def _add(c):
+    artist, _ = ArtistSummary.objects.get_or_create(artist_name=c["artist_name"])
+    ArtistSummary.objects.filter(pk=artist.pk).update(
+        track_count=F("track_count") + 1,
+        popularity_sum=F("popularity_sum") + c["popularity"],
+        followers_sum=F("followers_sum") + c["followers"],
+        max_track_popularity=Greatest(Coalesce("max_track_popularity", c["popularity"]), c["popularity"]),
+    )
+
+
+def _remove(c):
+    ArtistSummary.objects.filter(artist_name=c["artist_name"]).update(
+        track_count=F("track_count") - 1,
+        popularity_sum=F("popularity_sum") - c["popularity"],
+        followers_sum=F("followers_sum") - c["followers"],
+    )
+    ArtistSummary.objects.filter(artist_name=c["artist_name"], track_count__lte=0).delete()
+
+    # a max cannot be decremented; recompute it only when the removed track held it
+    artist = ArtistSummary.objects.filter(artist_name=c["artist_name"]).first()
+    if artist is not None and (artist.max_track_popularity or 0) <= c["popularity"]:
+        artist.max_track_popularity = (
+            Track.objects.filter(artist__name=c["artist_name"])
+            .aggregate(m=Max("track_popularity"))["m"]
+        )
+        artist.save(update_fields=["max_track_popularity"])
+
+
+def apply_track_change(old, new):
+    """
+    Patch the rollups for one Track write. `old` / `new` are contributions from
+    track_contribution(); either may be None (create / delete).
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        if old is not None:
+            _remove(old)
+        if new is not None:
+            _add(new)
+
+
+def _artist_rows():
+    return (
+        Track.objects.values(artist_name=F("artist__name"))
+        .annotate(
+            track_count=Count("id"),
+            popularity_sum=Sum("track_popularity"),
+            max_track_popularity=Max("track_popularity"),
+            followers_sum=Sum("artist__followers"),
+        )
+        .order_by()
+    )
+
+
+# name -> (model, key field(s), rows from Track)
+ROLLUPS = {
+    "artist": (ArtistSummary, "artist_name", _artist_rows),
+    "distribution": (DistributionSlice, ("metric", "genre", "year", "album_type"), distributions.distribution_rows),
+    "cube": (CubeCell, cube.DIMENSIONS, cube.cube_rows),
+}
+
+# derived tables with their own rebuild / check: name -> (rebuild(), verify())
+DERIVED = {
+    "genre_links": (rebuild_track_genres, verify_track_genres),
+}
+# everything `manage.py rollups` checks
+CHECKS = (*ROLLUPS, *DERIVED)
+
+# rollups patched from tallies of the affected tracks taken before and after a write
+TALLIED = (distributions, cube)
+# Artist / Album fields the TALLIED rollups of their tracks depend on
+CATALOG_FIELDS = {
+    Artist: ("popularity", "followers", "genres"),
+    Album: ("release_date", "album_type"),
+}
+
+
+def tally_tracks(queryset):
+    """What the tracks in `queryset` currently contribute to each TALLIED rollup."""
+    return [module.tally(queryset) for module in TALLIED]
+
+
+def apply_track_tallies(before, after=None):
+    """
+    Patch the TALLIED rollups from tally_tracks() taken before and after a
+    write; either may be None (nothing counted: creates / deletes).
+    """
+    for i, module in enumerate(TALLIED):
+        module.apply_tallies(before[i] if before else {}, after[i] if after else {})
+
+
+def _key(row, key):
+    return tuple(row[k] for k in key) if isinstance(key, tuple) else row[key]
+
+
+def rebuild_rollups(names=None, batch_size=1000):
+    """
+    Recompute the named rollups (all ROLLUPS by default; the loaders rebuild
+    the DERIVED tables themselves) from Track in one pass each.
+    """
+    counts = {}
+    for name in names or ROLLUPS:
+        if name in DERIVED:
+            counts[name] = DERIVED[name][0]()
+            continue
+        model, _, source = ROLLUPS[name]
+        with transaction.atomic():
+            model.objects.all().delete()
+            model.objects.bulk_create([model(**row) for row in source()], batch_size=batch_size)
+        counts[name] = model.objects.count()
+    return counts
+
+
+def refresh_rollups(artists=(), chunk_size=500):
+    """Recompute just the given artist rows from Track (incremental loads)."""
+    artists = sorted(set(artists))
+    with transaction.atomic():
+        for i in range(0, len(artists), chunk_size):
+            chunk = artists[i:i + chunk_size]
+            ArtistSummary.objects.filter(artist_name__in=chunk).delete()
+            ArtistSummary.objects.bulk_create(
+                [ArtistSummary(**row) for row in _artist_rows().filter(artist_name__in=chunk)]
+            )
+
+
+def verify_rollups(names=None):
+    """
+    Compare stored rollups with the base table.
+    Returns {name: [(key, stored, expected), ...]} listing mismatched rows only.
+    """
+    problems = {}
+    for name in names or CHECKS:
+        if name in DERIVED:
+            problems[name] = DERIVED[name][1]()
+            continue
+        model, key, source = ROLLUPS[name]
+        keys = key if isinstance(key, tuple) else (key,)
+        fields = [f.name for f in model._meta.fields if f.name not in ("id", *keys)]
+        expected = {_key(row, key): row for row in source()}
+        stored = {_key(row, key): row for row in model.objects.values(*keys, *fields)}
+
+        diffs = []
+        for k in sorted(set(expected) | set(stored), key=str):
+            if expected.get(k) != stored.get(k):
+                diffs.append((k, stored.get(k), expected.get(k)))
+        problems[name] = diffs
+    return problems
+
+
+def top_artist_rows(limit=20):
+    """Rows shaped like the old top_artists GROUP BY, read from ArtistSummary."""
+    # within equal track_count, ordering by the followers sum == ordering by the average
+    qs = ArtistSummary.objects.filter(track_count__gt=0).order_by("-track_count", "-followers_sum")
+    return [
+        {
+            "artist_name": a.artist_name,
+            "track_count": a.track_count,
+            "avg_track_popularity": a.popularity_sum / a.track_count,
+            "max_track_popularity": a.max_track_popularity,
+            "followers": a.followers_sum / a.track_count,
+        }
+        for a in qs[:limit]
+    ]
+
+
+def releases_by_year_rows():
+    """Rows shaped like the old releases_by_year GROUP BY, rolled up from the cube."""
+    years = {}
+    for cell in cube.cells(group_by=("year", "explicit")):
+        row = years.setdefault(cell["year"], {"year": cell["year"], "track_count": 0, "popularity_sum": 0,
+                                              "explicit_count": 0})
+        row["track_count"] += cell["track_count"]
+        row["popularity_sum"] += cell["popularity_sum"]
+        if cell["explicit"]:
+            row["explicit_count"] += cell["track_count"]
+    return [
+        {
+            "year": y["year"],
+            "track_count": y["track_count"],
+            "avg_track_popularity": y["popularity_sum"] / y["track_count"],
+            "explicit_count": y["explicit_count"],
+        }
+        for y in years.values()
+    ]
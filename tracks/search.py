@@ -0,0 +1,107 @@
+"""
+Full-text search over track / artist / album / genre names.
+
+On SQLite this uses the FTS5 index (TrackSearch), with prefix matching on
+every term and bm25 ranking. Other backends keep the old icontains
+behaviour. The index is contentless and kept current by the triggers from
+migration 0008 on tracks_track, tracks_artist and tracks_album;
+rebuild_search_index() refills it after loads that drop them.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Lookup, Q, TextField
+from rest_framework import filters
+
+from .models import Artist, Track, TrackGenre, TrackSearch
+
+_TOKEN = re.compile(r"\w", re.UNICODE)
+
+
+@TextField.register_lookup
+class Match(Lookup):
+    """`<fts table column>__match=query` -> FTS5 MATCH (SQLite only)."""
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def rebuild_search_index():
+    """Refill the FTS index from the tables (e.g. after a load with the triggers dropped)."""
+    table = TrackSearch._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES('delete-all')")
+        cursor.execute(
+            f"INSERT INTO {table}(rowid, track_name, artist_name, album_name, artist_genres) "
+            "SELECT t.id, t.track_name, ar.name, al.name, ar.genres FROM tracks_track t "
+            "JOIN tracks_artist ar ON ar.id = t.artist_id "
+            "JOIN tracks_album al ON al.album_id = t.album_id"
+        )
+
+
+def fts_query(terms):
+    """
+    Turn free-text terms into an FTS5 query: every term is a quoted prefix
+    match, all terms must match. Returns "" if nothing searchable is left.
+    """
+    parts = []
+    for term in terms:
+        if _TOKEN.search(term):
+            parts.append('"%s"*' % term.replace('"', '""'))
+    return " ".join(parts)
+
+
+def _icontains_search(qs, terms):
+    for term in terms:
+        qs = qs.filter(
+            Q(track_name__icontains=term)
+            | Q(artist_id__in=Artist.objects.filter(name__icontains=term).values("id"))
+            | Q(album__name__icontains=term)
+            | Q(id__in=TrackGenre.objects.filter(genre__name__icontains=term).values("track_id"))
+        )
+    return qs
+
+
+def search_tracks(qs, text, ranked=True):
+    """
+    Restrict a Track queryset to rows matching `text`.
+    With ranked=True the result is ordered best match first.
+    """
+    terms = text.replace(",", " ").split()
+    if not terms:
+        return qs
+    if not fts_available():
+        return _icontains_search(qs, terms)
+
+    query = fts_query(terms)
+    if not query:
+        return qs.none()
+    qs = qs.filter(search__document__match=query)
+    if ranked:
+        qs = qs.order_by("search__rank", "-track_popularity", "id")
+    return qs
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter backed by the FTS5 index.
+
+    Uses the same `search` query parameter. Results are ranked unless the
+    client passed an explicit `ordering`, so list this backend after
+    OrderingFilter in `filter_backends`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if queryset.model is not Track:
+            return super().filter_queryset(request, queryset, view)
+
+        text = request.query_params.get(self.search_param, "")
+        ranked = not request.query_params.get(filters.OrderingFilter.ordering_param)
+        return search_tracks(queryset, text, ranked=ranked)
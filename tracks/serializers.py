@@ -1,7 +1,25 @@
 from rest_framework import serializers
-from .models import Track
+from rest_framework.settings import ISO_8601
+
+from .catalog import FLAT_FIELDS, save_track
+from .models import Album, Track
 
 class TrackSerializer(serializers.ModelSerializer):
+    # artist / album values are stored on Artist / Album (tracks.catalog);
+    # the API keeps reading and writing them as flat track fields
+    artist_name = serializers.CharField(source="artist.name", max_length=300)
+    artist_popularity = serializers.IntegerField(source="artist.popularity", min_value=0, max_value=100)
+    artist_followers = serializers.IntegerField(source="artist.followers", min_value=0)
+    artist_genres = serializers.CharField(
+        source="artist.genres", allow_blank=True, allow_null=True, required=False,
+        style={"base_template": "textarea.html"},
+    )
+    album_id = serializers.CharField(max_length=80)
+    album_name = serializers.CharField(source="album.name", max_length=300)
+    album_release_date = serializers.DateField(source="album.release_date")
+    album_total_tracks = serializers.IntegerField(source="album.total_tracks", min_value=1)
+    album_type = serializers.ChoiceField(source="album.album_type", choices=Album.ALBUM_TYPES)
+
     def validate_track_popularity(self, v):
         if not (0 <= v <= 100):
             raise serializers.ValidationError("track_popularity must be 0–100.")
@@ -11,10 +29,29 @@ class TrackSerializer(serializers.ModelSerializer):
         if not (0 <= v <= 100):
             raise serializers.ValidationError("artist_popularity must be 0–100.")
         return v
-    
+
+    def flat_values(self, validated_data):
+        """validated_data ({"artist": {"name": ...}, ...}) as a flat tracks.catalog row."""
+        row = {}
+        for field in self._writable_fields:
+            value = validated_data
+            for attr in field.source_attrs:
+                if not isinstance(value, dict) or attr not in value:
+                    break
+                value = value[attr]
+            else:
+                row[field.field_name] = value
+        return row
+
+    def create(self, validated_data):
+        return save_track(self.flat_values(validated_data))
+
+    def update(self, instance, validated_data):
+        return save_track(self.flat_values(validated_data), instance)
+
     class Meta:
         model = Track
-        fields = "__all__"
+        fields = ["id", *FLAT_FIELDS]
 
 
 class TopArtistSummarySerializer(serializers.Serializer):
@@ -40,11 +77,100 @@ class GenreCountSerializer(serializers.Serializer):
 class CleanHitsSerializer(serializers.Serializer):
     filters = serializers.DictField()
     summary = serializers.DictField()
-    top_tracks = TrackSerializer(many=True)
+    # rows from TrackRowSerializer, already in TrackSerializer's output shape
+    top_tracks = serializers.ReadOnlyField()
 
 
 class ArtistAlbumTypeBreakdownSerializer(serializers.Serializer):
     artist_name = serializers.CharField()
     album_type = serializers.CharField()
     track_count = serializers.IntegerField()
-    avg_track_popularity = serializers.FloatField(allow_null=True)
\ No newline at end of file
+    avg_track_popularity = serializers.FloatField(allow_null=True)
+
+
+class FacetCountSerializer(serializers.Serializer):
+    value = serializers.ReadOnlyField()
+    count = serializers.IntegerField()
+
+
+class TrackFacetsSerializer(serializers.Serializer):
+    total = serializers.IntegerField()
+    album_type = FacetCountSerializer(many=True)
+    year = FacetCountSerializer(many=True)
+    explicit = FacetCountSerializer(many=True)
+    genre = FacetCountSerializer(many=True)
+
+
+# -----------------------
+# Fast read path
+# -----------------------
+
+def _iso_date(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _converter(field):
+    """
+    Plain function doing what `field.to_representation` does for the values
+    a values() query returns, or the bound method itself if there is no
+    shortcut for this field type.
+    """
+    kind = type(field)
+    if kind is serializers.IntegerField:
+        return int
+    if kind is serializers.FloatField:
+        return float
+    if kind is serializers.CharField:
+        return str
+    if kind is serializers.BooleanField:
+        return bool
+    if kind is serializers.DateField and getattr(field, "format", ISO_8601) == ISO_8601:
+        return _iso_date
+    if kind is serializers.ChoiceField:
+        lookup = field.choice_strings_to_values
+        return lambda v: v if v == "" else lookup.get(str(v), v)
+    return field.to_representation
+
+
+class TrackRowSerializer:
+    """
+    Read-only twin of a ModelSerializer for values() rows.
+
+    The serializer's readable fields are resolved once into (name, source,
+    converter) triples, so each row is one dict build instead of DRF's
+    per-field get_attribute / to_representation dispatch. The output is the
+    same as `serializer_class(instances, many=True).data`.
+    """
+
+    def __init__(self, serializer_class=TrackSerializer):
+        self.serializer_class = serializer_class
+        self._spec = None
+
+    @property
+    def spec(self):
+        if self._spec is None:
+            fields = self.serializer_class().fields.values()
+            # dotted sources ("artist.name") become values() lookups ("artist__name")
+            self._spec = [
+                (f.field_name, "__".join(f.source_attrs), _converter(f))
+                for f in fields if not f.write_only
+            ]
+        return self._spec
+
+    @property
+    def value_fields(self):
+        """Arguments for queryset.values()."""
+        return [source for _, source, _ in self.spec]
+
+    def to_representation(self, row):
+        return {
+            name: None if row[source] is None else convert(row[source])
+            for name, source, convert in self.spec
+        }
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+track_rows = TrackRowSerializer()
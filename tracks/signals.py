@@ -0,0 +1,139 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .genres import rebuild_track_genres, split_genres, sync_track_genres
+from .models import Album, Artist, Track
+from .rollups import (
+    CATALOG_FIELDS, ROLLUP_FIELDS, apply_track_change, apply_track_tallies, refresh_rollups, tally_tracks,
+    track_contribution,
+)
+from .versioning import advance_version
+
+_state = threading.local()
+
+
+@contextmanager
+def paused():
+    """
+    Skip per-row derived-data maintenance inside the block.
+    Bulk loaders use this and rebuild the derived tables once afterwards.
+    """
+    previous = getattr(_state, "paused", False)
+    _state.paused = True
+    try:
+        yield
+    finally:
+        _state.paused = previous
+
+
+def is_paused():
+    return getattr(_state, "paused", False)
+
+
+@receiver(pre_save, sender=Track)
+def track_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or is_paused():
+        return
+    # remember what the row looked like before the write, for rollup deltas
+    old = None
+    if instance.pk is not None:
+        old = (Track.objects.filter(pk=instance.pk)
+               .values(*ROLLUP_FIELDS.values(), "artist_id", "album_id", "artist__genres").first())
+    instance._rollup_old = track_contribution(old)
+    instance._catalog_old = old
+    instance._tallies_old = tally_tracks(Track.objects.filter(pk=instance.pk)) if old is not None else None
+
+
+@receiver(post_save, sender=Track)
+def track_saved(sender, instance, raw=False, **kwargs):
+    # fixtures (raw) are loaded as-is; derived tables are rebuilt separately
+    if raw or is_paused():
+        return
+    sync_track_genres(instance)
+    apply_track_change(getattr(instance, "_rollup_old", None), track_contribution(instance))
+    apply_track_tallies(getattr(instance, "_tallies_old", None), tally_tracks(Track.objects.filter(pk=instance.pk)))
+    # the artist / album may have been created for this track, so refresh them too
+    old = getattr(instance, "_catalog_old", None) or {}
+    autocomplete.note_write(
+        *advance_version(),
+        tracks=[instance.pk],
+        artists={instance.artist_id, old.get("artist_id")} - {None},
+        albums={instance.album_id, old.get("album_id")} - {None},
+        genres={*split_genres(instance.artist.genres), *split_genres(old.get("artist__genres"))},
+    )
+
+
+@receiver(pre_delete, sender=Track)
+def track_pre_delete(sender, instance, **kwargs):
+    if is_paused():
+        return
+    instance._tallies_old = tally_tracks(Track.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Track)
+def track_deleted(sender, instance, **kwargs):
+    if is_paused():
+        return
+    apply_track_change(track_contribution(instance), None)
+    apply_track_tallies(getattr(instance, "_tallies_old", None))
+    autocomplete.note_write(
+        *advance_version(),
+        tracks=[instance.pk], albums=[instance.album_id], genres=split_genres(instance.artist.genres),
+    )
+
+
+# Artist / Album rows are shared by many tracks, so a change to one of them
+# refreshes the affected rollup rows (and genre links) from the tracks.
+
+@receiver(pre_save, sender=Artist)
+@receiver(pre_save, sender=Album)
+def catalog_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or is_paused():
+        return
+    old = sender.objects.filter(pk=instance.pk).first() if instance.pk is not None else None
+    instance._old = old
+    instance._tallies_old = None
+    if old is not None and any(getattr(old, f) != getattr(instance, f) for f in CATALOG_FIELDS[sender]):
+        instance._tallies_old = tally_tracks(old.tracks.all())
+
+
+def _patch_tallies(instance):
+    old = getattr(instance, "_tallies_old", None)
+    if old is not None:
+        apply_track_tallies(old, tally_tracks(instance.tracks.all()))
+
+
+@receiver(post_save, sender=Artist)
+def artist_saved(sender, instance, raw=False, created=False, **kwargs):
+    if raw or is_paused() or created:
+        return
+    old = getattr(instance, "_old", None)
+    if old is None:
+        return
+    if (old.name, old.followers) != (instance.name, instance.followers):
+        refresh_rollups(artists={old.name, instance.name})
+    if old.genres != instance.genres:
+        rebuild_track_genres(instance.tracks.all())
+    _patch_tallies(instance)
+    previous, token = advance_version()
+    if old.name == instance.name:
+        # a rename changes every track entry of the artist: left to the next rebuild
+        autocomplete.note_write(
+            previous, token,
+            artists=[instance.pk], genres={*split_genres(old.genres), *split_genres(instance.genres)},
+        )
+
+
+@receiver(post_save, sender=Album)
+def album_saved(sender, instance, raw=False, created=False, **kwargs):
+    if raw or is_paused() or created:
+        return
+    old = getattr(instance, "_old", None)
+    if old is None:
+        return
+    _patch_tallies(instance)
+    autocomplete.note_write(*advance_version(), albums=[instance.album_id])
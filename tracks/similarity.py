@@ -0,0 +1,171 @@
+"""
+Nearest-neighbour index behind /api/tracks/<id>/similar/.
+
+Every track becomes one row of a float32 feature matrix: track popularity,
+artist popularity, log followers, duration, release year and the explicit
+flag, each standardised (z-score) and weighted by FEATURE_WEIGHTS, followed
+by the artist's genres hashed into GENRE_DIMS buckets (multi-hot, scaled to
+length FEATURE_WEIGHTS["genres"]). Tracks are similar when their rows are
+close: squared distances come from |a|^2 + |b|^2 - 2 a.b, so a query for
+several seed tracks is one matrix product per chunk of rows, and
+np.argpartition keeps the k best of each chunk without sorting it.
+
+Like tracks.snapshot, each worker process keeps one model tagged with the
+data version and rebuilds it on the first read after a write, so a request
+only reads the rows it returns from the database. get_model() returns None
+when NumPy is not installed.
+"""
+import threading
+import zlib
+
+from django.db.models.functions import ExtractYear
+
+from .models import Track, TrackGenre
+from .versioning import current_version
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+NUMERIC_FEATURES = ("popularity", "artist_popularity", "followers", "duration", "year", "explicit")
+FEATURE_WEIGHTS = {
+    "popularity": 1.0,
+    "artist_popularity": 1.0,
+    "followers": 1.0,
+    "duration": 0.5,
+    "year": 1.0,
+    "explicit": 0.5,
+    "genres": 2.0,
+}
+GENRE_DIMS = 32
+CHUNK_ROWS = 65536
+MAX_K = 100
+MAX_SEEDS = 50
+
+
+def genre_bucket(name):
+    """Stable hash bucket of a genre name (hash() is salted per process)."""
+    return zlib.crc32(name.encode()) % GENRE_DIMS
+
+
+class SimilarityModel:
+    """Feature matrix for every Track row, ordered by primary key."""
+
+    def __init__(self, version):
+        self.version = version
+
+        rows = list(
+            Track.objects.annotate(year=ExtractYear("album__release_date"))
+            .order_by("id")
+            .values_list(
+                "id", "track_popularity", "artist__popularity", "artist__followers",
+                "track_duration_min", "year", "explicit",
+            )
+        )
+        cols = list(zip(*rows)) or [()] * 7
+        del rows
+        self.ids = np.asarray(cols[0], dtype=np.int64)
+
+        numeric = np.column_stack([
+            np.asarray(cols[1], dtype=np.float64),
+            np.asarray(cols[2], dtype=np.float64),
+            np.log1p(np.asarray(cols[3], dtype=np.float64)),
+            np.asarray(cols[4], dtype=np.float64),
+            np.asarray(cols[5], dtype=np.float64),
+            np.asarray(cols[6], dtype=np.float64),
+        ])
+        if len(self.ids):
+            std = numeric.std(axis=0)
+            std[std == 0] = 1.0  # a constant column carries no information
+            numeric = (numeric - numeric.mean(axis=0)) / std
+        numeric *= np.asarray([FEATURE_WEIGHTS[f] for f in NUMERIC_FEATURES])
+
+        genres = np.zeros((len(self.ids), GENRE_DIMS), dtype=np.float32)
+        links = TrackGenre.objects.order_by().values_list("track_id", "genre__name")
+        buckets = {}
+        track_ids, genre_cols = [], []
+        for track_id, name in links.iterator(chunk_size=10000):
+            if name not in buckets:
+                buckets[name] = genre_bucket(name)
+            track_ids.append(track_id)
+            genre_cols.append(buckets[name])
+        genres[np.searchsorted(self.ids, np.asarray(track_ids, dtype=np.int64)),
+               np.asarray(genre_cols, dtype=np.intp)] = 1.0
+        norms = np.linalg.norm(genres, axis=1, keepdims=True)
+        np.divide(genres, norms, out=genres, where=norms > 0)
+        genres *= FEATURE_WEIGHTS["genres"]
+
+        self.matrix = np.hstack([numeric.astype(np.float32), genres])
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, track_ids):
+        """Matrix rows of the given track ids (-1 for ids that are not loaded)."""
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, track_ids)
+        pos[pos >= len(self.ids)] = 0
+        found = (self.ids[pos] == track_ids) if len(self.ids) else np.zeros(len(track_ids), dtype=bool)
+        return np.where(found, pos, -1)
+
+    def nearest(self, seeds, k):
+        """
+        For each seed row, the k other tracks closest to it, best first, as
+        a list of [(track id, distance), ...] lists.
+        """
+        seeds = np.asarray(seeds, dtype=np.intp)
+        k = min(k, len(self) - 1)
+        if k <= 0 or not len(seeds):
+            return [[] for _ in seeds]
+        query = self.matrix[seeds]  # (s, d)
+        query_sq = self.sq_norms[seeds]
+
+        best_rows, best_dist = [], []
+        for start in range(0, len(self), CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, len(self))
+            # (seeds, chunk rows): each seed's distances are contiguous for the partition
+            dist = query_sq[:, None] + self.sq_norms[None, start:stop] - 2 * (query @ self.matrix[start:stop].T)
+            # a seed is not its own neighbour
+            inside = (seeds >= start) & (seeds < stop)
+            dist[np.flatnonzero(inside), seeds[inside] - start] = np.inf
+            if k < stop - start:
+                part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            else:
+                part = np.repeat(np.arange(stop - start)[None, :], len(seeds), axis=0)
+            best_rows.append(part + start)
+            best_dist.append(np.take_along_axis(dist, part, axis=1))
+
+        rows = np.concatenate(best_rows, axis=1)  # (seeds, candidates)
+        dist = np.concatenate(best_dist, axis=1)
+        results = []
+        for seed_rows, seed_dist in zip(rows, dist):
+            # closest first, ties by id
+            order = np.lexsort((self.ids[seed_rows], seed_dist))[:k]
+            results.append([
+                (int(self.ids[seed_rows[i]]), max(float(seed_dist[i]), 0.0) ** 0.5)
+                for i in order if np.isfinite(seed_dist[i])
+            ])
+        return results
+
+
+_lock = threading.Lock()
+_model = None
+
+
+def get_model():
+    """Current model for this process, rebuilt if the data version moved (None without NumPy)."""
+    global _model
+    if np is None:
+        return None
+
+    version = current_version()
+    model = _model
+    if model is not None and model.version == version:
+        return model
+
+    with _lock:
+        if _model is None or _model.version != version:
+            _model = SimilarityModel(version)
+        return _model
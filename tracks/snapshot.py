@@ -0,0 +1,161 @@
+"""
+Optional in-memory columnar snapshot of Track for the analytics endpoints.
+
+Each worker process keeps one snapshot: NumPy arrays for the numeric columns
+plus dictionary-encoded artist / album_type / genre codes. Filters become
+boolean masks and group-bys become bincounts, so the insights views never
+touch SQLite for their aggregates.
+
+The snapshot is tagged with the global data version (tracks.versioning) and
+rebuilt lazily on the first read after a write. When NumPy is not installed,
+or TRACKS_ANALYTICS_SNAPSHOT is off, get_snapshot() returns None and the
+views use their ORM code path.
+"""
+import threading
+
+from django.conf import settings
+from django.db.models.functions import ExtractYear
+
+from .models import Track, TrackGenre
+from .versioning import current_version
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+def _encode(values):
+    """Dictionary-encode a list of strings -> (sorted labels, int32 codes)."""
+    labels, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+    return list(labels), codes.astype(np.int32)
+
+
+class TrackSnapshot:
+    """Column arrays for every Track row, ordered by primary key."""
+
+    def __init__(self, version):
+        self.version = version
+
+        rows = list(
+            Track.objects.annotate(year=ExtractYear("album__release_date"))
+            .order_by("id")
+            .values_list(
+                "id", "track_popularity", "artist__followers", "track_duration_min",
+                "year", "explicit", "artist__name", "album__album_type",
+            )
+        )
+        cols = list(zip(*rows)) or [()] * 8
+
+        self.ids = np.asarray(cols[0], dtype=np.int64)
+        self.popularity = np.asarray(cols[1], dtype=np.int16)
+        self.followers = np.asarray(cols[2], dtype=np.int64)
+        self.duration = np.asarray(cols[3], dtype=np.float64)
+        self.year = np.asarray(cols[4], dtype=np.int16)
+        self.explicit = np.asarray(cols[5], dtype=bool)
+        self.artists, self.artist_code = _encode(cols[6])
+        self.album_types, self.album_type_code = _encode(cols[7])
+
+        # genres as a (row, genre code) edge list, like the link table
+        links = list(TrackGenre.objects.order_by().values_list("track_id", "genre__name"))
+        link_cols = list(zip(*links)) or [(), ()]
+        self.genre_row = np.searchsorted(self.ids, np.asarray(link_cols[0], dtype=np.int64))
+        self.genres, self.genre_code = _encode(link_cols[1])
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -----------------------
+    # masks
+    # -----------------------
+
+    def all(self):
+        return np.ones(len(self), dtype=bool)
+
+    @staticmethod
+    def _matching_codes(labels, needle, exact=False):
+        needle = needle.strip().lower()
+        if exact:
+            return np.asarray([i for i, x in enumerate(labels) if x.lower() == needle], dtype=np.int32)
+        return np.asarray([i for i, x in enumerate(labels) if needle in x.lower()], dtype=np.int32)
+
+    def artist_contains(self, text):
+        return np.isin(self.artist_code, self._matching_codes(self.artists, text))
+
+    def album_type_is(self, album_type):
+        return np.isin(self.album_type_code, self._matching_codes(self.album_types, album_type, exact=True))
+
+    def genre_contains(self, text):
+        """Rows with at least one genre whose name contains `text` (same as filter_by_genre)."""
+        hit = np.isin(self.genre_code, self._matching_codes(self.genres, text))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.genre_row[hit]] = True
+        return mask
+
+    # -----------------------
+    # aggregations
+    # -----------------------
+
+    def summary(self, mask):
+        """Same keys / types as the clean_hits ORM aggregate."""
+        n = int(mask.sum())
+        if not n:
+            return {"results": 0, "avg_popularity": None, "max_popularity": None,
+                    "min_duration": None, "max_duration": None}
+        pop = self.popularity[mask]
+        dur = self.duration[mask]
+        return {
+            "results": n,
+            "avg_popularity": float(pop.mean()),
+            "max_popularity": int(pop.max()),
+            "min_duration": float(dur.min()),
+            "max_duration": float(dur.max()),
+        }
+
+    def top_ids(self, mask, limit):
+        """Track ids ordered by -popularity, -followers (then id), like the ORM query."""
+        idx = np.flatnonzero(mask)
+        order = np.lexsort((self.ids[idx], -self.followers[idx], -self.popularity[idx].astype(np.int32)))
+        return [int(x) for x in self.ids[idx[order[:limit]]]]
+
+    def artist_albumtype_breakdown(self, mask):
+        n_types = max(len(self.album_types), 1)
+        key = self.artist_code[mask].astype(np.int64) * n_types + self.album_type_code[mask]
+        counts = np.bincount(key, minlength=0)
+        pop_sums = np.bincount(key, weights=self.popularity[mask], minlength=len(counts))
+
+        rows = []
+        for k in np.flatnonzero(counts):  # codes are sorted labels, so this is ORDER BY artist, type
+            c = int(counts[k])
+            rows.append({
+                "artist_name": self.artists[k // n_types],
+                "album_type": self.album_types[k % n_types],
+                "track_count": c,
+                "avg_track_popularity": float(pop_sums[k]) / c,
+            })
+        return rows
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def snapshot_enabled():
+    return np is not None and getattr(settings, "TRACKS_ANALYTICS_SNAPSHOT", True)
+
+
+def get_snapshot():
+    """Current snapshot for this process, rebuilt if the data version moved (None if disabled)."""
+    global _snapshot
+    if not snapshot_enabled():
+        return None
+
+    version = current_version()
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        return snap
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = TrackSnapshot(version)
+        return _snapshot
@@ -0,0 +1,213 @@
+"""
+Seeded synthetic track generator for scale testing.
+
+Rows come out of `generate_rows()` one at a time, in INGEST_COLUMNS order,
+so 10M tracks never sit in memory. The shape follows the bundled Spotify
+dump: a Zipf-skewed artist catalogue (a few artists own most tracks), 1-5
+genres per artist drawn from a skewed vocabulary, album/single/compilation
+in roughly 68/26/6 proportions, release years weighted towards recent ones,
+and popularity/followers that track artist rank.
+
+Like tracks.ingest this module does not import Django models.
+"""
+import math
+import random
+import string
+from datetime import date, timedelta
+from itertools import accumulate
+
+from .ingest import INGEST_COLUMNS
+
+# most common genres in the bundled dataset, most frequent first
+GENRES = [
+    "pop", "country", "soundtrack", "hip hop", "indie", "folk", "rock", "rap",
+    "alternative pop", "soft pop", "synthpop", "art pop", "alternative r&b", "r&b pop",
+    "r&b", "nu metal", "dark r&b", "edm", "pop punk", "grunge", "egyptian pop",
+    "indie pop", "classic rock", "pop rock", "acoustic country", "latin", "k-pop",
+    "emo rap", "alternative rock", "alternative metal", "metal", "reggaeton", "medieval",
+    "anime", "urbano latino", "cloud rap", "rap metal", "classic country", "trap latino",
+    "country pop", "experimental", "electropop", "dark pop", "old school hip hop",
+    "art rock", "soft rock", "east coast hip hop", "industrial", "industrial metal",
+    "industrial rock", "khaleeji", "contemporary r&b", "slap house", "rage rap",
+    "latin pop", "psychedelic rock", "bedroom pop", "melodic rap", "hard rock", "celtic",
+    "west coast hip hop", "post-grunge", "hyperpop", "gangster rap", "emo",
+    "garage rock", "tropical house", "darkwave", "pop country", "nightcore", "baroque pop",
+]
+NO_GENRE = "N/A"  # how the Spotify dump marks artists without genres
+
+WORDS = [
+    "midnight", "golden", "electric", "broken", "silver", "wild", "paper", "velvet",
+    "neon", "summer", "crystal", "hollow", "burning", "quiet", "lucky", "lonely",
+    "heart", "river", "city", "fire", "ghost", "dream", "echo", "storm", "shadow",
+    "light", "ocean", "road", "night", "garden", "mirror", "signal", "thunder",
+    "honey", "static", "gravity", "paradise", "satellite", "wolves", "diamonds",
+]
+FIRST_NAMES = [
+    "Lana", "Jay", "Mila", "Leo", "Ava", "Noah", "Zara", "Kai", "Nina", "Omar",
+    "Ruby", "Theo", "Ivy", "Dante", "Luna", "Felix", "Sia", "Marco", "Yara", "Eli",
+]
+LAST_NAMES = [
+    "Stone", "Rivers", "Vega", "Knight", "Hart", "Blake", "Cruz", "Moon", "Fox", "Reyes",
+    "West", "Lane", "Cole", "Frost", "Wilde", "Snow", "Rain", "Gray", "Sky", "Bloom",
+]
+
+# drawn per album; with the sizes in _album_size this gives about 68/26/6 per track
+ALBUM_TYPES = [("album", 0.228), ("single", 0.76), ("compilation", 0.0125)]
+GENRE_COUNTS = [(1, 0.67), (2, 0.15), (3, 0.07), (4, 0.09), (5, 0.02)]
+END_DATE = date(2025, 10, 31)  # newest release in the bundled dataset
+FIRST_YEAR = 1950
+
+_ID_ALPHABET = string.digits + string.ascii_letters
+_EXPLICIT = INGEST_COLUMNS.index("explicit")
+_RELEASED = INGEST_COLUMNS.index("album_release_date")
+
+
+def _spotify_id(rng):
+    """22-character base62 id, the shape of Spotify track/album ids."""
+    n = rng.getrandbits(131)
+    chars = []
+    for _ in range(22):
+        n, r = divmod(n, 62)
+        chars.append(_ID_ALPHABET[r])
+    return "".join(chars)
+
+
+def _zipf_cum_weights(n, skew):
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def _weighted(rng, pairs):
+    return rng.choices([v for v, _ in pairs], weights=[w for _, w in pairs])[0]
+
+
+def _clamp(value, lo, hi):
+    return max(lo, min(hi, value))
+
+
+def _title(rng, words=2):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+class _Catalogue:
+    """Per-artist attributes, derived from (seed, rank) so they never depend on draw order."""
+
+    def __init__(self, seed, artists, skew):
+        self.seed = seed
+        self.count = artists
+        self.cum_weights = _zipf_cum_weights(artists, skew)
+        self.genre_weights = _zipf_cum_weights(len(GENRES), 0.9)
+        self._cache = {}
+
+    def name(self, rank):
+        combos = len(FIRST_NAMES) * len(LAST_NAMES)
+        i = rank - 1
+        first = FIRST_NAMES[i % len(FIRST_NAMES)]
+        last = LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        base = f"{first} {last}"
+        return base if i < combos else f"{base} {i // combos + 1}"
+
+    def artist(self, rank):
+        cached = self._cache.get(rank)
+        if cached is not None:
+            return cached
+
+        rng = random.Random(f"{self.seed}:artist:{rank}")
+        # popularity falls with rank; the head of the catalogue sits in the 80s-90s
+        popularity = _clamp(round(95 - 55 * math.sqrt(rank / self.count) + rng.gauss(0, 5)), 0, 100)
+        followers = int(10 ** _clamp(1.8 + 6 * popularity / 100 + rng.gauss(0, 0.6), 0, 9))
+
+        if rng.random() < 0.25:
+            genres = NO_GENRE
+        else:
+            picked = []
+            for _ in range(_weighted(rng, GENRE_COUNTS)):
+                genre = rng.choices(GENRES, cum_weights=self.genre_weights)[0]
+                if genre not in picked:
+                    picked.append(genre)
+            genres = ", ".join(picked)
+
+        cached = {
+            "name": self.name(rank),
+            "popularity": popularity,
+            "followers": followers,
+            "genres": genres,
+            "explicit_rate": rng.choice([0.02, 0.1, 0.3, 0.6]),
+        }
+        self._cache[rank] = cached
+        return cached
+
+    def pick(self, rng):
+        return rng.choices(range(1, self.count + 1), cum_weights=self.cum_weights)[0]
+
+
+def _release_date(rng, end_date):
+    # exponential age: roughly half the catalogue is from the last 8 years
+    year = _clamp(end_date.year - int(rng.expovariate(1 / 11)), FIRST_YEAR, end_date.year)
+    start = date(year, 1, 1)
+    last = min(date(year, 12, 31), end_date)
+    return start + timedelta(days=rng.randrange((last - start).days + 1))
+
+
+def _album_size(rng, album_type):
+    if album_type == "single":
+        return _weighted(rng, [(1, 0.75), (2, 0.1), (3, 0.08), (4, 0.04), (5, 0.03)])
+    if album_type == "compilation":
+        return rng.randint(12, 30)
+    return _clamp(round(rng.gauss(13, 3.5)), 4, 30)
+
+
+def generate_rows(count, seed=0, artists=None, skew=0.9, end_date=END_DATE):
+    """
+    Yield `count` synthetic tracks as tuples in INGEST_COLUMNS order
+    (explicit as bool, release date as a date). The same arguments always
+    produce the same rows.
+    """
+    rng = random.Random(seed)
+    catalogue = _Catalogue(seed, artists or max(count // 10, 1), skew)
+
+    produced = 0
+    while produced < count:
+        artist = catalogue.artist(catalogue.pick(rng))
+        album_type = _weighted(rng, ALBUM_TYPES)
+        size = _album_size(rng, album_type)
+        album_id = _spotify_id(rng)
+        album_name = _title(rng, rng.randint(1, 3))
+        released = _release_date(rng, end_date)
+        # catalogue tracks lose popularity with age
+        age_penalty = min((end_date - released).days / 365 * 0.6, 25)
+
+        for number in range(1, size + 1):
+            if produced >= count:
+                return
+            name = album_name if size == 1 else _title(rng, rng.randint(1, 3))
+            if rng.random() < 0.05:
+                name += f" (ft. {catalogue.name(catalogue.pick(rng))})"
+            popularity = rng.gauss(artist["popularity"] * 0.75 - age_penalty, 14)
+            if rng.random() < 0.07:
+                popularity = rng.uniform(0, 5)  # fresh uploads / region-locked tracks sit near zero
+            yield (
+                _spotify_id(rng),
+                name,
+                number,
+                _clamp(round(popularity), 0, 100),
+                rng.random() < artist["explicit_rate"],
+                artist["name"],
+                artist["popularity"],
+                artist["followers"],
+                artist["genres"],
+                album_id,
+                album_name,
+                released,
+                size,
+                album_type,
+                round(_clamp(rng.lognormvariate(math.log(3.3), 0.25), 0.5, 15.0), 2),
+            )
+            produced += 1
+
+
+def csv_row(row):
+    """Format a generated row the way the Spotify CSV spells its values."""
+    row = list(row)
+    row[_EXPLICIT] = "TRUE" if row[_EXPLICIT] else "FALSE"
+    row[_RELEASED] = row[_RELEASED].isoformat()
+    return row
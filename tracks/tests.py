@@ -1,16 +1,44 @@
-from datetime import date
-from django.test import TestCase
+import csv
+import gzip
+import json
+import math
+import os
+import random
+import re
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, F, Max, Min, Sum
+from django.test import TestCase, TransactionTestCase
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 
-from .models import Track
+from . import autocomplete, caching, compression
+from .catalog import flat_values, save_track
+from .facets import list_page_facets
+from .models import Album, Artist, Track, TrackGenre
+from .pagination import InvalidCursor, approximate_count, paginate_keyset
+from .renderers import FastJSONRenderer
+from .rollups import verify_rollups
+from .serializers import TrackSerializer, track_rows
+from .views import EXPORT_FIELDS
 
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
 
+
+# the async summary views' worker-thread connections can't see rows inside a TestCase transaction
+@override_settings(TRACKS_ASYNC_PARALLEL_QUERIES=False)
 class TrackAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
-        self.t1 = Track.objects.create(
+        self.t1 = save_track(dict(
             track_id="T001",
             track_name="Song A",
             track_number=1,
@@ -26,12 +54,12 @@ class TrackAPITests(TestCase):
             album_total_tracks=10,
             album_type="album",
             track_duration_min=3.5,
-        )
+        ))
 
     def test_api_list(self):
         r = self.client.get("/api/tracks/")
         self.assertEqual(r.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(r.data), 1)
+        self.assertGreaterEqual(len(r.data["results"]), 1)
 
     def test_api_post_create(self):
         payload = {
@@ -54,6 +82,191 @@ class TrackAPITests(TestCase):
         r = self.client.post("/api/tracks/", payload, format="json")
         self.assertEqual(r.status_code, status.HTTP_201_CREATED)
 
+    def test_api_keyset_pagination(self):
+        for i in range(5):
+            save_track(dict(
+                track_id=f"P{i}", track_name=f"Page {i}", track_number=1,
+                track_popularity=80 if i < 3 else 10 + i, explicit=False,
+                artist_name="Pager", artist_popularity=10, artist_followers=10,
+                artist_genres="", album_id="PA", album_name="Paged",
+                album_release_date=date(2020, 1, 1), album_total_tracks=5,
+                album_type="album", track_duration_min=3.0,
+            ))
+        seen = []
+        url = "/api/tracks/?page_size=2&count=approx"
+        while url:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.data["approx_count"], 6)
+            seen.extend(t["track_id"] for t in r.data["results"])
+            url = r.data["next"]
+        # popularity ties (80) are broken by id, and every row appears exactly once
+        self.assertEqual(seen, ["T001", "P0", "P1", "P2", "P4", "P3"])
+
+        r = self.client.get(r.data["previous"])
+        self.assertEqual([t["track_id"] for t in r.data["results"]], ["P1", "P2"])
+
+        r = self.client.get("/api/tracks/?cursor=garbage")
+        self.assertEqual(r.status_code, 404)
+
+    def test_keyset_pagination_falls_back_to_offsets_for_expressions(self):
+        for i in range(4):
+            save_track({**flat_values(self.t1), "track_id": f"E{i}", "track_popularity": 50 + i})
+        # an expression ordering cannot be a keyset filter; every row still appears once
+        qs = Track.objects.order_by(F("track_popularity").desc(nulls_last=True), "id")
+        seen, cursor = [], None
+        while True:
+            page = paginate_keyset(qs, cursor, 2)
+            seen.extend(t.track_id for t in page)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, list(qs.values_list("track_id", flat=True)))
+        previous = paginate_keyset(qs, page.previous_cursor, 2)
+        self.assertEqual([t.track_id for t in previous], seen[2:4])
+        with self.assertRaises(InvalidCursor):
+            paginate_keyset(Track.objects.order_by("id"), cursor, 2)
+
+    def test_export_streams_filtered_rows(self):
+        r = self.client.get("/api/tracks/export/?genre=dance")
+        self.assertEqual(r["Content-Type"], "application/x-ndjson")
+        lines = b"".join(r.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), json.loads(json.dumps(TrackSerializer(self.t1).data)))
+
+        r = self.client.get("/api/tracks/export/?format=csv&genre=metal")
+        lines = b"".join(r.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [",".join(EXPORT_FIELDS)])
+
+        r = self.client.get("/api/tracks/export/?format=xml")
+        self.assertEqual(r.status_code, 400)
+
+    def test_loader_upsert_counts(self):
+        from load_spotify import LOAD_FIELDS, upsert_data
+
+        row = flat_values(self.t1)
+        # shares T001's artist and album but is not in the CSV
+        save_track(dict(row, track_id="T002", track_name="Old"))
+        rows = [
+            dict(row, track_popularity=81),             # changed
+            dict(row, track_id="T900", track_name="New"),  # inserted
+        ]
+        # the shared values T002 picks up: it moves between histogram slices / cube cells
+        rows[1].update(artist_genres="rock", album_release_date=date(2015, 6, 1))
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=LOAD_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(os.remove, f.name)
+
+        counts = upsert_data(f.name)
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "unchanged": 0, "deleted": 0})
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+        counts = upsert_data(f.name, delete_missing=True)
+        self.assertEqual(counts, {"inserted": 0, "updated": 0, "unchanged": 2, "deleted": 1})
+
+        self.t1.refresh_from_db()
+        self.assertEqual(self.t1.track_popularity, 81)
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+
+    def test_loader_shares_artists_and_albums(self):
+        from load_spotify import LOAD_FIELDS, load_data
+
+        row = flat_values(self.t1)
+        rows = [
+            dict(row, track_id="L1"),
+            dict(row, track_id="L2", artist_followers=7, album_name="Album 1 (Deluxe)"),
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=LOAD_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(os.remove, f.name)
+
+        load_data(f.name)
+        # one artist and one album; where the rows disagree the last one wins
+        self.assertEqual(list(Artist.objects.values_list("name", "followers")), [("Artist 1", 7)])
+        self.assertEqual(list(Album.objects.values_list("name", flat=True)), ["Album 1 (Deluxe)"])
+        self.assertEqual(Track.objects.filter(artist__name="Artist 1", album_id="ALB1").count(), 2)
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+
+    def test_artist_change_reaches_every_track(self):
+        t2 = save_track(dict(flat_values(self.t1), track_id="T005", track_name="Other"))
+        self.assertEqual(Artist.objects.count(), 1)
+
+        items = [{"op": "update", "track_id": t2.track_id, "artist_followers": 5}]
+        self.assertEqual(self.client.post("/api/tracks/batch/", items, format="json").status_code, 200)
+        r = self.client.get("/api/tracks/")
+        self.assertEqual([t["artist_followers"] for t in r.data["results"]], [5, 5])
+        self.assertEqual(self.client.get("/api/tracks/summary/top-artists/").data[0]["followers"], 5)
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+
+        # the search index follows artist renames made outside the API too
+        Artist.objects.filter(name="Artist 1").update(name="Renamed Artist")
+        r = self.client.get("/api/tracks/?search=renamed")
+        self.assertEqual({t["track_id"] for t in r.data["results"]}, {"T001", "T005"})
+
+        # tracks print as before normalisation; with their artists loaded that takes no queries
+        tracks = list(Track.objects.select_related("artist").order_by("id"))
+        with self.assertNumQueries(0):
+            self.assertEqual([str(t) for t in tracks], ["Song A — Renamed Artist", "Other — Renamed Artist"])
+
+    def test_ingest_byte_ranges_cover_every_row_once(self):
+        from .ingest import INGEST_COLUMNS, byte_ranges, parse_range, read_header
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(INGEST_COLUMNS)
+            for i in range(50):
+                writer.writerow([
+                    f"X{i}", f"Song, part {i}", 1, i, "TRUE", "Artist", 50, 10,
+                    "pop, rock", "A", "Album", "2020-01-02", 10, "album", 3.5,
+                ])
+            writer.writerow(["bad"] * len(INGEST_COLUMNS))
+        self.addCleanup(os.remove, f.name)
+
+        index, start = read_header(f.name)
+        rows, bad = [], 0
+        for lo, hi in byte_ranges(f.name, start, 97):  # deliberately splits lines
+            chunk, chunk_bad, _ = parse_range((f.name, lo, hi, index))
+            rows.extend(chunk)
+            bad += chunk_bad
+
+        self.assertEqual(sorted(r[0] for r in rows), sorted(f"X{i}" for i in range(50)))
+        self.assertEqual(bad, 1)
+        self.assertEqual(rows[0][1:5], ("Song, part 0", 1, 0, 1))
+        self.assertEqual(rows[0][11], "2020-01-02")
+
+    def test_ingest_refuses_unjournaled_upserts(self):
+        # an in-place upsert into a live database keeps its journal unless asked not to
+        with self.assertRaisesMessage(CommandError, "--synchronous OFF needs --truncate"):
+            call_command("ingest_tracks", "missing.csv", "--synchronous", "OFF")
+        with self.assertRaisesMessage(CommandError, "missing.csv"):
+            call_command("ingest_tracks", "missing.csv", "--journal-mode", "off", "--unsafe")
+
+    def test_facets_follow_list_filters(self):
+        save_track(dict(
+            track_id="T030", track_name="Song F", track_number=1, track_popularity=20,
+            explicit=True, artist_name="Artist 3", artist_popularity=5,
+            artist_followers=5, artist_genres="pop", album_id="ALB4",
+            album_name="Album 4", album_release_date=date(2019, 1, 1),
+            album_total_tracks=1, album_type="single", track_duration_min=2.0,
+        ))
+        r = self.client.get("/api/tracks/facets/")
+        self.assertEqual(r.data["total"], 2)
+        self.assertEqual(r.data["year"], [{"value": 2020, "count": 1}, {"value": 2019, "count": 1}])
+        self.assertEqual(r.data["genre"][0], {"value": "pop", "count": 2})
+        # the list page's year dropdown and the unfiltered count come from the cube
+        self.assertEqual(list_page_facets()["years"], [2020, 2019])
+        self.assertEqual(approximate_count(Track.objects.all()), (2, True))
+
+        r = self.client.get("/api/tracks/facets/?explicit=false")
+        self.assertEqual(r.data["total"], 1)
+        self.assertEqual(r.data["explicit"], [{"value": False, "count": 1}])
+        self.assertEqual(r.data["album_type"], [{"value": "album", "count": 1}])
+        self.assertEqual(
+            r.data["genre"], [{"value": "dance pop", "count": 1}, {"value": "pop", "count": 1}]
+        )
 
     def test_clean_hits_endpoint(self):
         r = self.client.get("/api/tracks/insights/clean-hits/?min_popularity=70")
@@ -61,6 +274,113 @@ class TrackAPITests(TestCase):
         self.assertIn("summary", r.data)
         self.assertIn("top_tracks", r.data)
 
+    def test_insights_snapshot_matches_orm(self):
+        save_track(dict(
+            track_id="T020", track_name="Song Y", track_number=3, track_popularity=88,
+            explicit=False, artist_name="Artist 1", artist_popularity=70,
+            artist_followers=1000000, artist_genres="pop, dance pop", album_id="ALB9",
+            album_name="Album 9", album_release_date=date(2021, 6, 1),
+            album_total_tracks=3, album_type="single", track_duration_min=2.5,
+        ))
+        urls = [
+            "/api/tracks/insights/clean-hits/?min_popularity=70&genre=pop&year_from=2019",
+            "/api/tracks/insights/clean-hits/?album_type=ALBUM",
+            "/api/tracks/insights/artist-albumtype-breakdown/?artist=artist",
+        ]
+        for url in urls:
+            fast = self.client.get(url).data
+            with override_settings(TRACKS_ANALYTICS_SNAPSHOT=False, CACHES=NO_CACHE):
+                slow = self.client.get(url).data
+            self.assertEqual(fast, slow, url)
+
+        # the snapshot is rebuilt after a write
+        self.t1.delete()
+        r = self.client.get("/api/tracks/insights/clean-hits/?min_popularity=70")
+        self.assertEqual(r.data["summary"]["results"], 1)
+
+    def test_api_search_prefix_and_genre(self):
+        r = self.client.get("/api/tracks/?search=son")
+        self.assertEqual([t["track_id"] for t in r.data["results"]], ["T001"])
+        r = self.client.get("/api/tracks/?search=dance art")
+        self.assertEqual(len(r.data["results"]), 1)
+        r = self.client.get("/api/tracks/?search=nomatch")
+        self.assertEqual(len(r.data["results"]), 0)
+
+        # the index follows updates made outside the ORM save path too
+        Track.objects.filter(pk=self.t1.pk).update(track_name="Renamed")
+        r = self.client.get("/api/tracks/?search=renam")
+        self.assertEqual(len(r.data["results"]), 1)
+
+    def test_summary_cache_etag_and_invalidation(self):
+        url = "/api/tracks/summary/top-genres/?top=5"
+        r = self.client.get(url, HTTP_ACCEPT="application/json")
+        etag = r["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        r = self.client.get("/api/tracks/summary/top-genres/?top=5&", HTTP_ACCEPT="application/json",
+                            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+        save_track({"artist_genres": "jazz"}, self.t1)
+        r = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r["ETag"], etag)
+        self.assertEqual(r.json(), [{"genre": "jazz", "count": 1}])
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "tracks-test-cache"),
+    }})
+    def test_summary_cache_file_backend(self):
+        url = "/api/tracks/summary/releases-by-year/"
+        first = self.client.get(url, HTTP_ACCEPT="application/json")
+        second = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    @override_settings(TRACKS_COMPRESSION_MIN_BYTES=0)
+    def test_summary_responses_compressed_once(self):
+        url = "/api/tracks/summary/top-artists/"
+        plain = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        with mock.patch("tracks.caching.compress_content", wraps=caching.compress_content) as compress:
+            first = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+            second = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_ACCEPT_ENCODING="gzip")
+        # the cached entry kept the gzip bytes from the first hit
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(gzip.decompress(second.content), plain.content)
+        self.assertEqual(second["ETag"], "W/" + plain["ETag"])
+        r = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(r.status_code, 304)
+
+        r = self.client.get(url, HTTP_ACCEPT="application/json", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", r)
+        # a body that gzip does not shrink is stored as such: no hit compresses it again
+        with override_settings(TRACKS_COMPRESSION_MIN_BYTES=1), \
+                mock.patch("tracks.compression.compress", wraps=compression.compress) as compress:
+            for _ in range(3):
+                r = self.client.get("/api/tracks/summary/top-genres/?top=1", HTTP_ACCEPT_ENCODING="gzip")
+                self.assertNotIn("Content-Encoding", r)
+        self.assertEqual(compress.call_count, 1)
+        with override_settings(TRACKS_COMPRESSION_MIN_BYTES=10 ** 6):
+            r = self.client.get("/api/tracks/?page_size=1", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertNotIn("Content-Encoding", r)
+
+        # HTML pages carry CSRF tokens and are never compressed (BREACH)
+        r = self.client.get("/tracks/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(r.status_code, 200)
+        self.assertGreater(len(r.content), 1024)
+        self.assertNotIn("Content-Encoding", r)
+
+        r = self.client.get("/api/tracks/export/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(r.streaming_content)).decode()
+        self.assertEqual([json.loads(line)["track_id"] for line in body.splitlines()], ["T001"])
+
     def test_artist_albumtype_breakdown_requires_artist(self):
         r = self.client.get("/api/tracks/insights/artist-albumtype-breakdown/")
         self.assertEqual(r.status_code, 400)
@@ -87,15 +407,480 @@ class TrackAPITests(TestCase):
         self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("track_popularity", r.data)
 
+    def test_genre_links_follow_artist_genres(self):
+        self.assertEqual(
+            sorted(self.t1.genres.values_list("name", flat=True)), ["dance pop", "pop"]
+        )
+        save_track({"artist_genres": "Dance Pop, house"}, self.t1)
+        self.assertEqual(
+            sorted(self.t1.genres.values_list("name", flat=True)), ["dance pop", "house"]
+        )
+
+        # `manage.py rollups` catches links that drift from the artist's genres
+        TrackGenre.objects.filter(track=self.t1, genre__name="house").delete()
+        self.assertEqual(
+            verify_rollups(["genre_links"]), {"genre_links": [(self.t1.pk, ["dance pop"], ["dance pop", "house"])]}
+        )
+        call_command("rollups", "genre_links", "--rebuild", stdout=StringIO())
+        self.assertEqual(verify_rollups(["genre_links"]), {"genre_links": []})
+
+    def test_top_genres_counts(self):
+        self.client.post("/api/tracks/", {
+            "track_id": "T003", "track_name": "Song C", "track_number": 1,
+            "track_popularity": 75, "explicit": False, "artist_name": "Artist 3",
+            "artist_popularity": 50, "artist_followers": 10, "artist_genres": "pop",
+            "album_id": "ALB3", "album_name": "Album 3", "album_release_date": "2021-01-01",
+            "album_total_tracks": 1, "album_type": "single", "track_duration_min": 3.0,
+        }, format="json")
+        r = self.client.get("/api/tracks/summary/top-genres/?top=1")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data, [{"genre": "pop", "count": 2}])
+
+    def test_genre_filter_has_no_duplicates(self):
+        # "pop" matches both "pop" and "dance pop" on the same track
+        r = self.client.get("/api/tracks/?genre=pop")
+        self.assertEqual(len(r.data["results"]), 1)
+        r = self.client.get("/api/tracks/?genre=metal")
+        self.assertEqual(len(r.data["results"]), 0)
+
+    def test_rollups_follow_create_update_delete(self):
+        t2 = save_track(dict(
+            track_id="T010", track_name="Song X", track_number=1, track_popularity=95,
+            explicit=True, artist_name="Artist 1", artist_popularity=70,
+            artist_followers=1000000, artist_genres="pop, dance pop", album_id="ALB10",
+            album_name="Album 10", album_release_date=date(2020, 3, 1),
+            album_total_tracks=10, album_type="album", track_duration_min=3.0,
+        ))
+        r = self.client.get("/api/tracks/summary/top-artists/")
+        self.assertEqual(r.data[0]["track_count"], 2)
+        self.assertEqual(r.data[0]["max_track_popularity"], 95)
+
+        # a new artist for the track; its album (and only its album) re-dated
+        save_track({"artist_name": "Artist 2", "album_release_date": date(2018, 1, 1)}, t2)
+        t2.delete()
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+
+        r = self.client.get("/api/tracks/summary/releases-by-year/")
+        self.assertEqual(r.data, [
+            {"year": 2020, "track_count": 1, "avg_track_popularity": 80.0, "explicit_count": 0},
+        ])
+
+    def test_bench_indexes_restores_indexes(self):
+        out = StringIO()
+        call_command("bench_indexes", "--repeat", "1", "--json", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn("list page ?ordering=album_release_date", report["cases"])
+
+        # the indexes are dropped only inside a rolled-back transaction
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, "tracks_track")
+        indexes = {name for name, c in constraints.items() if c["index"]}
+        for idx in Track._meta.indexes:
+            self.assertIn(idx.name, indexes)
+
+    def test_bench_endpoints_covers_every_route(self):
+        from .management.commands.bench_endpoints import CASES, route_names
+        self.assertEqual(route_names() - {case[1] for case in CASES}, set())
+
+        out = StringIO()
+        call_command(
+            "bench_endpoints", "--repeat", "2", "--warmup", "0", "--memory-repeat", "1",
+            "--only", "clean hits", "--only", "web delete", "--only", "similar tracks",
+            stdout=out, stderr=StringIO(),
+        )
+        cases = {c["label"]: c for c in json.loads(out.getvalue())["cases"]}
+        self.assertEqual(cases["clean hits"]["status"], 200)
+        self.assertEqual(cases["similar tracks batch"]["status"], 200)
+        self.assertIsNotNone(cases["clean hits"]["p99_ms"])
+        self.assertEqual(cases["web delete"]["status"], 302)
+        # writes are rolled back
+        self.assertTrue(Track.objects.filter(pk=self.t1.pk).exists())
+
+    def test_sqlite_pragmas_and_read_router(self):
+        from django.db import transaction
+        from django.db.utils import OperationalError
+
+        from .database import ReadRouter, configure_sqlite, reading
+
+        def pragma(name):
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA {name}")
+                return cursor.fetchone()[0]
+
+        cache_size = pragma("cache_size")
+        with override_settings(TRACKS_SQLITE_PRAGMAS={"cache_size": -4096}, TRACKS_READ_DATABASE="default"):
+            configure_sqlite(None, connection)
+            self.assertEqual((pragma("cache_size"), pragma("query_only")), (-4096, 1))
+            with self.assertRaises(OperationalError), transaction.atomic():
+                Track.objects.update(track_popularity=1)
+
+            router = ReadRouter()
+            self.assertIsNone(router.db_for_read(Track))
+            with reading():
+                self.assertEqual(router.db_for_read(Track), "default")
+            self.assertEqual(router.db_for_write(Track), "default")
+        with override_settings(TRACKS_SQLITE_PRAGMAS={"cache_size": cache_size, "query_only": "OFF"}):
+            configure_sqlite(None, connection)
+
+        # no read alias configured: reads stay on "default"
+        with reading():
+            self.assertIsNone(ReadRouter().db_for_read(Track))
+
+    def test_generate_tracks_is_deterministic_and_valid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"{i}.csv") for i in range(2)]
+            for path in paths:
+                call_command("generate_tracks", "300", "--seed", "7", "-o", path, stderr=StringIO())
+            with open(paths[0], encoding="utf-8") as a, open(paths[1], encoding="utf-8") as b:
+                self.assertEqual(a.read(), b.read())
+            with open(paths[0], encoding="utf-8") as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 300)
+
+        call_command("generate_tracks", "300", "--seed", "7", "--truncate", stderr=StringIO())
+        self.assertEqual(Track.objects.count(), 300)
+        for track in Track.objects.all()[:50]:
+            track.full_clean()
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+
+    def test_instrumentation_server_timing_and_warnings(self):
+        r = APIClient().get("/api/tracks/")
+        self.assertNotIn("Server-Timing", r)
+
+        with override_settings(TRACKS_INSTRUMENTATION=True, TRACKS_QUERY_BUDGET=0,
+                               TRACKS_REPEATED_QUERY_THRESHOLD=1):
+            with self.assertLogs("tracks.instrumentation", level="INFO") as logs:
+                r = APIClient().get("/api/tracks/")
+        self.assertRegex(r["Server-Timing"], r'^sql;dur=[\d.]+;desc="\d+ queries", serialize;dur=')
+        self.assertIn("total;dur=", r["Server-Timing"])
+        messages = "\n".join(logs.output)
+        self.assertIn("path=/api/tracks/ status=200", messages)
+        self.assertIn("query budget exceeded", messages)
+        self.assertIn("repeated query", messages)
+
+    def test_fast_read_path_matches_drf_output(self):
+        save_track(dict(
+            track_id="T020", track_name="Cancion \u2028 ñ", track_number=3, track_popularity=0,
+            explicit=True, artist_name="Ârtist", artist_popularity=0, artist_followers=0,
+            artist_genres=None, album_id="ALB9", album_name="يا قلبي", album_total_tracks=1,
+            album_release_date=date(1999, 12, 31), album_type="single", track_duration_min=0.01,
+        ))
+        qs = Track.objects.order_by("id")
+        rows = track_rows.serialize(qs.values(*track_rows.value_fields))
+        self.assertEqual(rows, TrackSerializer(qs, many=True).data)
+
+        data = {"results": rows, "when": datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+                "avg": Decimal("1.5"), 7: None}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # floats orjson spells differently (1e16 / 0.00001 for 1e+16 / 1e-05) fall back to the stock renderer
+        for floats in ([0.0, 0.0001, 3.5, -2.25, 1e15 + 0.5], [1e16], [0.00001], [-2.5e-7], [Decimal("1e-9")]):
+            data = {"durations": floats, "results": rows}
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), floats)
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render({"duration": float("nan")})
+
+        out = StringIO()
+        call_command("bench_serializers", "--rows", "10", "--repeat", "1", stdout=out)
+        self.assertIn("identical output", out.getvalue())
+
+    def test_dashboard_matches_individual_endpoints(self):
+        r = self.client.get("/api/tracks/dashboard/?artist=artist&min_popularity=50&top=5")
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("ETag", r)
+        parts = {
+            "top_artists": "/api/tracks/summary/top-artists/",
+            "releases_by_year": "/api/tracks/summary/releases-by-year/",
+            "top_genres": "/api/tracks/summary/top-genres/?top=5",
+            "clean_hits": "/api/tracks/insights/clean-hits/?min_popularity=50",
+            "artist_albumtype_breakdown": "/api/tracks/insights/artist-albumtype-breakdown/?artist=artist",
+        }
+        for key, url in parts.items():
+            self.assertEqual(r.data[key], json.loads(self.client.get(url).content), key)
+        self.assertEqual(self.client.post("/api/tracks/dashboard/").status_code, 405)
+
+    def _batch_track(self, track_id, **extra):
+        row = TrackSerializer(self.t1).data
+        row.pop("id")
+        return {**row, "track_id": track_id, **extra}
+
+    def test_batch_mixed_operations(self):
+        self.client.get("/api/tracks/summary/top-artists/")  # warm the summary cache
+        for track_id in ("T003", "T004"):
+            self.client.post("/api/tracks/", self._batch_track(track_id), format="json")
+        items = [
+            {"op": "create", **self._batch_track("B1", artist_name="Batch Artist", artist_genres="k-pop")},
+            {"op": "create", **self._batch_track("T004")},                         # exists
+            {"op": "create", **self._batch_track("B2", track_popularity=101)},     # invalid
+            {"op": "update", "track_id": "T001", "track_popularity": 12, "artist_name": "Moved"},
+            {"op": "update", "track_id": "NOPE", "track_popularity": 12},          # missing
+            {"op": "delete", "track_id": "T003"},
+            {"op": "delete", "track_id": "B1"},                                    # repeated
+            {"op": "upsert", "track_id": "B3"},                                    # bad op
+        ]
+        r = self.client.post("/api/tracks/batch/", items, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["counts"], {"created": 1, "updated": 1, "deleted": 1, "error": 5})
+        self.assertEqual(
+            [res["status"] for res in r.data["results"]],
+            ["created", "error", "error", "updated", "error", "deleted", "error", "error"],
+        )
+        self.assertIn("track_popularity", r.data["results"][2]["errors"])
+
+        self.assertEqual(sorted(Track.objects.values_list("track_id", flat=True)), ["B1", "T001", "T004"])
+        self.t1.refresh_from_db()
+        self.assertEqual((self.t1.track_popularity, self.t1.artist.name), (12, "Moved"))
+        self.assertTrue(Track.objects.filter(genres__name="k-pop", track_id="B1").exists())
+        self.assertEqual(verify_rollups(), {"artist": [], "distribution": [], "cube": [], "genre_links": []})
+        artists = self.client.get("/api/tracks/summary/top-artists/").data
+        self.assertEqual({a["artist_name"] for a in artists}, {"Artist 1", "Batch Artist", "Moved"})
+
+    def test_batch_ndjson_grouped_and_all_or_nothing(self):
+        body = "\n".join(json.dumps({"op": "create", **self._batch_track(f"N{i}")}) for i in range(3))
+        r = self.client.post("/api/tracks/batch/", body + "\n\n", content_type="application/x-ndjson")
+        self.assertEqual(r.data["counts"], {"created": 3})
+
+        r = self.client.post("/api/tracks/batch/", "{}\nnot json", content_type="application/x-ndjson")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("line 2", r.data["detail"])
+
+        grouped = {"update": [{"track_id": "N0", "track_popularity": 1}], "delete": ["N1", "MISSING"]}
+        r = self.client.post("/api/tracks/batch/?all_or_nothing=1", grouped, format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data["counts"], {"skipped": 2, "error": 1})
+        self.assertEqual(Track.objects.filter(track_id__startswith="N").count(), 3)
+
+        grouped["delete"].pop()
+        r = self.client.post("/api/tracks/batch/?all_or_nothing=1", grouped, format="json")
+        self.assertEqual(r.data["counts"], {"updated": 1, "deleted": 1})
+        self.assertEqual(Track.objects.get(track_id="N0").track_popularity, 1)
+
+        with override_settings(TRACKS_BATCH_MAX_ITEMS=1):
+            r = self.client.post("/api/tracks/batch/", grouped, format="json")
+        self.assertEqual(r.status_code, 413)
 
+    def test_autocomplete_ranks_and_follows_writes(self):
+        def row(track_id, **extra):
+            return {**flat_values(self.t1), "track_id": track_id, **extra}
 
+        save_track(row("AC1", track_name="Señorita", track_popularity=90,
+                       artist_name="Mendes Artist", artist_followers=5, artist_genres="pop, canadian pop"))
+        url = reverse("api-track-autocomplete")
+        r = self.client.get(url, {"q": "sen"})
+        self.assertEqual([t["track_id"] for t in r.data["tracks"]], ["AC1"])
+        r = self.client.get(url, {"q": "  POP", "types": "genres,artists"})
+        self.assertEqual(set(r.data), {"q", "genres", "artists"})
+        # word starts match, ranked by track count
+        self.assertEqual([g["name"] for g in r.data["genres"]], ["pop", "canadian pop", "dance pop"])
+        r = self.client.get(url, {"q": "artist", "types": "artists"})
+        self.assertEqual([a["name"] for a in r.data["artists"]], ["Artist 1", "Mendes Artist"])
+        self.assertEqual(self.client.get(url, {"q": "a", "types": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"q": "a", "limit": "0"}).status_code, 400)
 
+        # single-row writes patch the index on commit instead of rebuilding it
+        index = autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            save_track(row("AC2", track_name="Senses", track_popularity=95, artist_name="Sen Artist",
+                           artist_genres="senegalese jazz", album_id="SENALB", album_name="Sentinel"))
+        r = self.client.get(url, {"q": "sen"})
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertEqual([t["track_id"] for t in r.data["tracks"]], ["AC2", "AC1"])
+        self.assertEqual([a["name"] for a in r.data["artists"]], ["Sen Artist"])
+        self.assertEqual([a["album_id"] for a in r.data["albums"]], ["SENALB"])
+        self.assertEqual([g["name"] for g in r.data["genres"]], ["senegalese jazz"])
 
+        with self.captureOnCommitCallbacks(execute=True):
+            Track.objects.get(track_id="AC2").delete()
+            Album.objects.filter(album_id="ALB1").update(name="Ignored")  # bypasses signals
+        r = self.client.get(url, {"q": "sen"})
+        self.assertEqual([t["track_id"] for t in r.data["tracks"]], ["AC1"])
+        self.assertEqual(r.data["genres"], [])
+        # a write the index did not see (the bulk update above did not move the version) is
+        # picked up with the next version change: a batch rebuilds it on the next read
+        self.client.post("/api/tracks/batch/", [{"op": "update", "track_id": "T001", "track_popularity": 1}],
+                         format="json")
+        r = self.client.get(url, {"q": "ignored", "types": "albums"})
+        self.assertIsNot(autocomplete.get_index(), index)
+        self.assertEqual([a["album_id"] for a in r.data["albums"]], ["ALB1"])
+
+    def test_distributions_quantiles_and_slices(self):
+        for i, popularity in enumerate([10, 20, 30, 40, 95, 60, 70]):
+            save_track({
+                **flat_values(self.t1), "track_id": f"D{i}", "track_popularity": popularity,
+                "track_duration_min": 2 + i / 4, "album_id": f"DALB{i % 2}",
+                "album_release_date": date(2020 + i % 2, 5, 1),
+                "artist_name": f"D Artist {i % 3}", "artist_genres": "pop" if i % 3 else "rock, pop",
+            })
+        url = reverse("api-track-distributions")
+        r = self.client.get(url, {"genre": "Pop", "year": "2020", "quantiles": "0.5,0.9,1"})
+        tracks = Track.objects.filter(album__release_date__year=2020, genres__name="pop")
+        popularity = sorted(tracks.values_list("track_popularity", flat=True))
+        stats = r.data["metrics"]["track_popularity"]
+        self.assertEqual(stats["count"], len(popularity))
+        # nearest rank, exact for popularity
+        self.assertEqual(stats["quantiles"], {
+            "p50": popularity[math.ceil(0.5 * len(popularity)) - 1],
+            "p90": popularity[math.ceil(0.9 * len(popularity)) - 1],
+            "p100": popularity[-1],
+        })
+        self.assertEqual(sum(b["count"] for b in stats["histogram"]), len(popularity))
+        durations = r.data["metrics"]["track_duration_min"]["quantiles"]
+        self.assertAlmostEqual(durations["p100"], max(tracks.values_list("track_duration_min", flat=True)), delta=0.1)
+
+        # slices merge: genre "" counts every track once, whatever its genres
+        r = self.client.get(url, {"metrics": "artist_followers", "histogram": "0"})
+        self.assertEqual(r.data["metrics"]["artist_followers"]["count"], Track.objects.count())
+        self.assertNotIn("histogram", r.data["metrics"]["artist_followers"])
+        r = self.client.get(url, {"genre": "rock", "album_type": "ALBUM", "metrics": "track_popularity"})
+        self.assertEqual(r.data["metrics"]["track_popularity"]["count"], 3)
+        self.assertEqual(self.client.get(url, {"metrics": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"quantiles": "2"}).status_code, 400)
+
+        # shared artist / album changes move every one of their tracks
+        artist = Artist.objects.get(name="D Artist 0")
+        artist.popularity, artist.genres = 3, "jazz"
+        artist.save()
+        album = Album.objects.get(album_id="DALB1")
+        album.release_date = date(2015, 1, 1)
+        album.save()
+        Track.objects.get(track_id="D2").delete()
+        self.assertEqual(verify_rollups(["distribution"]), {"distribution": []})
+        items = [{"op": "update", "track_id": "D0", "album_type": "single"},
+                 {"op": "update", "track_id": "D1", "track_popularity": 1}]
+        self.assertEqual(self.client.post("/api/tracks/batch/", items, format="json").status_code, 200)
+        self.assertEqual(verify_rollups(["distribution"]), {"distribution": []})
+        r = self.client.get(url, {"genre": "jazz", "metrics": "artist_popularity", "quantiles": "0.5"})
+        self.assertEqual(r.data["metrics"]["artist_popularity"]["quantiles"], {"p50": 3})
+
+    def test_cube_group_by_and_filters(self):
+        for i, (popularity, explicit) in enumerate([(10, True), (20, False), (95, True), (40, False)]):
+            save_track({
+                **flat_values(self.t1), "track_id": f"C{i}", "track_popularity": popularity,
+                "explicit": explicit, "track_duration_min": 2.5 + i, "album_id": f"CALB{i % 2}",
+                "album_type": "single" if i % 2 else "album", "album_release_date": date(2019 + i % 2, 1, 1),
+                "artist_name": f"C Artist {i % 2}", "artist_genres": "rock" if i % 2 else "rock, metal",
+            })
+        url = reverse("api-track-cube")
+
+        def expected(qs):
+            return qs.aggregate(n=Count("id"), lo=Min("track_popularity"), hi=Max("track_popularity"),
+                                dur=Sum("track_duration_min"))
+
+        r = self.client.get(url, {"group_by": "year,explicit"})
+        self.assertEqual(r.data["group_by"], ["year", "explicit"])
+        for row in r.data["results"]:
+            e = expected(Track.objects.filter(album__release_date__year=row["year"], explicit=row["explicit"]))
+            self.assertEqual((row["track_count"], row["popularity_min"], row["popularity_max"]),
+                             (e["n"], e["lo"], e["hi"]))
+            self.assertAlmostEqual(row["duration_sum_min"], e["dur"])
+        self.assertEqual(sum(row["track_count"] for row in r.data["results"]), Track.objects.count())
+
+        # a track counts once per genre when grouping by genre, once overall otherwise
+        r = self.client.get(url, {"group_by": "genre", "album_type": "ALBUM", "explicit": "true"})
+        self.assertEqual([(row["genre"], row["track_count"]) for row in r.data["results"]],
+                         [("metal", 2), ("rock", 2)])
+        r = self.client.get(url, {"genre": "Rock", "year": "2020"})
+        self.assertEqual(r.data["results"][0]["track_count"], 2)
+        self.assertEqual(self.client.get(url, {"group_by": "artist"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"year": "x"}).status_code, 400)
+
+        # deleting / lowering the max track recounts the cell; shared album changes move tracks
+        Track.objects.get(track_id="C2").delete()
+        t = Track.objects.get(track_id="C0")
+        t.track_popularity = 5
+        t.save()
+        album = Album.objects.get(album_id="CALB1")
+        album.album_type = "compilation"
+        album.save()
+        self.assertEqual(verify_rollups(["cube"]), {"cube": []})
+        items = [{"op": "update", "track_id": "C1", "artist_genres": "jazz"},
+                 {"op": "delete", "track_id": "C3"}]
+        self.assertEqual(self.client.post("/api/tracks/batch/", items, format="json").status_code, 200)
+        self.assertEqual(verify_rollups(["cube"]), {"cube": []})
+
+        r = self.client.get("/api/tracks/summary/releases-by-year/")
+        self.assertEqual([(row["year"], row["track_count"]) for row in r.data],
+                         [(2019, 1), (2020, 2)])
+
+    def test_similar_tracks_single_and_batch(self):
+        def row(track_id, **extra):
+            return {**flat_values(self.t1), "track_id": track_id, **extra}
+
+        twin = save_track(row("S1", track_popularity=79, album_id="ALB-S1", album_name="Twin"))
+        far = save_track(row("S2", track_popularity=3, explicit=True, artist_name="Metal Band",
+                             artist_popularity=5, artist_followers=10, artist_genres="metal"))
+        save_track(row("S3", track_popularity=50, artist_name="Other", artist_genres="pop"))
+
+        r = self.client.get(f"/api/tracks/{self.t1.pk}/similar/", {"k": "2"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["track"]["track_id"], "T001")
+        self.assertEqual([t["track_id"] for t in r.data["results"]], ["S1", "S3"])
+        self.assertLessEqual(r.data["results"][0]["distance"], r.data["results"][1]["distance"])
+        self.assertEqual(self.client.get("/api/tracks/999999/similar/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/tracks/{self.t1.pk}/similar/", {"k": "0"}).status_code, 400)
+
+        r = self.client.get("/api/tracks/similar/", {"ids": f"{far.pk},{twin.pk},999999", "k": "10"})
+        self.assertEqual(r.data["missing"], [999999])
+        self.assertEqual([x["track"]["track_id"] for x in r.data["results"]], ["S2", "S1"])
+        self.assertEqual(len(r.data["results"][0]["results"]), 3)  # every other track
+        self.assertEqual(r.data["results"][1]["results"][0]["track_id"], "T001")
+        self.assertEqual(self.client.get("/api/tracks/similar/", {"ids": "x"}).status_code, 400)
+
+        # the model follows writes
+        twin.delete()
+        r = self.client.get(f"/api/tracks/{self.t1.pk}/similar/", {"k": "1"})
+        self.assertEqual([t["track_id"] for t in r.data["results"]], ["S3"])
+
+    def test_prefix_index_incremental_updates_match_rebuild(self):
+        rng = random.Random(7)
+        words = ["alpha", "alps", "beta", "bet", "al", "b"]
+        entries = {i: (rng.randrange(100), f"{rng.choice(words)} {rng.choice(words)}", None) for i in range(300)}
+        index = autocomplete.PrefixIndex(entries, scan_limit=8)
+        for _ in range(300):
+            i = rng.randrange(320)
+            entry = None if rng.random() < 0.3 else (rng.randrange(100), f"{rng.choice(words)} {rng.choice(words)}", None)
+            index.put(i, entry)
+            if entry is None:
+                entries.pop(i, None)
+            else:
+                entries[i] = entry
+        fresh = autocomplete.PrefixIndex(entries, scan_limit=8)
+        self.assertEqual((index.keys, index.ids), (fresh.keys, fresh.ids))
+        for prefix in ("a", "al", "alp", "alph", "b", "be", "bet ", "x"):
+            self.assertEqual(index.search(prefix, 50), fresh.search(prefix, 50), prefix)
+
+
+class AsyncSummaryTests(TransactionTestCase):
+    """The async views with sub-queries on worker-thread connections (needs committed rows)."""
+
+    @override_settings(TRACKS_ASYNC_PARALLEL_QUERIES=True, TRACKS_ANALYTICS_SNAPSHOT=False, CACHES=NO_CACHE)
+    def test_parallel_clean_hits_and_dashboard(self):
+        for i, pop in enumerate([90, 85, 40]):
+            save_track(dict(
+                track_id=f"A{i}", track_name=f"Song {i}", track_number=1, track_popularity=pop,
+                explicit=False, artist_name="Artist 1", artist_popularity=70,
+                artist_followers=1000, artist_genres="pop", album_id="ALB1",
+                album_name="Album 1", album_release_date=date(2020, 1, 1),
+                album_total_tracks=3, album_type="album", track_duration_min=3.0,
+            ))
+        r = APIClient().get("/api/tracks/insights/clean-hits/?min_popularity=80")
+        self.assertEqual(r.data["summary"]["results"], 2)
+        self.assertEqual([t["track_id"] for t in r.data["top_tracks"]], ["A0", "A1"])
+
+        r = APIClient().get("/api/tracks/dashboard/")
+        self.assertEqual(r.data["top_artists"][0]["track_count"], 3)
+        self.assertEqual(r.data["top_genres"], [{"genre": "pop", "count": 3}])
+
+        # the sub-queries run on worker threads and still count towards Server-Timing
+        with override_settings(TRACKS_INSTRUMENTATION=True):
+            with self.assertLogs("tracks.instrumentation", level="INFO") as logs:
+                r = APIClient().get("/api/tracks/dashboard/")
+        queries = int(re.search(r'desc="(\d+) queries"', r["Server-Timing"]).group(1))
+        self.assertGreaterEqual(queries, 3)
+        self.assertIn(f"queries={queries} ", "\n".join(logs.output))
 
 
 class TrackFrontendTests(TestCase):
     def setUp(self):
-        self.t1 = Track.objects.create(
+        self.t1 = save_track(dict(
             track_id="T100",
             track_name="UI Song",
             track_number=1,
@@ -111,13 +896,32 @@ class TrackFrontendTests(TestCase):
             album_total_tracks=10,
             album_type="album",
             track_duration_min=3.2,
-        )
+        ))
 
     def test_frontend_list_page(self):
         r = self.client.get("/tracks/")
         self.assertEqual(r.status_code, 200)
         self.assertContains(r, "UI Song")
 
+    def test_frontend_facets_cached(self):
+        self.client.get("/tracks/")
+        # warm cache: data version lookup + the page itself
+        with self.assertNumQueries(2):
+            r = self.client.get("/tracks/")
+        self.assertEqual(r.context["genres"], ["indie"])
+        self.assertEqual(r.context["top_artists_ui"][0]["artist_name"], "UI Artist")
+        self.assertEqual(r.context["clean_hits_ui"]["count"], 1)
+
+        Track.objects.filter(pk=self.t1.pk).delete()
+        r = self.client.get("/tracks/")
+        self.assertEqual(r.context["genres"], [])
+
+    def test_frontend_search(self):
+        r = self.client.get("/tracks/?q=ui+alb")
+        self.assertContains(r, "UI Song")
+        r = self.client.get("/tracks/?q=jazz")
+        self.assertNotContains(r, "UI Song")
+
     def test_frontend_detail_page(self):
         r = self.client.get(f"/tracks/{self.t1.pk}/")
         self.assertEqual(r.status_code, 200)
@@ -171,6 +975,3 @@ class TrackFrontendTests(TestCase):
         r = self.client.post(f"/tracks/{self.t1.pk}/delete/")
         self.assertEqual(r.status_code, 302)
         self.assertFalse(Track.objects.filter(pk=self.t1.pk).exists())
-
-
-    
@@ -5,6 +5,26 @@ urlpatterns = [
     # Core REST list/create (GET/POST)
     path("tracks/", views.TrackListCreateView.as_view(), name="api-track-list-create"),
 
+    # Bulk create/update/delete (JSON or NDJSON)
+    path("tracks/batch/", views.track_batch, name="api-track-batch"),
+
+    # Streaming bulk export (NDJSON / CSV)
+    path("tracks/export/", views.export_tracks, name="api-track-export"),
+
+    # Per-dimension counts for filter panels
+    path("tracks/facets/", views.track_facets, name="api-track-facets"),
+
+    # Histograms / quantiles per year, album type and genre
+    path("tracks/distributions/", views.track_distributions, name="api-track-distributions"),
+    path("tracks/cube/", views.track_cube, name="api-track-cube"),
+
+    # Typeahead suggestions (in-memory prefix index)
+    path("tracks/autocomplete/", views.track_autocomplete, name="api-track-autocomplete"),
+
+    # Nearest neighbours by feature vector (one seed / several seeds)
+    path("tracks/<int:pk>/similar/", views.similar_tracks, name="api-track-similar"),
+    path("tracks/similar/", views.similar_tracks_batch, name="api-tracks-similar"),
+
     # Summary endpoints
     path("tracks/summary/top-artists/", views.top_artists, name="api-top-artists"),
     path("tracks/summary/releases-by-year/", views.releases_by_year, name="api-releases-by-year"),
@@ -13,4 +33,7 @@ urlpatterns = [
     # New “complex” endpoints
     path("tracks/insights/clean-hits/", views.clean_hits, name="api-clean-hits"),
     path("tracks/insights/artist-albumtype-breakdown/", views.artist_albumtype_breakdown, name="api-artist-albumtype-breakdown"),
+
+    # All summaries in one (async) request
+    path("tracks/dashboard/", views.dashboard, name="api-dashboard"),
 ]
@@ -0,0 +1,45 @@
+"""
+Global data version for Track.
+
+Anything derived from the whole table (in-memory snapshots, cached responses)
+is keyed on this value, so a single UPDATE invalidates all of it.
+
+The version is a random token rather than a counter: a rolled-back write
+restores the previous token together with the previous data, so a token can
+never be reused for a different state of the table.
+"""
+import secrets
+
+from .models import DataVersion
+
+_PK = 1
+
+
+def current_version():
+    row = DataVersion.objects.filter(pk=_PK).values_list("version", flat=True).first()
+    return row or 0
+
+
+async def acurrent_version():
+    """current_version() for async code, through the async ORM."""
+    row = await DataVersion.objects.filter(pk=_PK).values_list("version", flat=True).afirst()
+    return row or 0
+
+
+def bump_version():
+    """Move to a new data version (called on Track writes and after bulk loads)."""
+    token = secrets.randbits(62) + 1
+    updated = DataVersion.objects.filter(pk=_PK).update(version=token)
+    if not updated:
+        DataVersion.objects.update_or_create(pk=_PK, defaults={"version": token})
+    return token
+
+
+def advance_version():
+    """
+    bump_version() that also returns the version it replaced, as (previous,
+    new). In-process caches that patch themselves after a write (see
+    tracks.autocomplete) only adopt `new` if they were at `previous`.
+    """
+    previous = current_version()
+    return previous, bump_version()
@@ -1,11 +1,37 @@
-from collections import Counter
-from django.db.models import Count, Avg, Max, Min
-from django.db.models.functions import ExtractYear
+import asyncio
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Count, Avg, F, Max, Min
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import generics, filters
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 
+from .autocomplete import KINDS, MAX_LIMIT, get_index
+from .batch import OPS, apply_batch
+from .caching import cached_summary
+from .catalog import FLAT_FIELDS, filter_by_artist, flat_lookup, model_field
+from .concurrency import gather_sync, run_sync
+from .cube import DIMENSIONS, cells
+from .distributions import METRICS, quantile, slice_bins
+from .facets import facet_counts
+from .filtering import filter_tracks
+from .genres import filter_by_genre, genre_counts
+from .ingest import parse_bool
 from .models import Track
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .renderers import FastJSONRenderer, orjson_dumps
+from .rollups import releases_by_year_rows, top_artist_rows
+from .search import FullTextSearchFilter, search_tracks
+from .similarity import MAX_K, MAX_SEEDS, get_model
+from .snapshot import get_snapshot
 from .serializers import (
     TrackSerializer,
     TopArtistSummarySerializer,
@@ -13,6 +39,8 @@ from .serializers import (
     GenreCountSerializer,
     CleanHitsSerializer,
     ArtistAlbumTypeBreakdownSerializer,
+    TrackFacetsSerializer,
+    track_rows,
 )
 
 
@@ -20,171 +48,561 @@ class TrackListCreateView(generics.ListCreateAPIView):
     queryset = Track.objects.all()
     serializer_class = TrackSerializer
 
-    # DRF search + ordering (demonstrates DRF knowledge)
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["track_name", "artist_name", "album_name", "artist_genres"]
+    # DRF ordering + FTS5-backed search (ranked unless ?ordering= is given)
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
+    search_fields = ["track_name", "artist__name", "album__name", "artist__genres"]
     ordering_fields = ["track_popularity", "album_release_date", "artist_followers", "track_duration_min"]
     ordering = ["-track_popularity"]
 
+    # cursor pages keyed on the ordering above (+ id); no COUNT(*)
+    pagination_class = KeysetPagination
+
     def get_queryset(self):
-        qs = super().get_queryset()
-        p = self.request.query_params
+        # the flat ordering names are annotations over the artist / album columns
+        qs = super().get_queryset().annotate(**{
+            name: F(flat_lookup(name)) for name in self.ordering_fields if flat_lookup(name) != name
+        })
+        return filter_tracks(qs, self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # read path: values() rows through track_rows instead of model instances
+        # through TrackSerializer (same output, a fraction of the CPU)
+        queryset = self.filter_queryset(self.get_queryset()).values(*track_rows.value_fields)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(track_rows.serialize(queryset))
+        return self.get_paginated_response(track_rows.serialize(page))
+
+
+def _batch_items(data):
+    """A list of operations, or {"create": [...], "update": [...], "delete": [...]}."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and data and set(data) <= set(OPS):
+        items = []
+        for op in OPS:
+            group = data.get(op, [])
+            if not isinstance(group, list):
+                raise ParseError(f'"{op}" must be a list.')
+            for item in group:
+                if isinstance(item, dict):
+                    item = {**item, "op": op}
+                elif op == "delete" and isinstance(item, str):
+                    item = {"op": op, "track_id": item}  # bare track_ids are fine for deletes
+                items.append(item)
+        return items
+    raise ParseError('Expected a list of operations or an object with "create", "update" and/or "delete" lists.')
+
+
+@api_view(["POST"])
+@parser_classes([JSONParser, NDJSONParser])
+def track_batch(request):
+    """
+    Create, update and delete many tracks in one request (see tracks.batch).
 
-        artist = p.get("artist")
-        album_type = p.get("album_type")
-        genre = p.get("genre")
-        explicit = p.get("explicit")
-        min_pop = p.get("min_popularity")
-        min_followers = p.get("min_followers")
-        year = p.get("year")
-        from_date = p.get("from_date")
-        to_date = p.get("to_date")
+    Body: a JSON list of {"op": "create"|"update"|"delete", "track_id": ..., ...}
+    objects, the same as NDJSON (application/x-ndjson), or an object of
+    per-op lists. Items are applied independently and reported one result
+    each; with ?all_or_nothing=1 any error means nothing is written and the
+    response is 400.
+    """
+    items = _batch_items(request.data)
+    if len(items) > settings.TRACKS_BATCH_MAX_ITEMS:
+        return Response(
+            {"detail": f"At most {settings.TRACKS_BATCH_MAX_ITEMS} operations per batch."},
+            status=413,
+        )
+    all_or_nothing = request.query_params.get("all_or_nothing", "").lower() in ("1", "true", "yes")
 
-        if artist:
-            qs = qs.filter(artist_name__icontains=artist)
+    results, counts = apply_batch(items, all_or_nothing=all_or_nothing)
+    status = 400 if all_or_nothing and counts.get("error") else 200
+    return Response({"counts": counts, "results": results}, status=status)
 
-        if album_type:
-            qs = qs.filter(album_type__iexact=album_type)
 
-        if genre:
-            qs = qs.filter(artist_genres__icontains=genre)
+def _json_response(data, status=200):
+    """
+    DRF Response rendered up front with FastJSONRenderer. Async views skip
+    APIView, so there is no content negotiation (and no browsable API page),
+    but the body is what the JSON renderer has always produced.
+    """
+    response = Response(data, status=status)
+    response.accepted_renderer = FastJSONRenderer()
+    response.accepted_media_type = FastJSONRenderer.media_type
+    response.renderer_context = {}
+    return response.render()
 
-        if explicit is not None:
-            if explicit.lower() == "true":
-                qs = qs.filter(explicit=True)
-            elif explicit.lower() == "false":
-                qs = qs.filter(explicit=False)
 
-        if min_pop:
-            qs = qs.filter(track_popularity__gte=int(min_pop))
+# -----------------------
+# Summary / insights payloads (sync; the async views run them via run_sync)
+# -----------------------
 
-        if min_followers:
-            qs = qs.filter(artist_followers__gte=int(min_followers))
+def _top_artists_data():
+    # reads the precomputed per-artist rollup (see tracks.rollups)
+    return TopArtistSummarySerializer(top_artist_rows(20), many=True).data
 
-        if year:
-            qs = qs.filter(album_release_date__year=int(year))
 
-        if from_date:
-            qs = qs.filter(album_release_date__gte=from_date)
-        if to_date:
-            qs = qs.filter(album_release_date__lte=to_date)
+def _releases_by_year_data():
+    # rolled up from the precomputed cube (see tracks.cube), explicit_count included
+    return ReleasesByYearSerializer(releases_by_year_rows(), many=True).data
 
-        return qs
 
+def _top_genres_data(top_n):
+    # GROUP BY over the genre link table instead of splitting every row in Python
+    rows = [
+        {"genre": name, "count": count}
+        for name, count in genre_counts().values_list("name", "count")[:top_n]
+    ]
+    return GenreCountSerializer(rows, many=True).data
 
-@api_view(["GET"])
-def top_artists(request):
-    rows = list(
-        Track.objects.values("artist_name")
-        .annotate(
-            track_count=Count("id"),
-            avg_track_popularity=Avg("track_popularity"),
-            max_track_popularity=Max("track_popularity"),
-            followers=Avg("artist_followers"),
-        )
-        .order_by("-track_count", "-followers")[:20]
+
+def _clean_hits_queryset(f):
+    qs = Track.objects.filter(explicit=False, track_popularity__gte=f["min_popularity"])
+
+    if f["genre"]:
+        qs = filter_by_genre(qs, f["genre"])
+    if f["album_type"]:
+        qs = qs.filter(album__album_type__iexact=f["album_type"])
+    if f["year_from"]:
+        qs = qs.filter(album__release_date__year__gte=f["year_from"])
+    if f["year_to"]:
+        qs = qs.filter(album__release_date__year__lte=f["year_to"])
+    return qs
+
+
+def _clean_hits_summary(qs):
+    return qs.aggregate(
+        results=Count("id"),
+        avg_popularity=Avg("track_popularity"),
+        max_popularity=Max("track_popularity"),
+        min_duration=Min("track_duration_min"),
+        max_duration=Max("track_duration_min"),
     )
-    return Response(TopArtistSummarySerializer(rows, many=True).data)
 
 
-@api_view(["GET"])
-def releases_by_year(request):
-    rows = list(
-        Track.objects.annotate(year=ExtractYear("album_release_date"))
-        .values("year")
-        .annotate(
-            track_count=Count("id"),
-            avg_track_popularity=Avg("track_popularity"),
+def _clean_hits_top(qs):
+    top_tracks = qs.order_by("-track_popularity", "-artist__followers").values(*track_rows.value_fields)[:25]
+    return list(top_tracks)
+
+
+def _clean_hits_orm(f):
+    qs = _clean_hits_queryset(f)
+    return _clean_hits_summary(qs), _clean_hits_top(qs)
+
+
+def _clean_hits_snapshot(snap, f):
+    mask = ~snap.explicit & (snap.popularity >= f["min_popularity"])
+
+    if f["genre"]:
+        mask &= snap.genre_contains(f["genre"])
+    if f["album_type"]:
+        mask &= snap.album_type_is(f["album_type"])
+    if f["year_from"]:
+        mask &= snap.year >= f["year_from"]
+    if f["year_to"]:
+        mask &= snap.year <= f["year_to"]
+
+    # only the 25 rows we display are fetched from the database
+    ids = snap.top_ids(mask, 25)
+    by_id = {row["id"]: row for row in Track.objects.filter(id__in=ids).values(*track_rows.value_fields)}
+    return snap.summary(mask), [by_id[i] for i in ids if i in by_id]
+
+
+def _clean_hits_filters(p):
+    year_from = p.get("year_from")
+    year_to = p.get("year_to")
+    return {
+        "min_popularity": int(p.get("min_popularity", 70)),
+        "genre": (p.get("genre") or "").strip() or None,
+        "year_from": int(year_from) if year_from else None,
+        "year_to": int(year_to) if year_to else None,
+        "album_type": (p.get("album_type") or "").strip() or None,
+    }
+
+
+async def _clean_hits_data(filters):
+    snap = await run_sync(get_snapshot)
+    if snap is not None:
+        summary, top_tracks = await run_sync(_clean_hits_snapshot, snap, filters)
+    else:
+        # the aggregate and the top-25 query are independent: run them side by side
+        qs = _clean_hits_queryset(filters)
+        summary, top_tracks = await gather_sync((_clean_hits_summary, qs), (_clean_hits_top, qs))
+
+    payload = {
+        "filters": filters,
+        "summary": summary,
+        "top_tracks": track_rows.serialize(top_tracks),
+    }
+    return CleanHitsSerializer(payload).data
+
+
+def _breakdown_data(artist):
+    snap = get_snapshot()
+    if snap is not None:
+        rows = snap.artist_albumtype_breakdown(snap.artist_contains(artist))
+    else:
+        rows = list(
+            filter_by_artist(Track.objects.all(), artist)
+            .values(artist_name=F("artist__name"), album_type=F("album__album_type"))
+            .annotate(track_count=Count("id"), avg_track_popularity=Avg("track_popularity"))
+            .order_by("artist_name", "album_type")
         )
-        .order_by("year")
-    )
+    return ArtistAlbumTypeBreakdownSerializer(rows, many=True).data
 
-    # explicit_count computed in Python (fast enough for <10k rows, SQLite-safe)
-    explicit_counts = {}
-    for r in Track.objects.annotate(year=ExtractYear("album_release_date")).values("year", "explicit"):
-        y = r["year"]
-        explicit_counts.setdefault(y, 0)
-        if r["explicit"]:
-            explicit_counts[y] += 1
 
-    for row in rows:
-        row["explicit_count"] = explicit_counts.get(row["year"], 0)
+# -----------------------
+# Async summary / insights views
+# -----------------------
 
-    return Response(ReleasesByYearSerializer(rows, many=True).data)
+@cached_summary("top-artists")
+@require_GET
+async def top_artists(request):
+    return _json_response(await run_sync(_top_artists_data))
 
 
-@api_view(["GET"])
-def top_genres(request):
-    top_n = int(request.query_params.get("top", 20))
-    genres = []
+@cached_summary("releases-by-year")
+@require_GET
+async def releases_by_year(request):
+    return _json_response(await run_sync(_releases_by_year_data))
 
-    for g in Track.objects.values_list("artist_genres", flat=True):
-        if g:
-            genres.extend([x.strip().lower() for x in g.split(",") if x.strip()])
 
-    counts = Counter(genres).most_common(top_n)
-    rows = [{"genre": k, "count": v} for k, v in counts]
-    return Response(GenreCountSerializer(rows, many=True).data)
+@cached_summary("top-genres")
+@require_GET
+async def top_genres(request):
+    top_n = int(request.GET.get("top", 20))
+    return _json_response(await run_sync(_top_genres_data, top_n))
 
 
-@api_view(["GET"])
-def clean_hits(request):
+@cached_summary("clean-hits")
+@require_GET
+async def clean_hits(request):
     """
     "Interesting" endpoint similar to the coursework example:
     High-popularity, non-explicit tracks with optional genre + year range + album type.
     """
+    return _json_response(await _clean_hits_data(_clean_hits_filters(request.GET)))
+
+
+@cached_summary("artist-albumtype-breakdown")
+@require_GET
+async def artist_albumtype_breakdown(request):
+    artist = (request.GET.get("artist") or "").strip()
+    if not artist:
+        return _json_response({"error": "Missing required param: artist"}, status=400)
+    return _json_response(await run_sync(_breakdown_data, artist))
+
+
+@cached_summary("dashboard")
+@require_GET
+async def dashboard(request):
+    """
+    Every summary in one request: top artists, releases by year, top genres
+    (?top=) and clean hits (same params as clean-hits), plus the album-type
+    breakdown when ?artist= is given. The parts are computed concurrently.
+    """
+    p = request.GET
+    artist = (p.get("artist") or "").strip()
+
+    parts = {
+        "top_artists": run_sync(_top_artists_data),
+        "releases_by_year": run_sync(_releases_by_year_data),
+        "top_genres": run_sync(_top_genres_data, int(p.get("top", 20))),
+        "clean_hits": _clean_hits_data(_clean_hits_filters(p)),
+    }
+    if artist:
+        parts["artist_albumtype_breakdown"] = run_sync(_breakdown_data, artist)
+
+    results = await asyncio.gather(*parts.values())
+    return _json_response(dict(zip(parts, results)))
+
+
+@cached_summary("facets")
+@api_view(["GET"])
+def track_facets(request):
+    """
+    Counts per album_type, release year, explicit flag and top-N genres for
+    the tracks matching the list API filters (and `search`), in one call.
+    """
     p = request.query_params
-    min_popularity = int(p.get("min_popularity", 70))
-    genre = (p.get("genre") or "").strip()
-    year_from = p.get("year_from")
-    year_to = p.get("year_to")
-    album_type = (p.get("album_type") or "").strip()
+    qs = filter_tracks(Track.objects.all(), p)
+    if p.get("search"):
+        qs = search_tracks(qs, p["search"], ranked=False)
 
-    qs = Track.objects.filter(explicit=False, track_popularity__gte=min_popularity)
+    data = facet_counts(qs, top_genres=int(p.get("top", 20)))
+    return Response(TrackFacetsSerializer(data).data)
 
-    if genre:
-        qs = qs.filter(artist_genres__icontains=genre)
-    if album_type:
-        qs = qs.filter(album_type__iexact=album_type)
-    if year_from:
-        qs = qs.filter(album_release_date__year__gte=int(year_from))
-    if year_to:
-        qs = qs.filter(album_release_date__year__lte=int(year_to))
 
-    summary = qs.aggregate(
-        results=Count("id"),
-        avg_popularity=Avg("track_popularity"),
-        max_popularity=Max("track_popularity"),
-        min_duration=Min("track_duration_min"),
-        max_duration=Max("track_duration_min"),
-    )
+@api_view(["GET"])
+def track_autocomplete(request):
+    """
+    Typeahead suggestions for `q`: the artists, tracks, albums and genres
+    with a word starting with it, best first, grouped by kind. ?types=
+    (comma-separated) limits the kinds, ?limit= the suggestions per kind.
+    Served from the in-memory prefix index in tracks.autocomplete.
+    """
+    p = request.query_params
+    kinds = [k.strip() for k in p.get("types", "").split(",") if k.strip()] or list(KINDS)
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        return Response({"error": f"Unknown types: {', '.join(unknown)}. Use {', '.join(KINDS)}."}, status=400)
+    try:
+        limit = int(p.get("limit", 8))
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+    if not 1 <= limit <= MAX_LIMIT:
+        return Response({"error": f"limit must be between 1 and {MAX_LIMIT}"}, status=400)
+
+    q = p.get("q", "")
+    return Response({"q": q, **get_index().search(q, kinds, limit)})
+
+
+def _similar_k(p):
+    try:
+        k = int(p.get("k", 10))
+    except ValueError:
+        return None
+    return k if 1 <= k <= MAX_K else None
+
+
+def _similar_data(model, seed_ids, k):
+    """[(seed row, [similar rows with their distance])] for seeds present in `model`."""
+    rows = model.rows(seed_ids)
+    found = [(pk, row) for pk, row in zip(seed_ids, rows) if row >= 0]
+    neighbours = model.nearest([row for _, row in found], k)
+
+    # only the rows we return are read from the database
+    wanted = {pk for pk, _ in found} | {pk for hits in neighbours for pk, _ in hits}
+    by_id = {row["id"]: row for row in Track.objects.filter(id__in=wanted).values(*track_rows.value_fields)}
+    return [
+        (track_rows.to_representation(by_id[pk]),
+         [{**track_rows.to_representation(by_id[hit]), "distance": distance}
+          for hit, distance in hits if hit in by_id])
+        for (pk, _), hits in zip(found, neighbours) if pk in by_id
+    ]
+
+
+SIMILAR_UNAVAILABLE = {"error": "Similar tracks need NumPy, which is not installed."}
+SIMILAR_BAD_K = {"error": f"k must be an integer between 1 and {MAX_K}"}
 
-    top_tracks = qs.order_by("-track_popularity", "-artist_followers")[:25]
 
-    payload = {
-        "filters": {
-            "min_popularity": min_popularity,
-            "genre": genre or None,
-            "year_from": int(year_from) if year_from else None,
-            "year_to": int(year_to) if year_to else None,
-            "album_type": album_type or None,
-        },
-        "summary": summary,
-        "top_tracks": TrackSerializer(top_tracks, many=True).data,
-    }
-    return Response(CleanHitsSerializer(payload).data)
+@api_view(["GET"])
+def similar_tracks(request, pk):
+    """
+    The `k` (default 10) tracks closest to track `pk` by popularity, artist
+    popularity, followers, duration, release year, explicit flag and
+    genres, from the per-process model in tracks.similarity.
+    """
+    k = _similar_k(request.query_params)
+    if k is None:
+        return Response(SIMILAR_BAD_K, status=400)
+    model = get_model()
+    if model is None:
+        return Response(SIMILAR_UNAVAILABLE, status=503)
+    data = _similar_data(model, [pk], k)
+    if not data:
+        return Response({"error": "No track with this id."}, status=404)
+    track, results = data[0]
+    return Response({"track": track, "k": k, "results": results})
 
 
 @api_view(["GET"])
-def artist_albumtype_breakdown(request):
-    artist = (request.query_params.get("artist") or "").strip()
-    if not artist:
-        return Response({"error": "Missing required param: artist"}, status=400)
+def similar_tracks_batch(request):
+    """
+    similar_tracks for several seeds in one pass: ?ids=1,2,3 (at most
+    MAX_SEEDS). Ids that do not exist are listed under "missing".
+    """
+    p = request.query_params
+    k = _similar_k(p)
+    if k is None:
+        return Response(SIMILAR_BAD_K, status=400)
+    try:
+        ids = list(dict.fromkeys(int(x) for x in p.get("ids", "").split(",") if x.strip()))
+    except ValueError:
+        return Response({"error": "ids must be comma-separated integers"}, status=400)
+    if not 1 <= len(ids) <= MAX_SEEDS:
+        return Response({"error": f"Give between 1 and {MAX_SEEDS} ids."}, status=400)
+    model = get_model()
+    if model is None:
+        return Response(SIMILAR_UNAVAILABLE, status=503)
 
-    rows = list(
-        Track.objects.filter(artist_name__icontains=artist)
-        .values("artist_name", "album_type")
-        .annotate(track_count=Count("id"), avg_track_popularity=Avg("track_popularity"))
-        .order_by("artist_name", "album_type")
-    )
-    return Response(ArtistAlbumTypeBreakdownSerializer(rows, many=True).data)
+    data = _similar_data(model, ids, k)
+    found = {track["id"] for track, _ in data}
+    return Response({
+        "k": k,
+        "results": [{"track": track, "results": results} for track, results in data],
+        "missing": [pk for pk in ids if pk not in found],
+    })
+
+
+DEFAULT_QUANTILES = "0.1,0.25,0.5,0.75,0.9,0.99"
+
+
+def _quantile_label(q):
+    return f"p{q * 100:g}"
+
+
+@cached_summary("distributions")
+@api_view(["GET"])
+def track_distributions(request):
+    """
+    Histogram, count and quantiles of track_popularity, artist_popularity,
+    track_duration_min and artist_followers (?metrics= to pick) for the
+    tracks of a release year range, album_type and genre (exact name),
+    merged from the stored slices in tracks.distributions.
+    """
+    p = request.query_params
+    metrics = [m.strip() for m in p.get("metrics", "").split(",") if m.strip()] or list(METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        return Response({"error": f"Unknown metrics: {', '.join(unknown)}. Use {', '.join(METRICS)}."}, status=400)
+    try:
+        quantiles = [float(q) for q in p.get("quantiles", DEFAULT_QUANTILES).split(",") if q.strip()]
+        year = int(p["year"]) if p.get("year") else None
+        year_from = int(p["year_from"]) if p.get("year_from") else year
+        year_to = int(p["year_to"]) if p.get("year_to") else year
+    except ValueError:
+        return Response({"error": "year, year_from, year_to must be integers and quantiles numbers"}, status=400)
+    if not all(0 < q <= 1 for q in quantiles):
+        return Response({"error": "quantiles must be in (0, 1]"}, status=400)
+
+    filters = {
+        "year_from": year_from,
+        "year_to": year_to,
+        "album_type": (p.get("album_type") or "").strip() or None,
+        "genre": (p.get("genre") or "").strip().lower() or None,
+    }
+    with_histogram = p.get("histogram", "1").lower() not in ("0", "false", "no")
+
+    data = {}
+    for metric, bins in slice_bins(metrics, **filters).items():
+        binning = METRICS[metric]
+        data[metric] = {
+            "count": sum(bins.values()),
+            "quantiles": {_quantile_label(q): quantile(metric, bins, q) for q in quantiles},
+        }
+        if with_histogram:
+            data[metric]["histogram"] = [
+                {"from": lo, "to": hi, "count": n}
+                for lo, hi, n in ((*binning.edges(b), n) for b, n in bins.items())
+            ]
+    return Response({"filters": filters, "metrics": data})
+
+
+@cached_summary("cube")
+@api_view(["GET"])
+def track_cube(request):
+    """
+    Track count and sum / average / min / max of popularity and duration,
+    grouped by any of year, album_type, explicit, genre (?group_by=) over
+    the tracks matching year / year_from / year_to, album_type, explicit
+    and genre (exact name), rolled up from the cells in tracks.cube.
+    """
+    p = request.query_params
+    group_by = list(dict.fromkeys(d.strip() for d in p.get("group_by", "").split(",") if d.strip()))
+    unknown = [d for d in group_by if d not in DIMENSIONS]
+    if unknown:
+        return Response(
+            {"error": f"Unknown dimensions: {', '.join(unknown)}. Use {', '.join(DIMENSIONS)}."}, status=400
+        )
+    try:
+        year = int(p["year"]) if p.get("year") else None
+        year_from = int(p["year_from"]) if p.get("year_from") else year
+        year_to = int(p["year_to"]) if p.get("year_to") else year
+    except ValueError:
+        return Response({"error": "year, year_from, year_to must be integers"}, status=400)
+
+    filters = {
+        "year_from": year_from,
+        "year_to": year_to,
+        "album_type": (p.get("album_type") or "").strip() or None,
+        "explicit": parse_bool(p["explicit"]) if p.get("explicit") else None,
+        "genre": (p.get("genre") or "").strip().lower() or None,
+    }
+    return Response({"group_by": group_by, "filters": filters, "results": cells(group_by, **filters)})
+
+
+EXPORT_FIELDS = ["id", *FLAT_FIELDS]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object for csv.writer that just hands each line back."""
+
+    def write(self, value):
+        return value
+
+
+def _iso_date(value):
+    return None if value is None else value.isoformat()
+
+
+def _export_converters():
+    """Per-column functions turning values_list() items into what DjangoJSONEncoder writes."""
+    dates = {name for name in FLAT_FIELDS if isinstance(model_field(name), models.DateField)}
+    return [(name, _iso_date if name in dates else None) for name in EXPORT_FIELDS]
+
+
+def _export_ndjson(rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    converters = _export_converters()
+    buf = []
+    for row in rows:
+        obj = {name: convert(v) if convert else v for (name, convert), v in zip(converters, row)}
+        line = orjson_dumps(obj)
+        # the export has always been ASCII-escaped; orjson bytes are identical only for ASCII rows
+        if line is not None and line.isascii():
+            buf.append(line.decode())
+        else:
+            buf.append(encoder.encode(obj))
+        if len(buf) >= EXPORT_CHUNK_SIZE:
+            yield "\n".join(buf) + "\n"
+            buf.clear()
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+def _export_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    buf = []
+    for row in rows:
+        buf.append(writer.writerow(row))
+        if len(buf) >= EXPORT_CHUNK_SIZE:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
+
+
+@require_GET
+def export_tracks(request):
+    """
+    Stream every track matching the TrackListCreateView filters (plus
+    `search` and `ordering`) as NDJSON (default) or CSV (?format=csv).
+    Rows come from values_list().iterator(), so memory stays flat and the
+    first bytes go out as soon as the first chunk is read.
+    """
+    p = request.GET
+    fmt = p.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return JsonResponse({"error": "format must be ndjson or csv"}, status=400)
+
+    qs = filter_tracks(Track.objects.all(), p)
+    if p.get("search"):
+        qs = search_tracks(qs, p["search"], ranked=False)
+
+    ordering = [
+        flat_lookup(o) for o in (p.get("ordering") or "").split(",")
+        if o.lstrip("-") in TrackListCreateView.ordering_fields
+    ]
+    qs = qs.order_by(*ordering, "id")
+
+    lookups = [flat_lookup(name) for name in EXPORT_FIELDS]
+    rows = qs.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if fmt == "csv":
+        response = StreamingHttpResponse(_export_csv(rows), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="tracks.csv"'
+    else:
+        response = StreamingHttpResponse(_export_ndjson(rows), content_type="application/x-ndjson")
+    return response
@@ -1,8 +1,12 @@
-from django.db.models import Q, Count, Avg
+from django.http import Http404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from collections import Counter
+from .catalog import filter_by_artist
+from .facets import list_page_facets
+from .genres import filter_by_genre
 from .models import Track
+from .pagination import CURSOR_PARAM, InvalidCursor, paginate_keyset
+from .search import search_tracks
 from .forms import TrackForm
 
 
@@ -11,25 +15,31 @@ class TrackListView(ListView):
     template_name = "tracks/track_list.html"
     context_object_name = "tracks"
     paginate_by = 25
+    # rowid order (what the unordered list used to return); search results are ranked
+    ordering = ["id"]
+
+    def paginate_queryset(self, queryset, page_size):
+        # keyset pages: Prev/Next cursors instead of page numbers, so no COUNT(*)
+        try:
+            page = paginate_keyset(queryset, self.request.GET.get(CURSOR_PARAM), page_size)
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        is_paginated = bool(page.next_cursor or page.previous_cursor)
+        return (None, page, page.object_list, is_paginated)
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().select_related("artist", "album")
         p = self.request.GET
 
         # Search
         q = p.get("q", "").strip()
         if q:
-            qs = qs.filter(
-                Q(track_name__icontains=q)
-                | Q(artist_name__icontains=q)
-                | Q(album_name__icontains=q)
-                | Q(artist_genres__icontains=q)
-            )
+            qs = search_tracks(qs, q)
 
         # Filters
         album_type = p.get("album_type", "").strip()
         if album_type:
-            qs = qs.filter(album_type__iexact=album_type)
+            qs = qs.filter(album__album_type__iexact=album_type)
 
         explicit = p.get("explicit", "").strip().lower()
         if explicit == "true":
@@ -43,15 +53,15 @@ class TrackListView(ListView):
 
         year = p.get("year", "").strip()
         if year:
-            qs = qs.filter(album_release_date__year=int(year))
+            qs = qs.filter(album__release_date__year=int(year))
 
         artist = p.get("artist", "").strip()
         if artist:
-            qs = qs.filter(artist_name__icontains=artist)
+            qs = filter_by_artist(qs, artist)
 
         genre = p.get("genre", "").strip()
         if genre:
-            qs = qs.filter(artist_genres__icontains=genre)
+            qs = filter_by_genre(qs, genre)
         
         return qs
 
@@ -59,75 +69,20 @@ class TrackListView(ListView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
-        # Dropdown options
-        ctx["album_types"] = (
-            Track.objects.values_list("album_type", flat=True).distinct().order_by("album_type")
-        )
-        ctx["years"] = (
-            Track.objects.values_list("album_release_date__year", flat=True)
-            .distinct()
-            .order_by("-album_release_date__year")
-        )
-
-        # Preserve filters across pagination (except page)
+        # Dropdown options and sidebar insights: computed once per data version
+        # and shared between requests (see tracks.facets)
+        ctx.update(list_page_facets())
+
+        # Preserve filters across pagination (except the cursor)
         params = self.request.GET.copy()
-        if "page" in params:
-            params.pop("page")
+        params.pop(CURSOR_PARAM, None)
         ctx["querystring"] = params.urlencode()
 
-        # -----------------------
-        # Insights for UI (NOT API)
-        # -----------------------
-
-        # 1) Top artists (by count, with avg popularity)
-        ctx["top_artists_ui"] = list(
-            Track.objects.values("artist_name")
-            .annotate(track_count=Count("id"), avg_popularity=Avg("track_popularity"))
-            .order_by("-track_count")[:8]
-        )
-
-        # 2) Top genres (parse text field)
-        genres = []
-        for g in Track.objects.exclude(artist_genres__isnull=True).exclude(artist_genres="").values_list("artist_genres", flat=True):
-            genres.extend([x.strip().lower() for x in g.split(",") if x.strip()])
-        ctx["top_genres_ui"] = Counter(genres).most_common(10)
-
-        # 3) “Clean hits” quick stats (non-explicit, high popularity)
-        # These match your “interesting query” logic, but displayed as UI summary.
-        clean_min_pop = 80
-        clean_qs = Track.objects.filter(explicit=False, track_popularity__gte=clean_min_pop)
-        ctx["clean_hits_ui"] = {
-            "min_popularity": clean_min_pop,
-            "count": clean_qs.count(),
-            "avg_popularity": clean_qs.aggregate(avg=Avg("track_popularity"))["avg"],
-        }
-
-        # Artist dropdown (top N to keep UI fast)
-        ctx["artists"] = (
-            Track.objects.values_list("artist_name", flat=True)
-            .distinct()
-            .order_by("artist_name")[:300]
-        )
-
-        # Genre dropdown (parse comma-separated genres, unique + sorted)
-        genres = set()
-        for g in (
-            Track.objects.exclude(artist_genres__isnull=True)
-            .exclude(artist_genres="")
-            .values_list("artist_genres", flat=True)
-        ):
-            for x in g.split(","):
-                x = x.strip().lower()
-                if x:
-                    genres.add(x)
-
-        ctx["genres"] = sorted(genres)
-
         return ctx
 
 
 class TrackDetailView(DetailView):
-    model = Track
+    queryset = Track.objects.select_related("artist", "album")
     template_name = "tracks/track_detail.html"
     context_object_name = "track"
 